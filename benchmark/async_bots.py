@@ -0,0 +1,122 @@
+"""This script measures how many asyncio bots a single core drives against a stub exchange
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/async_bots.py
+"""
+import argparse
+import asyncio
+import logging
+import random
+import time
+from _decimal import Decimal
+
+from action import AsyncAction, AsyncLimitAction
+from async_trade_bot import AsyncTradeBot, run_bots
+from async_trade_client import AsyncBasicTradeClient
+from async_trade_strategy import AsyncBuyStrategy, AsyncSellStrategy
+from quantity import Quantity
+from symbol_registry import Symbol
+from trade_strategy import CycleTradeStrategySupplier
+
+
+class StubExchange:
+    def __init__(self, latency_in_sec: float, polls_to_terminal: int):
+        self.__latency_in_sec = latency_in_sec
+        self.__polls_to_terminal = polls_to_terminal
+        self.__polls: dict[int, int] = {}
+        self.__order_id = 0
+        self.requests = 0
+        self.cycles = 0
+
+    async def create_order(self, **params):
+        await self.__round_trip()
+        self.cycles = self.cycles + 1
+        return {
+            'orderId': self.__next_order_id(),
+            'status': 'FILLED',
+            'fills': [{'price': '21472.15000000', 'qty': str(params['quantity'])}]
+        }
+
+    async def create_oco_order(self, **params):
+        await self.__round_trip()
+        order_id = self.__next_order_id()
+        self.__polls[order_id] = 0
+        return {
+            'listOrderStatus': 'EXECUTING',
+            'orderReports': [
+                {'orderId': order_id - 1, 'type': 'STOP_LOSS_LIMIT', 'price': params['stopPrice']},
+                {'orderId': order_id, 'type': 'LIMIT_MAKER', 'price': params['price']}
+            ]
+        }
+
+    async def get_order(self, **params):
+        await self.__round_trip()
+        order_id = params['orderId']
+        polls = self.__polls[order_id] + 1
+        if polls < self.__polls_to_terminal:
+            self.__polls[order_id] = polls
+            return {'orderId': order_id, 'status': 'NEW'}
+        del self.__polls[order_id]
+        return {'orderId': order_id, 'status': random.choice(('FILLED', 'EXPIRED'))}
+
+    async def __round_trip(self):
+        self.requests = self.requests + 1
+        await asyncio.sleep(self.__latency_in_sec)
+
+    def __next_order_id(self) -> int:
+        self.__order_id = self.__order_id + 2
+        return self.__order_id
+
+
+def bot(exchange: StubExchange, polling_interval_in_sec: float, logger: logging.Logger) -> AsyncTradeBot:
+    trade_client = AsyncBasicTradeClient(
+        exchange,
+        Decimal('1.0005'),
+        Decimal('0.9995'),
+        Decimal('1.0005'),
+        Decimal('0.9995'),
+        Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+        polling_interval_in_sec=polling_interval_in_sec
+    )
+    return AsyncTradeBot(
+        strategy_supplier=CycleTradeStrategySupplier([AsyncBuyStrategy(trade_client), AsyncSellStrategy(trade_client)]),
+        strategy_changes_limit=AsyncLimitAction(5, AsyncAction()),
+        expiration_limit=AsyncLimitAction(10 ** 9, AsyncAction()),
+        logger=logger
+    )
+
+
+async def measure(bots_count: int, duration_in_sec: float, exchange: StubExchange, polling_interval_in_sec: float):
+    logger = logging.getLogger('Bot')
+    logger.setLevel(logging.WARNING)
+    bots = [(bot(exchange, polling_interval_in_sec, logger), Quantity(0.00088000)) for _ in range(bots_count)]
+    try:
+        await asyncio.wait_for(run_bots(bots), duration_in_sec)
+    except asyncio.TimeoutError:
+        pass
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument('--bots', type=int, nargs='+', default=[10, 100, 1000])
+    parser.add_argument('--duration', type=float, default=10, help='seconds per run')
+    parser.add_argument('--latency', type=float, default=0.05, help='stub exchange round trip, seconds')
+    parser.add_argument('--polling-interval', type=float, default=2, help='order status polling interval, seconds')
+    parser.add_argument('--polls-to-terminal', type=int, default=3)
+    arguments = parser.parse_args()
+    print(f'{"bots":>6} {"cycles/s":>10} {"requests/s":>11} {"cpu %":>7} {"bots/core":>10}')
+    for bots_count in arguments.bots:
+        exchange = StubExchange(arguments.latency, arguments.polls_to_terminal)
+        wall_started = time.perf_counter()
+        cpu_started = time.process_time()
+        asyncio.run(measure(bots_count, arguments.duration, exchange, arguments.polling_interval))
+        wall = time.perf_counter() - wall_started
+        cpu = time.process_time() - cpu_started
+        utilisation = cpu / wall
+        print(
+            f'{bots_count:>6} {exchange.cycles / wall:>10.1f} {exchange.requests / wall:>11.1f} '
+            f'{utilisation * 100:>7.1f} {bots_count / utilisation:>10.0f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""This script measures request latency through fresh sessions and through a pre-warmed pooled session
+
+The local HTTP stub delays the first request of every new connection to stand in for the TLS handshake.
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/http_latency.py
+"""
+import argparse
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import requests
+
+from http_session import HttpSessionFactory
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    handshake_delay_in_sec = 0.0
+
+    def setup(self):
+        super().setup()
+        time.sleep(StubHandler.handshake_delay_in_sec)
+
+    def do_GET(self):
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def measure(request, threads: int, requests_per_thread: int) -> list[float]:
+    def run() -> list[float]:
+        latencies = []
+        for _ in range(requests_per_thread):
+            started = time.perf_counter()
+            request()
+            latencies.append(time.perf_counter() - started)
+        return latencies
+
+    with ThreadPoolExecutor(threads) as executor:
+        futures = [executor.submit(run) for _ in range(threads)]
+        return [latency for future in futures for latency in future.result()]
+
+
+def report(name: str, latencies: list[float]):
+    latencies = sorted(latencies)
+    print(
+        f'{name:<16} p50 {statistics.median(latencies) * 1000:8.3f} ms   '
+        f'p99 {latencies[int(len(latencies) * 0.99) - 1] * 1000:8.3f} ms   '
+        f'max {latencies[-1] * 1000:8.3f} ms'
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares fresh and pooled HTTP session latency against a local stub')
+    parser.add_argument('--threads', type=int, default=4, help='bots sharing the process')
+    parser.add_argument('--requests', type=int, default=200, help='requests per thread')
+    parser.add_argument('--handshake-ms', type=float, default=20, help='delay of the first request on a connection')
+    arguments = parser.parse_args()
+    StubHandler.handshake_delay_in_sec = arguments.handshake_ms / 1000
+    server = ThreadingHTTPServer(('localhost', 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f'http://localhost:{server.server_port}/api/v3/ping'
+
+    def fresh_request():
+        with requests.Session() as session:
+            session.get(url, timeout=10).close()
+
+    factory = HttpSessionFactory(pool_size=arguments.threads)
+    session = factory.session()
+    factory.warm_up(session, url)
+    report('fresh session', measure(fresh_request, arguments.threads, arguments.requests))
+    report('pooled session', measure(lambda: session.get(url).close(), arguments.threads, arguments.requests))
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,110 @@
+"""This script runs many TradeBot instances through the real client stack against the local exchange simulator
+
+It reports the completed cycles, the throughput and the tail latency of every layer from the metrics registry.
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/load.py --bots 200 --http
+"""
+import argparse
+import json
+import logging
+import threading
+import time
+from _decimal import Decimal
+
+from binance.client import Client
+
+from action import LimitAction, NoopAction, Sleep
+from binance_client import LoggingBinanceClient, RetryClient, SpotClient, TimingBinanceClient
+from exchange_simulator import ExchangeSimulator, ExchangeSimulatorServer, RandomWalk
+from http_session import HttpSessionFactory
+from metrics import CycleBreakdown, Metrics
+from quantity import Quantity
+from symbol_registry import Symbol
+from trade_bot import TradeBot
+from trade_client import BasicTradeClient, RecoveringTradeClient, TimingTradeClient
+from trade_strategy import BuyStrategy, CycleTradeStrategySupplier, SellStrategy
+
+
+def exchange_client(simulator: ExchangeSimulator, server: ExchangeSimulatorServer, bots: int):
+    if server is None:
+        return SpotClient(simulator)
+    client = Client('api-key', 'api-secret', ping=False)
+    client.API_URL = server.api_url()
+    client.MARGIN_API_URL = server.margin_api_url()
+    return SpotClient(client, HttpSessionFactory(pool_size=bots))
+
+
+def bot(client, metrics: Metrics, symbol: Symbol, polling_interval_in_sec: float) -> TradeBot:
+    logger = logging.getLogger('Load test')
+    trade_client = TimingTradeClient(
+        RecoveringTradeClient(
+            BasicTradeClient(
+                LoggingBinanceClient(
+                    TimingBinanceClient(RetryClient(client, metrics=metrics), metrics, 'retrying'),
+                    logger
+                ),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                symbol,
+                polling_pause=Sleep(polling_interval_in_sec)
+            )
+        ),
+        metrics,
+        'trade client'
+    )
+    return TradeBot(
+        strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client), SellStrategy(trade_client)]),
+        strategy_changes_limit=LimitAction(1_000_000, NoopAction()),
+        expiration_limit=LimitAction(1_000_000, NoopAction()),
+        logger=logger,
+        cycle_breakdown=CycleBreakdown(metrics)
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Load-tests the client stack against the exchange simulator')
+    parser.add_argument('--bots', type=int, default=100)
+    parser.add_argument('--duration', type=float, default=30, help='seconds to run')
+    parser.add_argument('--http', action='store_true', help='go through the HTTP server instead of in process')
+    parser.add_argument('--latency-ms', type=float, default=20)
+    parser.add_argument('--jitter-ms', type=float, default=5)
+    parser.add_argument('--error-rate', type=float, default=0.01)
+    parser.add_argument('--timeout-rate', type=float, default=0.005)
+    parser.add_argument('--volatility', type=float, default=10, help='price standard deviation per sqrt second')
+    parser.add_argument('--polling-interval', type=float, default=0.5)
+    parser.add_argument('--json', action='store_true', help='print the metrics as a JSON snapshot')
+    arguments = parser.parse_args()
+    logging.getLogger('Load test').setLevel(logging.WARNING)
+    symbol = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+    simulator = ExchangeSimulator(
+        RandomWalk(20000, arguments.volatility, seed=1),
+        symbol,
+        latency_in_sec=arguments.latency_ms / 1000,
+        latency_jitter_in_sec=arguments.jitter_ms / 1000,
+        error_rate=arguments.error_rate,
+        timeout_rate=arguments.timeout_rate,
+        seed=1
+    )
+    server = ExchangeSimulatorServer(simulator) if arguments.http else None
+    if server is not None:
+        server.start()
+    metrics = Metrics()
+    client = exchange_client(simulator, server, arguments.bots)
+    for _ in range(arguments.bots):
+        trade_bot = bot(client, metrics, symbol, arguments.polling_interval)
+        threading.Thread(target=trade_bot.start, args=(Quantity(0.001),), daemon=True).start()
+    time.sleep(arguments.duration)
+    report = simulator.report()
+    cycles = report.filled + report.expired
+    if arguments.json:
+        print(json.dumps(metrics.snapshot(), indent=2))
+    else:
+        print(metrics.prometheus())
+    print(f'{arguments.bots} bots, {cycles} cycles in {arguments.duration:.0f} s, '
+          f'{cycles / arguments.duration:.1f} cycles/s, {report}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,34 @@
+"""This script measures the per-call cost the timing decorators add over a no-op Binance client
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/metrics_overhead.py
+"""
+import argparse
+import time
+
+from binance_client import TimingBinanceClient
+from metrics import Metrics
+
+
+class NoopClient:
+    def get_order(self, **params) -> dict:
+        return params
+
+
+def per_call_in_us(client, calls: int) -> float:
+    started = time.perf_counter()
+    for order_id in range(calls):
+        client.get_order(symbol='BTCFDUSD', orderId=order_id)
+    return (time.perf_counter() - started) / calls * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Measures the timing decorator overhead per call')
+    parser.add_argument('--calls', type=int, default=1_000_000)
+    arguments = parser.parse_args()
+    bare = per_call_in_us(NoopClient(), arguments.calls)
+    timed = per_call_in_us(TimingBinanceClient(NoopClient(), Metrics(), 'exchange'), arguments.calls)
+    print(f'bare {bare:.3f} us/call, timed {timed:.3f} us/call, overhead {timed - bare:.3f} us/call')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+"""This script compares the per-order cost of the integer tick OCO pricing with the Decimal rounding it replaced
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/oco_pricing.py
+"""
+import argparse
+import random
+import time
+from _decimal import Decimal
+
+from symbol_registry import Symbol
+from trade_client import OcoPricer
+
+
+def decimal_prices(symbol: Symbol, limit_coefficient: Decimal, stop_coefficient: Decimal, market_price: str):
+    price = Decimal(market_price)
+    return str(symbol.round_price(price * limit_coefficient)), str(symbol.round_price(price * stop_coefficient))
+
+
+def tick_prices(pricer: OcoPricer, market_price: str):
+    _, _, limit_price, stop_price = pricer.prices(market_price)
+    return limit_price, stop_price
+
+
+def per_order_in_us(price_order, market_prices: list[str]) -> float:
+    started = time.perf_counter()
+    for market_price in market_prices:
+        price_order(market_price)
+    return (time.perf_counter() - started) / len(market_prices) * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares Decimal and integer tick OCO pricing per order')
+    parser.add_argument('--orders', type=int, default=200_000)
+    parser.add_argument('--distinct-prices', type=int, default=200, help='distinct fill prices among the orders')
+    arguments = parser.parse_args()
+    symbol = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+    generator = random.Random(1)
+    prices = [f'{generator.randint(2_000_000, 2_200_000) / 100:.8f}' for _ in range(arguments.distinct_prices)]
+    market_prices = [generator.choice(prices) for _ in range(arguments.orders)]
+    float_coefficients = (Decimal(1.0005), Decimal(0.9995))
+    decimal_cost = per_order_in_us(lambda price: decimal_prices(symbol, *float_coefficients, price), market_prices)
+    string_coefficients = (Decimal('1.0005'), Decimal('0.9995'))
+    normalized_cost = per_order_in_us(lambda price: decimal_prices(symbol, *string_coefficients, price), market_prices)
+    pricer = OcoPricer(symbol, *float_coefficients)
+    # Every price is new to the cold pricer, while the warm one has seen the distinct prices before
+    cold_prices = [f'{price / 100:.8f}' for price in range(2_000_000, 2_000_000 + arguments.orders)]
+    cold_cost = per_order_in_us(lambda price: tick_prices(pricer, price), cold_prices)
+    pricer = OcoPricer(symbol, *float_coefficients)
+    warm_cost = per_order_in_us(lambda price: tick_prices(pricer, price), market_prices)
+    print(f'Decimal with float literal coefficients {decimal_cost:.3f} us/order')
+    print(f'Decimal with normalized coefficients    {normalized_cost:.3f} us/order')
+    print(f'Integer ticks, every price new          {cold_cost:.3f} us/order')
+    print(f'Integer ticks, repeated fill prices     {warm_cost:.3f} us/order')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,123 @@
+"""This script compares decoding market order responses into slotted order records with the path it replaced
+
+The old path decoded the body to text, parsed it with the standard json module and kept the price in an order
+with an instance dict. The new one parses the bytes with orjson into a MarketOrder with __slots__, and with the
+fills decoded it also carries the filled quantity and the commission the trade history needs. The decoding time
+and the memory held by the decoded orders are measured for each.
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/response_decoding.py
+"""
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from _decimal import Decimal
+
+import orjson
+
+from symbol_registry import Symbol
+from trade_client import OrderMapper
+
+
+class DictMarketOrder:
+    def __init__(self, id: int, status: str, price: str):
+        self.id = id
+        self.status = status
+        self.price = price
+
+
+def legacy_market_order(body: bytes) -> DictMarketOrder:
+    response = json.loads(body.decode('utf-8'))
+    status = response['status']
+    fills = response['fills']
+    if status == 'FILLED' and fills:
+        return DictMarketOrder(response['orderId'], status, fills[0]['price'])
+    raise ValueError(f"Unexpected order status: {status}")
+
+
+SYMBOL = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+COEFFICIENTS = (Decimal('1.0005'), Decimal('0.9995'), Decimal('1.0005'), Decimal('0.9995'))
+MAPPER = OrderMapper(*COEFFICIENTS, SYMBOL)
+DECODING_MAPPER = OrderMapper(*COEFFICIENTS, SYMBOL, decode_fills=True)
+
+
+def lean_market_order(body: bytes):
+    return MAPPER.market_order(orjson.loads(body))
+
+
+def decoded_market_order(body: bytes):
+    return DECODING_MAPPER.market_order(orjson.loads(body))
+
+
+def responses(count: int) -> list[bytes]:
+    bodies = []
+    for index in range(count):
+        price = f'{21_000 + index % 1000 / 100:.8f}'
+        bodies.append(json.dumps({
+            'symbol': 'BTCFDUSD',
+            'orderId': 19744496177 + index,
+            'orderListId': -1,
+            'clientOrderId': f'trader-{index:024x}',
+            'transactTime': 1678380403996 + index,
+            'price': '0.00000000',
+            'origQty': '0.00088000',
+            'executedQty': '0.00088000',
+            'cummulativeQuoteQty': '18.89549200',
+            'status': 'FILLED',
+            'timeInForce': 'GTC',
+            'type': 'MARKET',
+            'side': 'BUY',
+            'workingTime': 1678380403996 + index,
+            'fills': [{
+                'price': price,
+                'qty': '0.00088000',
+                'commission': '0.00000000',
+                'commissionAsset': 'BNB',
+                'tradeId': 2903179679 + index
+            }],
+            'selfTradePreventionMode': 'NONE'
+        }).encode())
+    return bodies
+
+
+def decode_in_us(decode, bodies: list[bytes], repeat: int) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for body in bodies:
+            decode(body)
+        best = min(best, time.perf_counter() - started)
+    return best / len(bodies) * 1e6
+
+
+def retained_bytes(decode, bodies: list[bytes]) -> int:
+    gc.collect()
+    tracemalloc.start()
+    orders = [decode(body) for body in bodies]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del orders
+    return retained
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Compares the old and the lean decoding of market order responses')
+    parser.add_argument('--responses', type=int, default=100_000)
+    parser.add_argument('--repeat', type=int, default=3)
+    arguments = parser.parse_args()
+    bodies = responses(arguments.responses)
+    legacy_cost = decode_in_us(legacy_market_order, bodies, arguments.repeat)
+    lean_cost = decode_in_us(lean_market_order, bodies, arguments.repeat)
+    decoded_cost = decode_in_us(decoded_market_order, bodies, arguments.repeat)
+    legacy_memory = retained_bytes(legacy_market_order, bodies)
+    lean_memory = retained_bytes(lean_market_order, bodies)
+    decoded_memory = retained_bytes(decoded_market_order, bodies)
+    print(f'json + dict order             {legacy_cost:.3f} us/response, {legacy_memory / len(bodies):.0f} bytes/order')
+    print(f'orjson + slotted order        {lean_cost:.3f} us/response, {lean_memory / len(bodies):.0f} bytes/order')
+    print(f'orjson + decoded fills        {decoded_cost:.3f} us/response, '
+          f'{decoded_memory / len(bodies):.0f} bytes/order')
+
+
+if __name__ == '__main__':
+    main()
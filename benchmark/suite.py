@@ -0,0 +1,216 @@
+"""This script benchmarks the trading cycle hot path against a stored baseline and fails on regressions
+
+Every case is timed in-process over a stub exchange that returns prebuilt responses, so only the bot's own code
+is measured: a full Buy/Sell strategy cycle, the order response parsing with and without the fills, the OCO
+price computation for repeated and new fill prices next to the Decimal rounding it replaced, and the per-call
+overhead of every client decorator. Timings are divided by a fixed pure-Python calibration workload before they
+are compared, so a baseline recorded on one machine stays usable on another.
+
+Run it from the repository root: PYTHONPATH=src/bot python benchmark/suite.py
+Record a new baseline after an intended change: PYTHONPATH=src/bot python benchmark/suite.py --update-baseline
+"""
+import argparse
+import itertools
+import json
+import logging
+import sys
+import tempfile
+import timeit
+from _decimal import Decimal
+from pathlib import Path
+from typing import Callable
+
+from binance_client import LoggingBinanceClient, RateLimitClient, RequestWeightLimiter, RetryClient, \
+    TimingBinanceClient
+from metrics import Metrics
+from quantity import Quantity
+from symbol_registry import Symbol
+from trade_client import BasicTradeClient, EntryGapTradeClient, JournalingTradeClient, LoggingTradeClient, \
+    OcoPricer, OrderMapper, RecoveringTradeClient, TimingTradeClient
+from trade_journal import TradeJournal
+from trade_strategy import BuyStrategy, SellStrategy
+
+BASELINE_PATH = Path(__file__).with_name('baseline.json')
+SYMBOL = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+COEFFICIENTS = (Decimal('1.0005'), Decimal('0.9995'), Decimal('1.0005'), Decimal('0.9995'))
+MARKET_ORDER = {
+    'orderId': 19744496177,
+    'status': 'FILLED',
+    'fills': [{'price': '21472.15000000', 'qty': '0.00088000', 'commission': '0.00000000', 'commissionAsset': 'BNB'}]
+}
+OCO_ORDER = {
+    'listOrderStatus': 'EXECUTING',
+    'orderReports': [
+        {'orderId': 19747264210, 'type': 'STOP_LOSS_LIMIT', 'status': 'NEW'},
+        {'orderId': 19747264211, 'type': 'LIMIT_MAKER', 'status': 'NEW'}
+    ]
+}
+FILLED_ORDER = {'orderId': 19747264211, 'status': 'FILLED'}
+
+
+class StubClient:
+    def create_order(self, **params) -> dict:
+        return MARKET_ORDER
+
+    def create_oco_order(self, **params) -> dict:
+        return OCO_ORDER
+
+    def get_order(self, **params) -> dict:
+        return FILLED_ORDER
+
+    def get_open_orders(self, **params) -> list:
+        return []
+
+    def response_headers(self) -> dict:
+        return {}
+
+
+def basic_trade_client(client) -> BasicTradeClient:
+    return BasicTradeClient(client, *COEFFICIENTS, SYMBOL)
+
+
+def binance_client_layers(metrics: Metrics, logger: logging.Logger) -> dict[str, Callable]:
+    return {
+        'LoggingBinanceClient': lambda client: LoggingBinanceClient(client, logger),
+        'RetryClient': RetryClient,
+        'TimingBinanceClient': lambda client: TimingBinanceClient(client, metrics, 'benchmark'),
+        'RateLimitClient': lambda client: RateLimitClient(
+            client, RequestWeightLimiter(weight_limit_per_minute=10 ** 12, order_limit_per_10_sec=10 ** 12)
+        )
+    }
+
+
+def trade_client_layers(metrics: Metrics, logger: logging.Logger, journal: TradeJournal) -> dict[str, Callable]:
+    return {
+        'LoggingTradeClient': lambda client: LoggingTradeClient(client, logger),
+        'EntryGapTradeClient': lambda client: EntryGapTradeClient(client, logger),
+        'RecoveringTradeClient': RecoveringTradeClient,
+        'TimingTradeClient': lambda client: TimingTradeClient(client, metrics, 'benchmark'),
+        'JournalingTradeClient': lambda client: JournalingTradeClient(client, journal)
+    }
+
+
+def calibration():
+    total = 0
+    for value in range(1000):
+        total = total + value * value % 7
+    return total
+
+
+def decimal_oco_prices(market_price: str) -> tuple[str, str]:
+    price = Decimal(market_price)
+    return str(SYMBOL.round_price(price * COEFFICIENTS[0])), str(SYMBOL.round_price(price * COEFFICIENTS[1]))
+
+
+def cases(journal: TradeJournal) -> dict[str, Callable]:
+    logger = logging.getLogger('Benchmark')
+    logger.setLevel(logging.WARNING)
+    metrics = Metrics()
+    mapper = OrderMapper(*COEFFICIENTS, SYMBOL)
+    decoding_mapper = OrderMapper(*COEFFICIENTS, SYMBOL, decode_fills=True)
+    quantity = Quantity(0.00088)
+    bare_client = basic_trade_client(StubClient())
+    buy_strategy = BuyStrategy(bare_client)
+    sell_strategy = SellStrategy(bare_client)
+    repeated_pricer = OcoPricer(SYMBOL, COEFFICIENTS[0], COEFFICIENTS[1])
+    new_pricer = OcoPricer(SYMBOL, COEFFICIENTS[0], COEFFICIENTS[1])
+    # More distinct prices than the pricer remembers, so every call of the new price case computes both legs
+    new_prices = itertools.cycle(
+        [f'{price / 100:.8f}' for price in range(2_000_000, 2_000_000 + 4 * OcoPricer.PRICES_LIMIT)]
+    )
+    benchmark_cases = {
+        'calibration': calibration,
+        'buy_cycle': lambda: buy_strategy.run(quantity),
+        'sell_cycle': lambda: sell_strategy.run(quantity),
+        'market_order_parsing': lambda: mapper.market_order(MARKET_ORDER),
+        'market_order_parsing_with_fills': lambda: decoding_mapper.market_order(MARKET_ORDER),
+        'limit_maker_order_parsing': lambda: OrderMapper.limit_maker_order(OCO_ORDER),
+        'sell_oco_order_prices': lambda: mapper.sell_oco_order_request(0.00088, '21472.15000000'),
+        'buy_oco_order_prices': lambda: mapper.buy_oco_order_request(0.00088, '21472.15000000'),
+        'oco_pricing_repeated_price': lambda: repeated_pricer.prices('21472.15000000'),
+        'oco_pricing_new_price': lambda: new_pricer.prices(next(new_prices)),
+        'oco_pricing_decimal_rounding': lambda: decimal_oco_prices('21472.15000000')
+    }
+    for name, layer in binance_client_layers(metrics, logger).items():
+        strategy = BuyStrategy(basic_trade_client(layer(StubClient())))
+        benchmark_cases[f'buy_cycle_with_{name}'] = lambda strategy=strategy: strategy.run(quantity)
+    for name, layer in trade_client_layers(metrics, logger, journal).items():
+        strategy = BuyStrategy(layer(basic_trade_client(StubClient())))
+        benchmark_cases[f'buy_cycle_with_{name}'] = lambda strategy=strategy: strategy.run(quantity)
+    return benchmark_cases
+
+
+def ns_per_call(case: Callable, run_in_sec: float, repeat: int) -> float:
+    timer = timeit.Timer(case)
+    number, time_taken = timer.autorange()
+    number = max(1, int(number * run_in_sec / time_taken))
+    return min(timer.repeat(number=number, repeat=repeat)) / number * 1e9
+
+
+def measure(run_in_sec: float, repeat: int, selected: list[str]) -> dict[str, float]:
+    with tempfile.TemporaryDirectory() as directory:
+        journal = TradeJournal(Path(directory, 'benchmark.sqlite3'), batch_size=4096)
+        journal.start()
+        try:
+            selected_cases = {
+                name: case
+                for name, case in cases(journal).items()
+                if name == 'calibration' or not selected or any(pattern in name for pattern in selected)
+            }
+            results = {name: ns_per_call(case, run_in_sec, repeat) for name, case in selected_cases.items()}
+            # The calibration is timed again at the end and the faster run is kept, so a slow start of the machine
+            # does not shift every normalized result
+            results['calibration'] = min(results['calibration'], ns_per_call(calibration, run_in_sec, repeat))
+            return results
+        finally:
+            journal.close()
+
+
+def report(results: dict[str, float], baseline: dict[str, float], threshold: float) -> list[str]:
+    regressions = []
+    bare_cycle = results.get('buy_cycle')
+    print(f'{"case":<40} {"ns/call":>12} {"baseline":>12} {"change":>9} {"layer cost":>11}')
+    for name, result in results.items():
+        line = f'{name:<40} {result:>12.0f}'
+        if name in baseline and name != 'calibration':
+            # Both runs are scaled by their own calibration time to cancel out the speed of the machine
+            expected = baseline[name] * results['calibration'] / baseline['calibration']
+            change = result / expected - 1
+            line = line + f' {expected:>12.0f} {change:>+9.1%}'
+            if change > threshold:
+                regressions.append(name)
+                line = line + ' REGRESSION'
+        else:
+            line = line + f' {"":>12} {"":>9}'
+        if name.startswith('buy_cycle_with_') and bare_cycle is not None:
+            line = line + f' {result - bare_cycle:>+11.0f}'
+        print(line)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmarks the trading cycle hot path against a baseline')
+    parser.add_argument('--run', type=float, default=0.05, help='seconds per timing run')
+    parser.add_argument('--repeat', type=int, default=9, help='timing runs per case, the fastest one is kept')
+    parser.add_argument('--threshold', type=float, default=0.25, help='tolerated slowdown, 0.25 is 25%%')
+    parser.add_argument('--baseline', type=Path, default=BASELINE_PATH)
+    parser.add_argument('--update-baseline', action='store_true')
+    parser.add_argument('cases', nargs='*', help='run only the cases whose names contain one of these')
+    arguments = parser.parse_args()
+    results = measure(arguments.run, arguments.repeat, arguments.cases)
+    if arguments.update_baseline:
+        baseline = json.loads(arguments.baseline.read_text()) if arguments.baseline.exists() else {}
+        baseline.update({name: round(result, 1) for name, result in results.items()})
+        arguments.baseline.write_text(json.dumps(baseline, indent=2) + '\n')
+        print(f'Baseline is written to {arguments.baseline}')
+        return
+    baseline = json.loads(arguments.baseline.read_text()) if arguments.baseline.exists() else {}
+    regressions = report(results, baseline, arguments.threshold)
+    if regressions:
+        print(f'{len(regressions)} case(s) are more than {arguments.threshold:.0%} slower than the baseline: '
+              f'{", ".join(regressions)}')
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
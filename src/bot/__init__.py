@@ -0,0 +1,11 @@
+"""The bot modules import each other by their bare names, as they run as scripts from this directory
+
+Importing the package from anywhere else, e.g. in a worker spawned by the supervisor, puts this directory on the
+path, so those imports resolve in a fresh interpreter too.
+"""
+import sys
+from pathlib import Path
+
+_BOT_DIRECTORY = str(Path(__file__).resolve().parent)
+if _BOT_DIRECTORY not in sys.path:
+    sys.path.append(_BOT_DIRECTORY)
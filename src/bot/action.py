@@ -1,3 +1,4 @@
+import asyncio
 import sys
 import time
 from abc import ABC
@@ -35,7 +36,7 @@ class LoggingAction(Action):
         self.__logger = logger
 
     def run(self):
-        self.__logger.debug('Running action %s', str(self.__action))
+        self.__logger.debug('Running action %s', self.__action)
         self.__action.run()
 
 
@@ -91,3 +92,60 @@ class NoopAction(Action):
 
     def __str__(self):
         return 'Noop'
+
+
+class AsyncAction(ABC):
+
+    async def run(self):
+        pass
+
+
+class AsyncLimitAction:
+    def __init__(self, limit: int, action: AsyncAction):
+        self.__limit = limit
+        self.__action = action
+
+    async def run(self, counter: Counter):
+        if counter.is_greater_or_equal(self.__limit):
+            await self.__action.run()
+
+    async def reset_and_run(self, counter: Counter):
+        if counter.is_greater_or_equal(self.__limit):
+            counter.reset()
+            await self.__action.run()
+
+
+class AsyncSleep(AsyncAction):
+    def __init__(self, duration_in_sec: int):
+        self.__duration_in_sec = duration_in_sec
+
+    async def run(self):
+        await asyncio.sleep(self.__duration_in_sec)
+
+    def __str__(self):
+        return f'Sleep, duration {self.__duration_in_sec} sec'
+
+
+class AsyncCompositeAction(AsyncAction):
+
+    def __init__(self, actions: List[AsyncAction]):
+        self.__actions = actions
+
+    async def run(self):
+        for action in self.__actions:
+            await action.run()
+
+    def __str__(self):
+        return "".join(map(str, self.__actions))
+
+
+class AsyncActionAdapter(AsyncAction):
+
+    def __init__(self, action: Action):
+        self.__action = action
+
+    async def run(self):
+        self.__action.run()
+
+    def __str__(self):
+        return str(self.__action)
@@ -0,0 +1,197 @@
+"""This module contains asyncio counterparts of the wrappers over basic Binance client
+
+The retry client follows the policy of the blocking one: only transient errors are retried, with a jittered
+exponential backoff within a deadline, and an order that may have landed is looked up by its client order id
+before it is placed again.
+"""
+import asyncio
+import random
+import time
+from logging import Logger
+from typing import Awaitable, Callable, Optional
+
+import aiohttp
+from binance.exceptions import BinanceAPIException
+
+from binance_client import OrderException, OcoOrderException, PriceOcoOrderException, GetOrderException, \
+    _client_order_id, _is_retryable as _is_blocking_client_retryable, _landed_oco_order, _landed_order
+from counter import Counter
+from metrics import Metrics
+
+
+class AsyncLoggingBinanceClient:
+    def __init__(self, binance_client, logger: Logger):
+        self.__binance_client = binance_client
+        self.__logger = logger
+
+    async def create_order(self, **params) -> str:
+        self.__logger.debug('Making the order %s', params)
+        try:
+            response = await self.__binance_client.create_order(**params)
+        except Exception as exception:
+            raise OrderException('Failed to make the order') from exception
+        return response
+
+    async def create_oco_order(self, **params) -> str:
+        self.__logger.debug('Making the OCO order %s', params)
+        try:
+            response = await self.__binance_client.create_oco_order(**params)
+        except BinanceAPIException as binance_exception:
+            code = binance_exception.code
+            message = binance_exception.message
+            if code == -2010 and 'The relationship of the prices for the orders is not correct' in message:
+                raise PriceOcoOrderException(
+                    'The relationship of the prices for the orders is not correct'
+                ) from binance_exception
+            raise OcoOrderException('Failed to make the OCO order') from binance_exception
+        except Exception as exception:
+            raise OcoOrderException('Failed to make the OCO order') from exception
+        return response
+
+    async def get_order(self, **params) -> str:
+        self.__logger.debug('Getting the order %s', params)
+        try:
+            response = await self.__binance_client.get_order(**params)
+        except Exception as exception:
+            raise GetOrderException('Failed to get the order') from exception
+        return response
+
+
+class AsyncRetryClient:
+    def __init__(
+            self,
+            binance_client,
+            retry_limit: int = 3,
+            base_delay_in_sec: float = 0.05,
+            max_delay_in_sec: float = 1,
+            order_deadline_in_sec: float = 3,
+            query_deadline_in_sec: float = 10,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], Awaitable[None]] = asyncio.sleep,
+            metrics: Optional[Metrics] = None
+    ):
+        self.__binance_client = binance_client
+        self.__retry_limit = retry_limit
+        self.__base_delay_in_sec = base_delay_in_sec
+        self.__max_delay_in_sec = max_delay_in_sec
+        self.__order_deadline_in_sec = order_deadline_in_sec
+        self.__query_deadline_in_sec = query_deadline_in_sec
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__metrics = metrics
+
+    async def create_order(self, **params) -> str:
+        params.setdefault('newClientOrderId', _client_order_id())
+        return await self.__place(
+            'create_order',
+            lambda: self.__binance_client.create_order(**params),
+            lambda: self.__landed_order(params)
+        )
+
+    async def create_oco_order(self, **params) -> str:
+        params.setdefault('listClientOrderId', _client_order_id())
+        params.setdefault('limitClientOrderId', _client_order_id())
+        params.setdefault('stopClientOrderId', _client_order_id())
+        return await self.__place(
+            'create_oco_order',
+            lambda: self.__binance_client.create_oco_order(**params),
+            lambda: self.__landed_oco_order(params)
+        )
+
+    async def get_order(self, **params) -> str:
+        retry_attempt = Counter(1)
+        started = self.__clock()
+        while True:
+            try:
+                return await self.__binance_client.get_order(**params)
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if not _is_retryable(exception):
+                    raise
+                if not await self.__back_off('get_order', retry_attempt, started, self.__query_deadline_in_sec):
+                    raise GetOrderException("Retry limit exceeded") from exception
+
+    async def __place(self, method: str, place: Callable[[], Awaitable], lookup: Callable[[], Awaitable]):
+        retry_attempt = Counter(1)
+        started = self.__clock()
+        may_have_landed = False
+        while True:
+            try:
+                if may_have_landed:
+                    landed_response = await lookup()
+                    if landed_response is not None:
+                        return landed_response
+                return await place()
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if not _is_retryable(exception):
+                    raise
+                may_have_landed = True
+                if not await self.__back_off(method, retry_attempt, started, self.__order_deadline_in_sec):
+                    raise
+
+    async def __back_off(self, method: str, retry_attempt: Counter, started: float, deadline_in_sec: float) -> bool:
+        if retry_attempt.is_greater_or_equal(self.__retry_limit):
+            return False
+        exponent = retry_attempt.int_value() - 1
+        delay = random.uniform(0, min(self.__max_delay_in_sec, self.__base_delay_in_sec * 2 ** exponent))
+        if self.__clock() - started + delay > deadline_in_sec:
+            return False
+        await self.__sleep(delay)
+        retry_attempt.inc()
+        if self.__metrics is not None:
+            self.__metrics.increment('binance_client_retries_total', method=method)
+        return True
+
+    async def __landed_order(self, params: dict) -> Optional[dict]:
+        order = await self.__order_by_client_id(params['symbol'], params['newClientOrderId'])
+        if order is None:
+            return None
+        return _landed_order(order)
+
+    async def __landed_oco_order(self, params: dict) -> Optional[dict]:
+        stop_order = await self.__order_by_client_id(params['symbol'], params['stopClientOrderId'])
+        limit_order = await self.__order_by_client_id(params['symbol'], params['limitClientOrderId'])
+        if stop_order is None or limit_order is None:
+            return None
+        return _landed_oco_order(params, stop_order, limit_order)
+
+    async def __order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[dict]:
+        try:
+            return await self.__binance_client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as binance_exception:
+            if binance_exception.code == -2013:
+                return None
+            raise
+
+
+def _is_retryable(exception: Exception) -> bool:
+    # The asyncio client times out and loses connections with its own exceptions
+    return _is_blocking_client_retryable(exception) \
+        or isinstance(exception, (asyncio.TimeoutError, aiohttp.ClientConnectionError))
+
+
+class AsyncSpotClient:
+    def __init__(self, binance_client):
+        self.__binance_client = binance_client
+
+    async def create_order(self, **params) -> str:
+        return await self.__binance_client.create_order(**params)
+
+    async def create_oco_order(self, **params) -> str:
+        return await self.__binance_client.create_oco_order(**params)
+
+    async def get_order(self, **params) -> str:
+        return await self.__binance_client.get_order(**params)
+
+
+class AsyncMarginClient:
+    def __init__(self, binance_client):
+        self.__binance_client = binance_client
+
+    async def create_order(self, **params) -> str:
+        return await self.__binance_client.create_margin_order(**params)
+
+    async def create_oco_order(self, **params) -> str:
+        return await self.__binance_client.create_margin_oco_order(**params)
+
+    async def get_order(self, **params) -> str:
+        return await self.__binance_client.get_margin_order(**params)
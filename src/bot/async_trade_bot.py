@@ -0,0 +1,61 @@
+"""This module contains an asyncio bot, so that a single event loop can drive many bots concurrently"""
+import asyncio
+import time
+from logging import Logger
+
+from action import AsyncLimitAction
+from quantity import Quantity
+from counter import Counter
+from trade_strategy import TradeStrategySupplier
+
+
+class AsyncTradeBot:
+    def __init__(
+            self,
+            strategy_supplier: TradeStrategySupplier,
+            strategy_changes_limit: AsyncLimitAction,
+            expiration_limit: AsyncLimitAction,
+            logger: Logger
+    ):
+        self.__strategy_changes_in_a_row_counter = Counter(0)
+        self.__strategy_supplier = strategy_supplier
+        self.__strategy_changes_limit = strategy_changes_limit
+        self.__expiration_limit = expiration_limit
+        self.__logger = logger
+        self.__run_counter = Counter(1)
+        self.__filled_counter = Counter(0)
+        self.__expired_counter = Counter(0)
+
+    async def start(self, quantity: Quantity):
+        strategy = self.__strategy_supplier.next_strategy()
+        while True:
+            self.__logger.debug("Run %s, strategy %s", self.__run_counter.int_value(), strategy)
+            self.__logger.debug(
+                "Orders filled %s, expired %s",
+                self.__filled_counter.int_value(),
+                self.__expired_counter.int_value()
+            )
+            started = time.monotonic()
+            status = await strategy.run(quantity)
+            self.__strategy_supplier.record(strategy, status, time.monotonic() - started)
+            self.__run_counter.inc()
+            if status == 'FILLED':
+                self.__filled_counter.inc()
+                self.__strategy_changes_in_a_row_counter.reset()
+                quantity.reset()
+                strategy = self.__strategy_supplier.strategy_after_fill(strategy)
+            elif status == 'EXPIRED':
+                self.__expired_counter.inc()
+                await self.__expiration_limit.run(self.__expired_counter)
+                quantity.grow()
+                next_strategy = self.__strategy_supplier.next_strategy()
+                if strategy != next_strategy:
+                    self.__strategy_changes_in_a_row_counter.inc()
+                    await self.__strategy_changes_limit.reset_and_run(self.__strategy_changes_in_a_row_counter)
+                strategy = next_strategy
+            else:
+                raise ValueError(f"Unknown order status: {status}. I'm stopping.")
+
+
+async def run_bots(bots: list[tuple[AsyncTradeBot, Quantity]]):
+    await asyncio.gather(*(bot.start(quantity) for bot, quantity in bots))
@@ -0,0 +1,145 @@
+"""This module contains an asyncio client with specific methods over basic Binance client's methods"""
+import asyncio
+from abc import ABC, abstractmethod
+from logging import Logger
+from _decimal import Decimal
+
+import binance_client
+from symbol_registry import Symbol
+from trade_client import Order, MarketOrder, LimitMakerOrder, OrderMapper
+
+
+class AsyncTradeClient(ABC):
+
+    @abstractmethod
+    async def buy_market_order(self, quantity: float) -> MarketOrder:
+        pass
+
+    @abstractmethod
+    async def sell_market_order(self, quantity: float) -> MarketOrder:
+        pass
+
+    @abstractmethod
+    async def sell_oco_order(self, quantity: float, market_price: str) -> LimitMakerOrder:
+        pass
+
+    @abstractmethod
+    async def buy_oco_order(self, quantity: float, market_price: str) -> LimitMakerOrder:
+        pass
+
+    @abstractmethod
+    async def poll_terminal_order_status(self, order_id: int) -> str:
+        pass
+
+
+class AsyncLoggingTradeClient(AsyncTradeClient):
+    def __init__(self, trade_client: AsyncTradeClient, logger: Logger):
+        self.__trade_client = trade_client
+        self.__logger = logger
+
+    async def buy_market_order(self, quantity: float) -> MarketOrder:
+        order = await self.__trade_client.buy_market_order(quantity)
+        self.__logger.debug('%s', order)
+        return order
+
+    async def sell_market_order(self, quantity: float) -> MarketOrder:
+        order = await self.__trade_client.sell_market_order(quantity)
+        self.__logger.debug('%s', order)
+        return order
+
+    async def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        order = await self.__trade_client.sell_oco_order(quantity, market_price)
+        self.__logger.debug('%s', order)
+        return order
+
+    async def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        order = await self.__trade_client.buy_oco_order(quantity, market_price)
+        self.__logger.debug('%s', order)
+        return order
+
+    async def poll_terminal_order_status(self, order_id: int) -> str:
+        self.__logger.debug('Start polling order %s status', order_id)
+        status = await self.__trade_client.poll_terminal_order_status(order_id)
+        self.__logger.debug('The order %s status: %s', order_id, status)
+        return status
+
+
+class AsyncRecoveringTradeClient(AsyncTradeClient):
+    def __init__(self, client: AsyncTradeClient):
+        self.__client = client
+
+    async def buy_market_order(self, quantity: float) -> MarketOrder:
+        return await self.__client.buy_market_order(quantity)
+
+    async def sell_market_order(self, quantity: float) -> MarketOrder:
+        return await self.__client.sell_market_order(quantity)
+
+    async def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        try:
+            order = await self.__client.sell_oco_order(quantity, market_price)
+        except binance_client.PriceOcoOrderException:
+            order = await self.__client.sell_market_order(quantity)
+        return order
+
+    async def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        try:
+            order = await self.__client.buy_oco_order(quantity, market_price)
+        except binance_client.PriceOcoOrderException:
+            order = await self.__client.buy_market_order(quantity)
+        return order
+
+    async def poll_terminal_order_status(self, order_id: int) -> str:
+        return await self.__client.poll_terminal_order_status(order_id)
+
+
+class AsyncBasicTradeClient(AsyncTradeClient):
+    def __init__(
+            self,
+            client,
+            sell_raise_coefficient: Decimal,
+            sell_decrease_coefficient: Decimal,
+            buy_raise_coefficient: Decimal,
+            buy_decrease_coefficient: Decimal,
+            symbol: Symbol,
+            polling_interval_in_sec: float = 2
+    ):
+        self.__client = client
+        self.__mapper = OrderMapper(
+            sell_raise_coefficient,
+            sell_decrease_coefficient,
+            buy_raise_coefficient,
+            buy_decrease_coefficient,
+            symbol
+        )
+        self.__polling_interval_in_sec = polling_interval_in_sec
+
+    async def buy_market_order(self, quantity: float) -> MarketOrder:
+        return await self.__market_order(quantity, 'BUY')
+
+    async def sell_market_order(self, quantity: float) -> MarketOrder:
+        return await self.__market_order(quantity, 'SELL')
+
+    async def __market_order(self, quantity: float, side: str) -> MarketOrder:
+        request = self.__mapper.market_order_request(quantity, side)
+        self.__mapper.oco_order_template(quantity, 'SELL' if side == 'BUY' else 'BUY')
+        response = await self.__client.create_order(**request)
+        return self.__mapper.market_order(response)
+
+    async def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        response = await self.__client.create_oco_order(**self.__mapper.sell_oco_order_request(quantity, market_price))
+        return self.__mapper.limit_maker_order(response)
+
+    async def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        response = await self.__client.create_oco_order(**self.__mapper.buy_oco_order_request(quantity, market_price))
+        return self.__mapper.limit_maker_order(response)
+
+    async def poll_terminal_order_status(self, order_id: int) -> str:
+        status = await self.__get_order_status(order_id)
+        while status in ('NEW', 'PARTIALLY_FILLED'):
+            await asyncio.sleep(self.__polling_interval_in_sec)
+            status = await self.__get_order_status(order_id)
+        return status
+
+    async def __get_order_status(self, order_id: int) -> str:
+        response = await self.__client.get_order(**self.__mapper.order_request(order_id))
+        return response['status']
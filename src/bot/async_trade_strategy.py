@@ -0,0 +1,52 @@
+"""This module contains asyncio counterparts of the trade strategies"""
+from abc import ABC, abstractmethod
+from logging import Logger
+
+from quantity import Quantity
+from async_trade_client import AsyncTradeClient
+
+
+class AsyncTradeStrategy(ABC):
+
+    @abstractmethod
+    async def run(self, quantity: Quantity) -> str:
+        pass
+
+
+class AsyncLoggingTradeStrategy(AsyncTradeStrategy):
+    def __init__(self, strategy: AsyncTradeStrategy, logger: Logger):
+        self.__strategy = strategy
+        self.__logger = logger
+
+    async def run(self, quantity: Quantity) -> str:
+        self.__logger.debug("Run %s", self.__strategy)
+        return await self.__strategy.run(quantity)
+
+    def __str__(self):
+        return str(self.__strategy)
+
+
+class AsyncSellStrategy(AsyncTradeStrategy):
+    def __init__(self, client: AsyncTradeClient):
+        self.__client = client
+
+    async def run(self, quantity: Quantity) -> str:
+        market_order = await self.__client.sell_market_order(quantity.float_value())
+        order = await self.__client.buy_oco_order(quantity.float_value(), market_order.price())
+        return await order.get_status_async(self.__client)
+
+    def __str__(self) -> str:
+        return 'Sell strategy'
+
+
+class AsyncBuyStrategy(AsyncTradeStrategy):
+    def __init__(self, client: AsyncTradeClient):
+        self.__client = client
+
+    async def run(self, quantity: Quantity) -> str:
+        market_order = await self.__client.buy_market_order(quantity.float_value())
+        order = await self.__client.sell_oco_order(quantity.float_value(), market_order.price())
+        return await order.get_status_async(self.__client)
+
+    def __str__(self):
+        return 'Buy strategy'
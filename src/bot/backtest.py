@@ -0,0 +1,431 @@
+"""This module contains a deterministic event-driven backtester replaying historical trades or klines
+
+The matching engine implements the create_order/create_oco_order/get_order surface BasicTradeClient
+expects. The simulated exchange feeds it historical ticks and VirtualSleep replaces the polling pause,
+so no wall-clock time passes during a replay.
+
+Run it from the repository root: PYTHONPATH=src/bot python src/bot/backtest.py trades.csv
+"""
+import argparse
+import csv
+import json
+import logging
+from itertools import count
+from pathlib import Path
+from typing import Iterable, Iterator, NamedTuple, Optional
+from _decimal import Decimal
+
+from binance.exceptions import BinanceAPIException
+
+from action import Action, CompositeAction, LimitAction, NoopAction, QuantityReset
+from binance_client import LoggingBinanceClient
+from market_history import HistorySeries, MarketHistoryStore
+from quantity import Quantity
+from symbol_registry import Symbol
+from trade_bot import TradeBot
+from trade_client import BasicTradeClient, MarketOrder, Order, RecoveringTradeClient, TradeClient
+from trade_strategy import CycleTradeStrategySupplier, BuyStrategy, SellStrategy
+
+
+class Tick(NamedTuple):
+    time: int
+    low: float
+    high: float
+    close: float
+
+
+def trade_ticks(path: Path) -> Iterator[Tick]:
+    with path.open(newline='') as trades:
+        for row in csv.reader(trades):
+            if row[0].isdigit():
+                price = float(row[1])
+                yield Tick(int(row[4]), price, price, price)
+
+
+def kline_ticks(path: Path) -> Iterator[Tick]:
+    with path.open(newline='') as klines:
+        for row in csv.reader(klines):
+            if row[0].isdigit():
+                yield Tick(int(row[6]), float(row[3]), float(row[2]), float(row[4]))
+
+
+def stored_trade_ticks(series: HistorySeries, block_size: int = 65536) -> Iterator[Tick]:
+    # The mapped columns are converted a block at a time, so only one block of ticks is held in memory
+    records = series.records()
+    for start in range(0, len(records['time']), block_size):
+        times = records['time'][start:start + block_size].tolist()
+        prices = records['price'][start:start + block_size].tolist()
+        yield from map(Tick, times, prices, prices, prices)
+
+
+def stored_kline_ticks(series: HistorySeries, block_size: int = 65536) -> Iterator[Tick]:
+    records = series.records()
+    for start in range(0, len(records['close_time']), block_size):
+        yield from map(Tick, *(
+            records[name][start:start + block_size].tolist() for name in ('close_time', 'low', 'high', 'close')
+        ))
+
+
+class ReplayFinished(Exception):
+    def __init__(self, message: str):
+        self.__message = message
+        super().__init__(self.__message)
+
+
+class _SimulatedOrder:
+    __slots__ = ('order_id', 'side', 'type', 'price', 'quantity', 'status', 'sibling')
+
+    def __init__(self, order_id: int, side: str, order_type: str, price: float, quantity: float, status: str):
+        self.order_id = order_id
+        self.side = side
+        self.type = order_type
+        self.price = price
+        self.quantity = quantity
+        self.status = status
+        self.sibling: Optional[_SimulatedOrder] = None
+
+
+class BacktestReport:
+    def __init__(self, market_orders: int, filled: int, expired: int, fees: float, pnl: float, duration_in_sec: float):
+        self.market_orders = market_orders
+        self.filled = filled
+        self.expired = expired
+        self.fees = fees
+        self.pnl = pnl
+        self.duration_in_sec = duration_in_sec
+
+    def __str__(self) -> str:
+        return (
+            f'Market orders {self.market_orders}, OCO filled {self.filled}, expired {self.expired}, '
+            f'fees {self.fees:.8f}, PnL {self.pnl:.8f}, virtual duration {self.duration_in_sec / 86400:.2f} days'
+        )
+
+
+class MatchingEngine:
+    def __init__(self, price: float, now: int, fee_rate: float = 0.0):
+        self.__fee_rate = fee_rate
+        self.__order_ids = count(1)
+        self.__orders: dict[int, _SimulatedOrder] = {}
+        self.__client_order_ids: dict[str, int] = {}
+        self.__open_limit_orders: list[_SimulatedOrder] = []
+        self.__base = 0.0
+        self.__quote = 0.0
+        self.__fees = 0.0
+        self.__market_orders = 0
+        self.__filled = 0
+        self.__expired = 0
+        self.__started = now
+        self.__now = now
+        self.__last_price = price
+
+    def create_order(self, **params) -> dict:
+        quantity = float(params['quantity'])
+        price = self.__last_price
+        commission = self.__execute(params['side'], price, quantity)
+        self.__market_orders = self.__market_orders + 1
+        order = self.__new_order(params['side'], 'MARKET', price, quantity, 'FILLED', params.get('newClientOrderId'))
+        return {
+            'symbol': params['symbol'],
+            'orderId': order.order_id,
+            'clientOrderId': params.get('newClientOrderId'),
+            'transactTime': self.__now,
+            'origQty': params['quantity'],
+            'executedQty': params['quantity'],
+            'cummulativeQuoteQty': str(price * quantity),
+            'status': 'FILLED',
+            'type': 'MARKET',
+            'side': params['side'],
+            'fills': [{'price': str(price), 'qty': params['quantity'], 'commission': str(commission)}]
+        }
+
+    def create_oco_order(self, **params) -> dict:
+        quantity = float(params['quantity'])
+        side = params['side']
+        limit_price = float(params['price'])
+        stop_price = float(params['stopLimitPrice'])
+        if side == 'SELL' and not stop_price < self.__last_price < limit_price or \
+                side == 'BUY' and not limit_price < self.__last_price < stop_price:
+            message = 'The relationship of the prices for the orders is not correct.'
+            raise BinanceAPIException(None, 400, json.dumps({'code': -2010, 'msg': message}))
+        stop_order = self.__new_order(
+            side, 'STOP_LOSS_LIMIT', stop_price, quantity, 'NEW', params.get('stopClientOrderId')
+        )
+        limit_order = self.__new_order(
+            side, 'LIMIT_MAKER', limit_price, quantity, 'NEW', params.get('limitClientOrderId')
+        )
+        stop_order.sibling = limit_order
+        limit_order.sibling = stop_order
+        self.__open_limit_orders.append(limit_order)
+        return {
+            'listOrderStatus': 'EXECUTING',
+            'transactionTime': self.__now,
+            'symbol': params['symbol'],
+            'orderReports': [self.__report(params['symbol'], stop_order), self.__report(params['symbol'], limit_order)]
+        }
+
+    def get_order(self, **params) -> dict:
+        order_id = params.get('orderId')
+        if order_id is None:
+            order_id = self.__client_order_ids.get(params.get('origClientOrderId'))
+        if order_id not in self.__orders:
+            raise BinanceAPIException(None, 400, json.dumps({'code': -2013, 'msg': 'Order does not exist.'}))
+        return self.__report(params['symbol'], self.__orders[order_id])
+
+    def get_open_orders(self, **params) -> list:
+        orders = []
+        for limit_order in self.__open_limit_orders:
+            orders.append(self.__report(params.get('symbol'), limit_order.sibling))
+            orders.append(self.__report(params.get('symbol'), limit_order))
+        return orders
+
+    def open_orders(self) -> int:
+        return len(self.__open_limit_orders)
+
+    def match(self, tick: Tick):
+        if self.__open_limit_orders:
+            for limit_order in list(self.__open_limit_orders):
+                stop_order = limit_order.sibling
+                if limit_order.side == 'SELL':
+                    stop_triggered = tick.low <= stop_order.price
+                    limit_touched = tick.high >= limit_order.price
+                else:
+                    stop_triggered = tick.high >= stop_order.price
+                    limit_touched = tick.low <= limit_order.price
+                if stop_triggered:
+                    self.__fill(stop_order, limit_order)
+                    self.__expired = self.__expired + 1
+                elif limit_touched:
+                    self.__fill(limit_order, stop_order)
+                    self.__filled = self.__filled + 1
+        self.__last_price = tick.close
+        self.__now = max(self.__now, tick.time)
+
+    def wait(self, until: int):
+        self.__now = until
+
+    def report(self) -> BacktestReport:
+        return BacktestReport(
+            self.__market_orders,
+            self.__filled,
+            self.__expired,
+            self.__fees,
+            self.__quote + self.__base * self.__last_price,
+            (self.__now - self.__started) / 1000
+        )
+
+    def __new_order(
+            self,
+            side: str,
+            order_type: str,
+            price: float,
+            quantity: float,
+            status: str,
+            client_order_id: Optional[str]
+    ) -> _SimulatedOrder:
+        order = _SimulatedOrder(next(self.__order_ids), side, order_type, price, quantity, status)
+        self.__orders[order.order_id] = order
+        if client_order_id is not None:
+            self.__client_order_ids[client_order_id] = order.order_id
+        return order
+
+    def __fill(self, order: _SimulatedOrder, sibling: _SimulatedOrder):
+        self.__execute(order.side, order.price, order.quantity)
+        order.status = 'FILLED'
+        sibling.status = 'EXPIRED'
+        if order.type == 'LIMIT_MAKER':
+            self.__open_limit_orders.remove(order)
+        else:
+            self.__open_limit_orders.remove(sibling)
+
+    def __execute(self, side: str, price: float, quantity: float) -> float:
+        notional = price * quantity
+        commission = notional * self.__fee_rate
+        if side == 'BUY':
+            self.__base = self.__base + quantity
+            self.__quote = self.__quote - notional - commission
+        else:
+            self.__base = self.__base - quantity
+            self.__quote = self.__quote + notional - commission
+        self.__fees = self.__fees + commission
+        return commission
+
+    @staticmethod
+    def __report(symbol: str, order: _SimulatedOrder) -> dict:
+        return {
+            'symbol': symbol,
+            'orderId': order.order_id,
+            'price': str(order.price),
+            'origQty': str(order.quantity),
+            'executedQty': str(order.quantity if order.status == 'FILLED' else 0.0),
+            'cummulativeQuoteQty': str(order.price * order.quantity if order.status == 'FILLED' else 0.0),
+            'status': order.status,
+            'type': order.type,
+            'side': order.side
+        }
+
+
+class SimulatedExchange:
+    def __init__(self, ticks: Iterable[Tick], fee_rate: float = 0.0):
+        self.__ticks = iter(ticks)
+        self.__next_tick = next(self.__ticks, None)
+        if self.__next_tick is None:
+            raise ReplayFinished('No ticks to replay')
+        self.__engine = MatchingEngine(self.__next_tick.close, self.__next_tick.time, fee_rate)
+        self.__now = self.__next_tick.time
+
+    def create_order(self, **params) -> dict:
+        return self.__engine.create_order(**params)
+
+    def create_oco_order(self, **params) -> dict:
+        return self.__engine.create_oco_order(**params)
+
+    def get_order(self, **params) -> dict:
+        return self.__engine.get_order(**params)
+
+    def get_open_orders(self, **params) -> list:
+        return self.__engine.get_open_orders(**params)
+
+    def advance(self, duration_in_sec: float):
+        step = int(duration_in_sec * 1000)
+        until = self.__now + step
+        open_orders = self.__engine.open_orders()
+        tick = self.__next_tick
+        while True:
+            while tick.time <= until:
+                self.__engine.match(tick)
+                tick = next(self.__ticks, None)
+                if tick is None:
+                    self.__now = until
+                    self.__engine.wait(until)
+                    raise ReplayFinished('All ticks have been replayed')
+            if not open_orders or self.__engine.open_orders() != open_orders:
+                break
+            until = until + step
+        self.__next_tick = tick
+        self.__now = until
+        self.__engine.wait(until)
+
+    def report(self) -> BacktestReport:
+        return self.__engine.report()
+
+
+class VirtualSleep(Action):
+    def __init__(self, exchange: SimulatedExchange, duration_in_sec: int):
+        self.__exchange = exchange
+        self.__duration_in_sec = duration_in_sec
+
+    def run(self):
+        self.__exchange.advance(self.__duration_in_sec)
+
+    def __str__(self):
+        return f'Virtual sleep, duration {self.__duration_in_sec} sec'
+
+
+class ReplayTradeClient(TradeClient):
+    def __init__(self, client: TradeClient, pause: Action):
+        self.__client = client
+        self.__pause = pause
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return self.__client.buy_market_order(quantity)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return self.__client.sell_market_order(quantity)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__closed(self.__client.sell_oco_order(quantity, market_price))
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__closed(self.__client.buy_oco_order(quantity, market_price))
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        return self.__client.poll_terminal_order_status(order_id)
+
+    def __closed(self, order: Order) -> Order:
+        # No virtual time passes for a bracket closed at the market, so a rejected OCO order would be rejected
+        # again at the same tick forever; the replay moves on as the live bot would while it trades
+        if isinstance(order, MarketOrder):
+            self.__pause.run()
+        return order
+
+
+def replay_trade_client(
+        exchange: SimulatedExchange,
+        raise_coefficient: Decimal,
+        decrease_coefficient: Decimal,
+        symbol: Symbol,
+        logger: logging.Logger
+) -> TradeClient:
+    # The exchange is wrapped as main.py wraps the live one, so a rejected OCO order is replaced with a closing
+    # market order instead of ending the replay
+    return ReplayTradeClient(
+        RecoveringTradeClient(
+            BasicTradeClient(
+                client=LoggingBinanceClient(exchange, logger),
+                sell_raise_coefficient=raise_coefficient,
+                sell_decrease_coefficient=decrease_coefficient,
+                buy_raise_coefficient=raise_coefficient,
+                buy_decrease_coefficient=decrease_coefficient,
+                symbol=symbol,
+                polling_pause=VirtualSleep(exchange, 2)
+            )
+        ),
+        VirtualSleep(exchange, 2)
+    )
+
+
+class Backtest:
+    def __init__(self, exchange: SimulatedExchange, bot: TradeBot):
+        self.__exchange = exchange
+        self.__bot = bot
+
+    def run(self, quantity: Quantity) -> BacktestReport:
+        try:
+            self.__bot.start(quantity)
+        except ReplayFinished:
+            pass
+        return self.__exchange.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Replays historical trades or klines through the trade strategies')
+    parser.add_argument('path', type=Path, help='a Binance trades or klines CSV file or a history store directory')
+    parser.add_argument('--klines', action='store_true', help='the file contains klines instead of trades')
+    parser.add_argument('--store', action='store_true', help='read the ticks of a symbol from a history store')
+    parser.add_argument('--symbol', default='BTCFDUSD', help='the symbol in the history store')
+    parser.add_argument('--interval', default='1m', help='the kline interval in the history store')
+    parser.add_argument('--raise-coefficient', type=Decimal, default=Decimal('1.0005'))
+    parser.add_argument('--decrease-coefficient', type=Decimal, default=Decimal('0.9995'))
+    parser.add_argument('--quantity', type=float, default=0.00088)
+    parser.add_argument('--fee-rate', type=float, default=0.0)
+    parser.add_argument('--tick-size', type=Decimal, default=Decimal('0.01'))
+    parser.add_argument('--step-size', type=Decimal, default=Decimal('0.00001'))
+    arguments = parser.parse_args()
+    if arguments.store:
+        store = MarketHistoryStore(arguments.path)
+        if arguments.klines:
+            ticks = stored_kline_ticks(store.klines(arguments.symbol, arguments.interval))
+        else:
+            ticks = stored_trade_ticks(store.aggregate_trades(arguments.symbol))
+    else:
+        ticks = kline_ticks(arguments.path) if arguments.klines else trade_ticks(arguments.path)
+    exchange = SimulatedExchange(ticks, arguments.fee_rate)
+    trade_client = replay_trade_client(
+        exchange,
+        arguments.raise_coefficient,
+        arguments.decrease_coefficient,
+        Symbol('BTCFDUSD', arguments.tick_size, arguments.step_size, Decimal(0)),
+        logging.getLogger('Exchange')
+    )
+    quantity = Quantity(arguments.quantity, arguments.step_size)
+    bot = TradeBot(
+        strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client), SellStrategy(trade_client)]),
+        strategy_changes_limit=LimitAction(5, CompositeAction([QuantityReset(quantity), VirtualSleep(exchange, 600)])),
+        expiration_limit=LimitAction(1, NoopAction()),
+        logger=logging.getLogger('Backtest')
+    )
+    print(Backtest(exchange, bot).run(quantity))
+
+
+if __name__ == '__main__':
+    main()
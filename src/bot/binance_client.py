@@ -1,11 +1,25 @@
 """This module contains a wrapper with logging and exception handling over basic Binance client"""
 
+import json
+import random
+import threading
+import time
+import uuid
 from logging import Logger
-
-from binance.exceptions import BinanceAPIException
+from pathlib import Path
+from typing import Any, Callable, Mapping, Optional
+from _decimal import Decimal
+
+import orjson
+import requests
+from binance.client import Client as BinanceClient
+from binance.exceptions import BinanceAPIException, BinanceRequestException
 from urllib3.exceptions import ReadTimeoutError
 
+from clock_sync import ClockSync
 from counter import Counter
+from http_session import HttpSessionFactory
+from metrics import Metrics
 
 
 class LoggingBinanceClient:
@@ -45,30 +59,391 @@ class LoggingBinanceClient:
             raise GetOrderException('Failed to get the order') from exception
         return response
 
+    def get_open_orders(self, **params) -> list:
+        self.__logger.debug('Getting the open orders %s', params)
+        try:
+            response = self.__binance_client.get_open_orders(**params)
+        except Exception as exception:
+            raise GetOrderException('Failed to get the open orders') from exception
+        return response
+
 
 class RetryClient:
-    def __init__(self, binance_client):
+    def __init__(
+            self,
+            binance_client,
+            retry_limit: int = 3,
+            base_delay_in_sec: float = 0.05,
+            max_delay_in_sec: float = 1,
+            order_deadline_in_sec: float = 3,
+            query_deadline_in_sec: float = 10,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+            metrics: Optional[Metrics] = None
+    ):
         self.__binance_client = binance_client
-        self.__retry_limit = 3
+        self.__retry_limit = retry_limit
+        self.__base_delay_in_sec = base_delay_in_sec
+        self.__max_delay_in_sec = max_delay_in_sec
+        self.__order_deadline_in_sec = order_deadline_in_sec
+        self.__query_deadline_in_sec = query_deadline_in_sec
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__metrics = metrics
 
     def create_order(self, **params) -> str:
-        return self.__binance_client.create_order(**params)
+        params.setdefault('newClientOrderId', _client_order_id())
+        return self.__place(
+            'create_order',
+            lambda: self.__binance_client.create_order(**params),
+            lambda: self.__landed_order(params)
+        )
 
     def create_oco_order(self, **params) -> str:
-        return self.__binance_client.create_oco_order(**params)
+        params.setdefault('listClientOrderId', _client_order_id())
+        params.setdefault('limitClientOrderId', _client_order_id())
+        params.setdefault('stopClientOrderId', _client_order_id())
+        return self.__place(
+            'create_oco_order',
+            lambda: self.__binance_client.create_oco_order(**params),
+            lambda: self.__landed_oco_order(params)
+        )
 
     def get_order(self, **params) -> str:
+        return self.__query('get_order', lambda: self.__binance_client.get_order(**params))
+
+    def get_open_orders(self, **params) -> list:
+        return self.__query('get_open_orders', lambda: self.__binance_client.get_open_orders(**params))
+
+    def __query(self, method: str, query: Callable):
+        retry_attempt = Counter(1)
+        started = self.__clock()
+        while True:
+            try:
+                return query()
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if not _is_retryable(exception):
+                    raise
+                if not self.__back_off(method, retry_attempt, started, self.__query_deadline_in_sec):
+                    raise GetOrderException("Retry limit exceeded") from exception
+
+    def __place(self, method: str, place: Callable, lookup: Callable):
         retry_attempt = Counter(1)
-        while retry_attempt.is_less_or_equal(self.__retry_limit):
+        started = self.__clock()
+        may_have_landed = False
+        while True:
             try:
-                return self.__binance_client.get_order(**params)
-            except ReadTimeoutError:
-                retry_attempt.inc()
-        raise GetOrderException("Retry limit exceeded")
+                if may_have_landed:
+                    landed_response = lookup()
+                    if landed_response is not None:
+                        return landed_response
+                return place()
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                if not _is_retryable(exception):
+                    raise
+                may_have_landed = True
+                if not self.__back_off(method, retry_attempt, started, self.__order_deadline_in_sec):
+                    raise
+
+    def __back_off(self, method: str, retry_attempt: Counter, started: float, deadline_in_sec: float) -> bool:
+        if retry_attempt.is_greater_or_equal(self.__retry_limit):
+            return False
+        exponent = retry_attempt.int_value() - 1
+        delay = random.uniform(0, min(self.__max_delay_in_sec, self.__base_delay_in_sec * 2 ** exponent))
+        if self.__clock() - started + delay > deadline_in_sec:
+            return False
+        self.__sleep(delay)
+        retry_attempt.inc()
+        if self.__metrics is not None:
+            self.__metrics.increment('binance_client_retries_total', method=method)
+        return True
+
+    def __landed_order(self, params: dict) -> Optional[dict]:
+        order = self.__order_by_client_id(params['symbol'], params['newClientOrderId'])
+        if order is None:
+            return None
+        return _landed_order(order)
+
+    def __landed_oco_order(self, params: dict) -> Optional[dict]:
+        stop_order = self.__order_by_client_id(params['symbol'], params['stopClientOrderId'])
+        limit_order = self.__order_by_client_id(params['symbol'], params['limitClientOrderId'])
+        if stop_order is None or limit_order is None:
+            return None
+        return _landed_oco_order(params, stop_order, limit_order)
+
+    def __order_by_client_id(self, symbol: str, client_order_id: str) -> Optional[dict]:
+        try:
+            return self.__binance_client.get_order(symbol=symbol, origClientOrderId=client_order_id)
+        except BinanceAPIException as binance_exception:
+            if binance_exception.code == -2013:
+                return None
+            raise
+
+
+def _client_order_id() -> str:
+    return f'trader-{uuid.uuid4().hex[:24]}'
+
+
+def _landed_order(order: dict) -> dict:
+    # An order looked up by its client id has no fills, so its average price stands for them
+    executed_quantity = Decimal(order['executedQty'])
+    if executed_quantity > 0:
+        average_price = Decimal(order['cummulativeQuoteQty']) / executed_quantity
+        order['fills'] = [{'price': str(average_price), 'qty': order['executedQty']}]
+    else:
+        order['fills'] = []
+    return order
+
+
+def _landed_oco_order(params: dict, stop_order: dict, limit_order: dict) -> dict:
+    executing = any(order['status'] in ('NEW', 'PARTIALLY_FILLED') for order in (stop_order, limit_order))
+    return {
+        'listClientOrderId': params['listClientOrderId'],
+        'listOrderStatus': 'EXECUTING' if executing else 'ALL_DONE',
+        'orderReports': [stop_order, limit_order]
+    }
+
+
+def _is_retryable(exception: Exception) -> bool:
+    if isinstance(exception, BinanceAPIException):
+        return exception.status_code >= 500 or exception.code in (-1001, -1007)
+    return isinstance(exception, (ReadTimeoutError, requests.exceptions.Timeout, requests.exceptions.ConnectionError))
+
+
+def is_transient(exception: Optional[BaseException]) -> bool:
+    # The decorators wrap the exchange errors into their own, so the whole chain of causes is checked
+    while exception is not None:
+        if _is_retryable(exception):
+            return True
+        exception = exception.__cause__
+    return False
+
+
+class TimingBinanceClient:
+    def __init__(self, binance_client, metrics: Metrics, layer: str):
+        self.__binance_client = binance_client
+        self.__create_order = metrics.histogram('binance_client_seconds', layer=layer, method='create_order')
+        self.__create_oco_order = metrics.histogram('binance_client_seconds', layer=layer, method='create_oco_order')
+        self.__get_order = metrics.histogram('binance_client_seconds', layer=layer, method='get_order')
+        self.__get_open_orders = metrics.histogram('binance_client_seconds', layer=layer, method='get_open_orders')
+
+    def create_order(self, **params) -> str:
+        started = time.perf_counter_ns()
+        try:
+            return self.__binance_client.create_order(**params)
+        finally:
+            self.__create_order.record(time.perf_counter_ns() - started)
+
+    def create_oco_order(self, **params) -> str:
+        started = time.perf_counter_ns()
+        try:
+            return self.__binance_client.create_oco_order(**params)
+        finally:
+            self.__create_oco_order.record(time.perf_counter_ns() - started)
+
+    def get_order(self, **params) -> str:
+        started = time.perf_counter_ns()
+        try:
+            return self.__binance_client.get_order(**params)
+        finally:
+            self.__get_order.record(time.perf_counter_ns() - started)
+
+    def get_open_orders(self, **params) -> list:
+        started = time.perf_counter_ns()
+        try:
+            return self.__binance_client.get_open_orders(**params)
+        finally:
+            self.__get_open_orders.record(time.perf_counter_ns() - started)
+
+    def get_exchange_info(self) -> dict:
+        return self.__binance_client.get_exchange_info()
+
+    def get_order_book(self, **params) -> dict:
+        return self.__binance_client.get_order_book(**params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__binance_client.stream_get_listen_key()
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__binance_client.stream_keepalive(listen_key)
+
+    def response_headers(self) -> Mapping[str, str]:
+        return self.__binance_client.response_headers()
+
+
+class RequestWeightLimiter:
+    def __init__(
+            self,
+            weight_limit_per_minute: int = 6000,
+            order_limit_per_10_sec: int = 50,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self.__weight_limit = weight_limit_per_minute
+        self.__order_limit = order_limit_per_10_sec
+        self.__clock = clock
+        self.__sleep = sleep
+        self.__lock = threading.Lock()
+        self.__weight_tokens = float(weight_limit_per_minute)
+        self.__order_tokens = float(order_limit_per_10_sec)
+        self.__refilled_at = clock()
+        self.__paused_until = 0.0
+        self.__used_weight = 0
+        self.__throttled_calls = 0
+        self.__throttled_sec = 0.0
+
+    def acquire(self, weight: int, orders: int = 0):
+        throttled = False
+        while True:
+            with self.__lock:
+                self.__refill()
+                now = self.__clock()
+                if now >= self.__paused_until and self.__weight_tokens >= weight and self.__order_tokens >= orders:
+                    self.__weight_tokens = self.__weight_tokens - weight
+                    self.__order_tokens = self.__order_tokens - orders
+                    if throttled:
+                        self.__throttled_calls = self.__throttled_calls + 1
+                    return
+                delay = max(
+                    self.__paused_until - now,
+                    (weight - self.__weight_tokens) * 60 / self.__weight_limit,
+                    (orders - self.__order_tokens) * 10 / self.__order_limit
+                )
+                self.__throttled_sec = self.__throttled_sec + delay
+            throttled = True
+            self.__sleep(delay)
+
+    def observe(self, headers: Mapping[str, str]):
+        with self.__lock:
+            used_weight = headers.get('x-mbx-used-weight-1m')
+            if used_weight is not None:
+                self.__used_weight = int(used_weight)
+                self.__weight_tokens = min(self.__weight_tokens, self.__weight_limit - self.__used_weight)
+            order_count = headers.get('x-mbx-order-count-10s')
+            if order_count is not None:
+                self.__order_tokens = min(self.__order_tokens, self.__order_limit - int(order_count))
+
+    def pause(self, duration_in_sec: float):
+        with self.__lock:
+            self.__paused_until = max(self.__paused_until, self.__clock() + duration_in_sec)
+
+    def metrics(self) -> dict[str, float]:
+        with self.__lock:
+            self.__refill()
+            return {
+                'weight_limit': self.__weight_limit,
+                'weight_available': self.__weight_tokens,
+                'weight_used_reported': self.__used_weight,
+                'orders_limit': self.__order_limit,
+                'orders_available': self.__order_tokens,
+                'throttled_calls_total': self.__throttled_calls,
+                'throttled_seconds_total': self.__throttled_sec
+            }
+
+    def __refill(self):
+        now = self.__clock()
+        elapsed = now - self.__refilled_at
+        self.__refilled_at = now
+        self.__weight_tokens = min(self.__weight_limit, self.__weight_tokens + elapsed * self.__weight_limit / 60)
+        self.__order_tokens = min(self.__order_limit, self.__order_tokens + elapsed * self.__order_limit / 10)
+
+
+# Request weights of the order and user data stream endpoints; market data endpoints weigh the same for spot and margin
+SPOT_REQUEST_WEIGHTS = {
+    'create_order': 1,
+    'create_oco_order': 1,
+    'get_order': 4,
+    'get_open_orders': 6,
+    'get_all_open_orders': 80,
+    'stream_get_listen_key': 2,
+    'stream_keepalive': 2
+}
+
+MARGIN_REQUEST_WEIGHTS = {
+    'create_order': 6,
+    'create_oco_order': 6,
+    'get_order': 10,
+    'get_open_orders': 10,
+    'get_all_open_orders': 10,
+    'stream_get_listen_key': 1,
+    'stream_keepalive': 1
+}
+
+
+class RateLimitClient:
+    def __init__(self, binance_client, limiter: RequestWeightLimiter, weights: Optional[Mapping[str, int]] = None):
+        self.__binance_client = binance_client
+        self.__limiter = limiter
+        self.__weights = weights if weights is not None else SPOT_REQUEST_WEIGHTS
+
+    def create_order(self, **params) -> str:
+        return self.__call(self.__binance_client.create_order, self.__weights['create_order'], 1, **params)
+
+    def create_oco_order(self, **params) -> str:
+        return self.__call(self.__binance_client.create_oco_order, self.__weights['create_oco_order'], 2, **params)
+
+    def get_order(self, **params) -> str:
+        return self.__call(self.__binance_client.get_order, self.__weights['get_order'], 0, **params)
+
+    def get_open_orders(self, **params) -> list:
+        weight = self.__weights['get_open_orders' if 'symbol' in params else 'get_all_open_orders']
+        return self.__call(self.__binance_client.get_open_orders, weight, 0, **params)
+
+    def get_exchange_info(self) -> dict:
+        return self.__call(self.__binance_client.get_exchange_info, 20, 0)
+
+    def get_order_book(self, **params) -> dict:
+        limit = params.get('limit', 100)
+        weight = 5 if limit <= 100 else 25 if limit <= 500 else 50 if limit <= 1000 else 250
+        return self.__call(self.__binance_client.get_order_book, weight, 0, **params)
+
+    def get_klines(self, **params) -> list:
+        return self.__call(self.__binance_client.get_klines, 2, 0, **params)
+
+    def get_aggregate_trades(self, **params) -> list:
+        return self.__call(self.__binance_client.get_aggregate_trades, 4, 0, **params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__call(self.__binance_client.stream_get_listen_key, self.__weights['stream_get_listen_key'], 0)
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__call(
+            self.__binance_client.stream_keepalive, self.__weights['stream_keepalive'], 0, listen_key
+        )
+
+    def __call(self, method: Callable, weight: int, orders: int, *args, **params):
+        self.__limiter.acquire(weight, orders)
+        try:
+            response = method(*args, **params)
+        except BinanceAPIException as binance_exception:
+            # The exchange answered, so the headers are the ones of this request and not of an earlier one
+            if binance_exception.status_code in (418, 429):
+                self.__limiter.pause(float(binance_exception.response.headers.get('retry-after', 60)))
+            self.__limiter.observe(self.__binance_client.response_headers())
+            raise
+        self.__limiter.observe(self.__binance_client.response_headers())
+        return response
+
+
+class LeanBinanceClient(BinanceClient):
+
+    @staticmethod
+    def _handle_response(response: requests.Response):
+        # The body is parsed straight from the bytes with orjson instead of being decoded to text first
+        if not 200 <= response.status_code < 300:
+            raise BinanceAPIException(response, response.status_code, response.text)
+        if not response.content:
+            return {}
+        try:
+            return orjson.loads(response.content)
+        except orjson.JSONDecodeError as exception:
+            raise BinanceRequestException(f'Invalid Response: {response.text}') from exception
 
 
 class SpotClient:
-    def __init__(self, binance_client):
+    def __init__(self, binance_client, session_factory: Optional[HttpSessionFactory] = None):
+        if session_factory is not None:
+            binance_client.session = session_factory.session(binance_client.session.headers)
         self.__binance_client = binance_client
 
     def create_order(self, **params) -> str:
@@ -80,9 +455,36 @@ class SpotClient:
     def get_order(self, **params) -> str:
         return self.__binance_client.get_order(**params)
 
+    def get_open_orders(self, **params) -> list:
+        return self.__binance_client.get_open_orders(**params)
+
+    def get_exchange_info(self) -> dict:
+        return self.__binance_client.get_exchange_info()
+
+    def get_order_book(self, **params) -> dict:
+        return self.__binance_client.get_order_book(**params)
+
+    def get_klines(self, **params) -> list:
+        return self.__binance_client.get_klines(**params)
+
+    def get_aggregate_trades(self, **params) -> list:
+        return self.__binance_client.get_aggregate_trades(**params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__binance_client.stream_get_listen_key()
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__binance_client.stream_keepalive(listen_key)
+
+    def response_headers(self) -> Mapping[str, str]:
+        response = self.__binance_client.response
+        return response.headers if response is not None else {}
+
 
 class MarginClient:
-    def __init__(self, binance_client):
+    def __init__(self, binance_client, session_factory: Optional[HttpSessionFactory] = None):
+        if session_factory is not None:
+            binance_client.session = session_factory.session(binance_client.session.headers)
         self.__binance_client = binance_client
 
     def create_order(self, **params) -> str:
@@ -94,6 +496,164 @@ class MarginClient:
     def get_order(self, **params) -> str:
         return self.__binance_client.get_margin_order(**params)
 
+    def get_open_orders(self, **params) -> list:
+        return self.__binance_client.get_open_margin_orders(**params)
+
+    def get_exchange_info(self) -> dict:
+        return self.__binance_client.get_exchange_info()
+
+    def get_order_book(self, **params) -> dict:
+        return self.__binance_client.get_order_book(**params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__binance_client.margin_stream_get_listen_key()
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__binance_client.margin_stream_keepalive(listen_key)
+
+    def response_headers(self) -> Mapping[str, str]:
+        response = self.__binance_client.response
+        return response.headers if response is not None else {}
+
+
+class ClockSyncClient:
+    def __init__(self, binance_client, clock_sync: ClockSync, clock: Callable[[], float] = time.time):
+        self.__binance_client = binance_client
+        self.__clock_sync = clock_sync
+        self.__clock = clock
+
+    def create_order(self, **params) -> str:
+        return self.__signed(lambda: self.__binance_client.create_order(**params))
+
+    def create_oco_order(self, **params) -> str:
+        return self.__signed(lambda: self.__binance_client.create_oco_order(**params))
+
+    def get_order(self, **params) -> str:
+        return self.__signed(lambda: self.__binance_client.get_order(**params))
+
+    def get_open_orders(self, **params) -> list:
+        return self.__signed(lambda: self.__binance_client.get_open_orders(**params))
+
+    def get_exchange_info(self) -> dict:
+        return self.__binance_client.get_exchange_info()
+
+    def get_order_book(self, **params) -> dict:
+        return self.__binance_client.get_order_book(**params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__binance_client.stream_get_listen_key()
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__binance_client.stream_keepalive(listen_key)
+
+    def response_headers(self) -> Mapping[str, str]:
+        return self.__binance_client.response_headers()
+
+    def __signed(self, call: Callable):
+        try:
+            return self.__observed(call)
+        except BinanceAPIException as binance_exception:
+            if binance_exception.code != -1021:
+                raise
+        # A request outside the recvWindow is rejected before it reaches the matching engine,
+        # so it is safe to send it again once the clock is synchronized
+        self.__clock_sync.sync()
+        return self.__observed(call)
+
+    def __observed(self, call: Callable):
+        sent = self.__clock()
+        try:
+            response = call()
+        except BinanceAPIException:
+            # The exchange answered with an error, so the round trip and the Date header are still measured; a
+            # transport error has neither, and the headers left over would be those of an earlier response
+            self.__observe(sent)
+            raise
+        self.__observe(sent)
+        return response
+
+    def __observe(self, sent: float):
+        self.__clock_sync.observe(self.__binance_client.response_headers(), sent, self.__clock())
+
+
+class LazyClient:
+    def __init__(self, factory: Callable[[], Any]):
+        self.__factory = factory
+        self.__binance_client = None
+        self.__lock = threading.Lock()
+
+    def is_built(self) -> bool:
+        return self.__binance_client is not None
+
+    def create_order(self, **params) -> str:
+        return self.__client().create_order(**params)
+
+    def create_oco_order(self, **params) -> str:
+        return self.__client().create_oco_order(**params)
+
+    def get_order(self, **params) -> str:
+        return self.__client().get_order(**params)
+
+    def get_open_orders(self, **params) -> list:
+        return self.__client().get_open_orders(**params)
+
+    def get_exchange_info(self) -> dict:
+        return self.__client().get_exchange_info()
+
+    def get_order_book(self, **params) -> dict:
+        return self.__client().get_order_book(**params)
+
+    def stream_get_listen_key(self) -> str:
+        return self.__client().stream_get_listen_key()
+
+    def stream_keepalive(self, listen_key: str):
+        return self.__client().stream_keepalive(listen_key)
+
+    def response_headers(self) -> Mapping[str, str]:
+        if self.__binance_client is None:
+            return {}
+        return self.__binance_client.response_headers()
+
+    def __client(self):
+        binance_client = self.__binance_client
+        if binance_client is None:
+            # The first caller builds the client while the others wait for it, so it is built once
+            with self.__lock:
+                if self.__binance_client is None:
+                    self.__binance_client = self.__factory()
+                binance_client = self.__binance_client
+        return binance_client
+
+
+class CachingTimeOffsetLoader:
+    def __init__(
+            self,
+            binance_client,
+            cache_path: Path,
+            ttl_in_sec: float = 3600,
+            clock: Callable[[], float] = time.time
+    ):
+        self.__binance_client = binance_client
+        self.__cache_path = cache_path
+        self.__ttl_in_sec = ttl_in_sec
+        self.__clock = clock
+
+    def load(self) -> int:
+        if self.__cache_path.exists():
+            with self.__cache_path.open() as cache:
+                cached = json.load(cache)
+            if self.__clock() - cached['measured_at'] <= self.__ttl_in_sec:
+                return cached['offset_in_ms']
+        # The server time is compared with the middle of the round trip, which halves the error of the estimate
+        sent = self.__clock()
+        server_time_in_ms = self.__binance_client.get_server_time()['serverTime']
+        received = self.__clock()
+        offset_in_ms = int(server_time_in_ms - (sent + received) / 2 * 1000)
+        self.__cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.__cache_path.open('w') as cache:
+            json.dump({'offset_in_ms': offset_in_ms, 'measured_at': received}, cache)
+        return offset_in_ms
+
 
 class BinanceClientException(Exception):
     def __init__(self, message: str):
@@ -0,0 +1,134 @@
+"""This module contains a clock synchronizer keeping signed requests within the exchange's recvWindow
+
+The offset to the exchange time is measured against the middle of a server time round trip and smoothed, and
+every response's Date header is checked against it, so a stepped local clock triggers a new measurement before
+a signed request is rejected with -1021. The recvWindow follows the observed latency the way a TCP
+retransmission timeout follows the round trip time.
+"""
+import email.utils
+import math
+import threading
+import time
+from logging import Logger
+from typing import Callable, Mapping
+
+
+class ClockSync:
+    def __init__(
+            self,
+            binance_client,
+            logger: Logger,
+            offset_in_ms: int = 0,
+            sync_interval_in_sec: float = 60,
+            alpha: float = 0.25,
+            min_recv_window_in_ms: int = 5000,
+            max_recv_window_in_ms: int = 60000,
+            step_threshold_in_ms: int = 1000,
+            clock: Callable[[], float] = time.time
+    ):
+        self.__binance_client = binance_client
+        self.__logger = logger
+        self.__offset_in_ms = float(offset_in_ms)
+        self.__offset_error_in_ms = 0.0
+        self.__synced = False
+        self.__sync_interval_in_sec = sync_interval_in_sec
+        self.__alpha = alpha
+        self.__min_recv_window_in_ms = min_recv_window_in_ms
+        self.__max_recv_window_in_ms = max_recv_window_in_ms
+        self.__step_threshold_in_ms = step_threshold_in_ms
+        self.__clock = clock
+        self.__latency_in_ms = None
+        self.__latency_deviation_in_ms = 0.0
+        self.__recv_window_in_ms = binance_client.REQUEST_RECVWINDOW
+        self.__lock = threading.Lock()
+        self.__sync_requested = threading.Event()
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='clock-sync', daemon=True)
+        self.__apply()
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__sync_requested.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def sync(self):
+        sent = self.__clock()
+        server_time_in_ms = self.__binance_client.get_server_time()['serverTime']
+        received = self.__clock()
+        round_trip_in_ms = (received - sent) * 1000
+        offset_in_ms = server_time_in_ms - (sent + received) / 2 * 1000
+        with self.__lock:
+            # A step of the local clock is taken at once, while the jitter of the measurements is smoothed
+            if not self.__synced or abs(offset_in_ms - self.__offset_in_ms) > self.__step_threshold_in_ms:
+                self.__offset_in_ms = offset_in_ms
+            else:
+                self.__offset_in_ms += self.__alpha * (offset_in_ms - self.__offset_in_ms)
+            self.__offset_error_in_ms = round_trip_in_ms / 2
+            self.__synced = True
+            self.__observe_latency(round_trip_in_ms)
+            self.__apply()
+        self.__logger.debug(
+            'Clock offset %.0f ms, recvWindow %s ms', self.__offset_in_ms, self.__recv_window_in_ms
+        )
+
+    def observe(self, headers: Mapping[str, str], sent: float, received: float):
+        with self.__lock:
+            self.__observe_latency((received - sent) * 1000)
+            self.__apply()
+        date = headers.get('Date')
+        if date is None:
+            return
+        # The Date header has a resolution of a second, so it can only tell a clearly wrong offset
+        server_time_in_ms = email.utils.parsedate_to_datetime(date).timestamp() * 1000
+        estimated_in_ms = received * 1000 + self.__offset_in_ms
+        margin_in_ms = (received - sent) * 1000 + self.__step_threshold_in_ms
+        if not server_time_in_ms - margin_in_ms <= estimated_in_ms <= server_time_in_ms + 1000 + margin_in_ms:
+            self.request_sync()
+
+    def request_sync(self):
+        self.__sync_requested.set()
+
+    def offset_in_ms(self) -> int:
+        return int(self.__offset_in_ms)
+
+    def recv_window_in_ms(self) -> int:
+        return self.__recv_window_in_ms
+
+    def __observe_latency(self, round_trip_in_ms: float):
+        if self.__latency_in_ms is None:
+            self.__latency_in_ms = round_trip_in_ms
+            self.__latency_deviation_in_ms = round_trip_in_ms / 2
+        else:
+            self.__latency_deviation_in_ms += self.__alpha * (
+                    abs(round_trip_in_ms - self.__latency_in_ms) - self.__latency_deviation_in_ms
+            )
+            self.__latency_in_ms += self.__alpha * (round_trip_in_ms - self.__latency_in_ms) / 2
+
+    def __apply(self):
+        # The window never drops below the floor: a GC pause or a retransmit costs more than a few seconds of
+        # replay exposure, and Binance's own default is 5000 ms
+        if self.__latency_in_ms is not None:
+            recv_window_in_ms = math.ceil(
+                self.__latency_in_ms + 4 * self.__latency_deviation_in_ms + self.__offset_error_in_ms
+            )
+            self.__recv_window_in_ms = min(
+                self.__max_recv_window_in_ms, max(self.__min_recv_window_in_ms, recv_window_in_ms)
+            )
+        # python-binance stamps every signed request with these two attributes of the client
+        self.__binance_client.timestamp_offset = int(self.__offset_in_ms)
+        self.__binance_client.REQUEST_RECVWINDOW = self.__recv_window_in_ms
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            self.__sync_requested.wait(self.__sync_interval_in_sec)
+            self.__sync_requested.clear()
+            if self.__stopped.is_set():
+                return
+            try:
+                self.sync()
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                self.__logger.warning('Failed to synchronize the clock: %s', exception)
@@ -17,5 +17,8 @@ class Counter:
     def is_less_or_equal(self, value: int) -> bool:
         return self.__counter <= value
 
+    def int_value(self) -> int:
+        return self.__counter
+
     def __str__(self) -> str:
         return str(self.__counter)
@@ -0,0 +1,226 @@
+"""This module contains a local exchange simulator for load-testing the full client stack without network
+
+ExchangeSimulator looks like python-binance's Client to SpotClient and MarginClient and can be used in process.
+ExchangeSimulatorServer serves the same simulator over the REST paths python-binance requests, so a real
+Client pointed at it exercises the HTTP session too. Prices follow a random walk in wall-clock time and
+orders are matched by the backtester's matching engine; latency, errors and timeouts are injected at random.
+"""
+import json
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Optional
+from urllib.parse import parse_qsl, urlparse
+
+from binance.exceptions import BinanceAPIException
+from urllib3.exceptions import ReadTimeoutError
+
+from backtest import MatchingEngine, Tick
+from symbol_registry import Symbol
+
+
+class RandomWalk:
+    def __init__(
+            self,
+            start_price: float,
+            volatility_per_sqrt_sec: float,
+            step_in_sec: float = 0.01,
+            seed: Optional[int] = None,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.__price = start_price
+        self.__step_volatility = volatility_per_sqrt_sec * math.sqrt(step_in_sec)
+        self.__step_in_sec = step_in_sec
+        self.__random = random.Random(seed)
+        self.__clock = clock
+        self.__started = clock()
+        self.__steps = 0
+
+    def tick(self) -> Tick:
+        steps = int((self.__clock() - self.__started) / self.__step_in_sec)
+        low = high = self.__price
+        for _ in range(min(steps - self.__steps, 10000)):
+            self.__price = self.__price + self.__random.gauss(0, self.__step_volatility)
+            low = min(low, self.__price)
+            high = max(high, self.__price)
+        self.__steps = max(steps, self.__steps)
+        return Tick(int(time.time() * 1000), low, high, self.__price)
+
+
+class ExchangeSimulator:
+    def __init__(
+            self,
+            prices: RandomWalk,
+            symbol: Symbol,
+            latency_in_sec: float = 0.0,
+            latency_jitter_in_sec: float = 0.0,
+            error_rate: float = 0.0,
+            timeout_rate: float = 0.0,
+            seed: Optional[int] = None,
+            sleep: Callable[[float], None] = time.sleep
+    ):
+        self.__prices = prices
+        self.__symbol = symbol
+        self.__latency_in_sec = latency_in_sec
+        self.__latency_jitter_in_sec = latency_jitter_in_sec
+        self.__error_rate = error_rate
+        self.__timeout_rate = timeout_rate
+        self.__random = random.Random(seed)
+        self.__sleep = sleep
+        tick = prices.tick()
+        self.__engine = MatchingEngine(tick.close, tick.time)
+        self.__lock = threading.Lock()
+        self.response = None
+
+    def create_order(self, **params) -> dict:
+        return self.__call('order', lambda: self.__engine.create_order(**params))
+
+    def create_oco_order(self, **params) -> dict:
+        return self.__call('order/oco', lambda: self.__engine.create_oco_order(**params))
+
+    def get_order(self, **params) -> dict:
+        return self.__call('order', lambda: self.__engine.get_order(**params))
+
+    def get_open_orders(self, **params) -> list:
+        return self.__call('openOrders', lambda: self.__engine.get_open_orders(**params))
+
+    def get_exchange_info(self) -> dict:
+        return {
+            'symbols': [
+                {
+                    'symbol': self.__symbol.name(),
+                    'filters': [
+                        {'filterType': 'PRICE_FILTER', 'tickSize': str(self.__symbol.tick_size())},
+                        {'filterType': 'LOT_SIZE', 'stepSize': str(self.__symbol.step_size())},
+                        {'filterType': 'NOTIONAL', 'minNotional': str(self.__symbol.min_notional())}
+                    ]
+                }
+            ]
+        }
+
+    def stream_get_listen_key(self) -> str:
+        return 'simulator-listen-key'
+
+    def stream_keepalive(self, listen_key: str) -> dict:
+        return {}
+
+    def create_margin_order(self, **params) -> dict:
+        return self.create_order(**params)
+
+    def create_margin_oco_order(self, **params) -> dict:
+        return self.create_oco_order(**params)
+
+    def get_margin_order(self, **params) -> dict:
+        return self.get_order(**params)
+
+    def get_open_margin_orders(self, **params) -> list:
+        return self.get_open_orders(**params)
+
+    def margin_stream_get_listen_key(self) -> str:
+        return self.stream_get_listen_key()
+
+    def margin_stream_keepalive(self, listen_key: str) -> dict:
+        return self.stream_keepalive(listen_key)
+
+    def report(self):
+        with self.__lock:
+            return self.__engine.report()
+
+    def __call(self, path: str, request: Callable):
+        self.__sleep(max(0.0, self.__random.gauss(self.__latency_in_sec, self.__latency_jitter_in_sec)))
+        if self.__random.random() < self.__error_rate:
+            raise BinanceAPIException(
+                None, 503, json.dumps({'code': -1001, 'msg': 'Internal error; unable to process your request.'})
+            )
+        with self.__lock:
+            self.__engine.match(self.__prices.tick())
+            response = request()
+        if self.__random.random() < self.__timeout_rate:
+            raise ReadTimeoutError(None, f'/api/v3/{path}', 'Read timed out')
+        return response
+
+
+class ExchangeSimulatorServer:
+    def __init__(self, simulator: ExchangeSimulator, host: str = 'localhost', port: int = 0):
+        routes = {
+            ('POST', '/api/v3/order'): simulator.create_order,
+            ('POST', '/api/v3/order/oco'): simulator.create_oco_order,
+            ('POST', '/api/v3/orderList/oco'): simulator.create_oco_order,
+            ('GET', '/api/v3/order'): simulator.get_order,
+            ('GET', '/api/v3/openOrders'): simulator.get_open_orders,
+            ('GET', '/api/v3/exchangeInfo'): lambda: simulator.get_exchange_info(),
+            ('GET', '/api/v3/ping'): lambda: {},
+            ('POST', '/api/v3/userDataStream'): lambda: {'listenKey': simulator.stream_get_listen_key()},
+            ('PUT', '/api/v3/userDataStream'): lambda listenKey: simulator.stream_keepalive(listenKey),
+            ('POST', '/sapi/v1/margin/order'): simulator.create_margin_order,
+            ('POST', '/sapi/v1/margin/order/oco'): simulator.create_margin_oco_order,
+            ('GET', '/sapi/v1/margin/order'): simulator.get_margin_order,
+            ('GET', '/sapi/v1/margin/openOrders'): simulator.get_open_margin_orders,
+            ('POST', '/sapi/v1/userDataStream'): lambda: {'listenKey': simulator.margin_stream_get_listen_key()},
+            ('PUT', '/sapi/v1/userDataStream'): lambda listenKey: simulator.margin_stream_keepalive(listenKey)
+        }
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                self.__handle('GET')
+
+            def do_POST(self):
+                self.__handle('POST')
+
+            def do_PUT(self):
+                self.__handle('PUT')
+
+            def __handle(self, method: str):
+                url = urlparse(self.path)
+                length = int(self.headers.get('Content-Length', 0))
+                params = dict(parse_qsl(url.query))
+                params.update(parse_qsl(self.rfile.read(length).decode()))
+                params.pop('timestamp', None)
+                params.pop('signature', None)
+                params.pop('recvWindow', None)
+                if 'orderId' in params:
+                    params['orderId'] = int(params['orderId'])
+                route = routes.get((method, url.path))
+                if route is None:
+                    self.__respond(404, {'code': -1000, 'msg': f'Unknown path {url.path}'})
+                    return
+                try:
+                    self.__respond(200, route(**params))
+                except BinanceAPIException as exception:
+                    self.__respond(exception.status_code, {'code': exception.code, 'msg': exception.message})
+                except ReadTimeoutError:
+                    # The client sees the connection drop after the request has been processed
+                    self.close_connection = True
+
+            def __respond(self, status: int, body):
+                encoded_body = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(encoded_body)))
+                self.end_headers()
+                self.wfile.write(encoded_body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__server.daemon_threads = True
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='exchange-simulator', daemon=True)
+
+    def api_url(self) -> str:
+        return f'http://{self.__server.server_address[0]}:{self.__server.server_port}/api'
+
+    def margin_api_url(self) -> str:
+        return f'http://{self.__server.server_address[0]}:{self.__server.server_port}/sapi'
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -1,19 +1,151 @@
-"""This module contains a default logger factory"""
+"""This module contains a default logger factory and a queue-based logging backend
 
+With a backend the trading threads only put records into a queue: a listener thread formats them lazily and
+writes them to the console and to size-rotated JSON files, so no formatting or I/O happens on the hot path.
+"""
+
+import json
 import logging
 import sys
-from logging import Logger, StreamHandler, Formatter
+import time
+from logging import Filter, Formatter, Handler, Logger, LogRecord, StreamHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from pathlib import Path
+from queue import SimpleQueue
+from typing import Callable, Optional
+
+
+class JsonFormatter(Formatter):
+    def format(self, record: LogRecord) -> str:
+        entry = {
+            'time': self.formatTime(record),
+            'level': record.levelname,
+            'logger': record.name.strip(),
+            'thread': record.threadName,
+            'message': record.getMessage()
+        }
+        if getattr(record, 'suppressed', 0):
+            entry['suppressed'] = record.suppressed
+        if record.exc_info:
+            entry['exception'] = self.formatException(record.exc_info)
+        return json.dumps(entry)
+
+    def formatTime(self, record: LogRecord, datefmt: Optional[str] = None) -> str:
+        return time.strftime('%Y-%m-%dT%H:%M:%S', time.gmtime(record.created)) + f'.{int(record.msecs):03d}Z'
+
+
+class ConsoleFormatter(Formatter):
+    def __init__(self, default_format: str):
+        super().__init__(default_format)
+        self.__formatters: dict[str, Formatter] = {}
+
+    def format(self, record: LogRecord) -> str:
+        console_format = getattr(record, 'console_format', None)
+        if console_format is None:
+            return super().format(record)
+        formatter = self.__formatters.get(console_format)
+        if formatter is None:
+            formatter = self.__formatters.setdefault(console_format, Formatter(console_format))
+        return formatter.format(record)
+
+
+class LazyQueueHandler(QueueHandler):
+    def __init__(self, queue: SimpleQueue, console_format: str):
+        super().__init__(queue)
+        self.__console_format = console_format
+
+    def prepare(self, record: LogRecord) -> LogRecord:
+        # The queue never leaves the process, so the message and its arguments are left for the listener to format
+        record.console_format = self.__console_format
+        return record
+
+
+class RateLimitFilter(Filter):
+    def __init__(self, interval_in_sec: float, clock: Callable[[], float] = time.monotonic):
+        super().__init__()
+        self.__interval_in_sec = interval_in_sec
+        self.__clock = clock
+        self.__last_emitted: dict[str, float] = {}
+        self.__suppressed: dict[str, int] = {}
+
+    def interval_in_sec(self) -> float:
+        return self.__interval_in_sec
+
+    def filter(self, record: LogRecord) -> bool:
+        # Only the verbose messages are sampled; a repeated warning or error is worth every line
+        if record.levelno >= logging.WARNING:
+            return True
+        key = record.msg if isinstance(record.msg, str) else type(record.msg).__name__
+        now = self.__clock()
+        last_emitted = self.__last_emitted.get(key)
+        if last_emitted is not None and now - last_emitted < self.__interval_in_sec:
+            self.__suppressed[key] = self.__suppressed.get(key, 0) + 1
+            return False
+        self.__last_emitted[key] = now
+        record.suppressed = self.__suppressed.pop(key, 0)
+        return True
+
+
+class LoggingBackend:
+    def __init__(self, handlers: list[Handler]):
+        self.__queue = SimpleQueue()
+        self.__handlers = handlers
+        self.__listener = QueueListener(self.__queue, *handlers, respect_handler_level=True)
+
+    def queue(self) -> SimpleQueue:
+        return self.__queue
+
+    def start(self):
+        self.__listener.start()
+
+    def stop(self):
+        self.__listener.stop()
+        for handler in self.__handlers:
+            handler.close()
+
+    @staticmethod
+    def console_and_file(
+            console_format: str,
+            log_path: Path,
+            max_bytes: int = 10 * 1024 * 1024,
+            backup_count: int = 5
+    ) -> 'LoggingBackend':
+        stream_handler = StreamHandler(stream=sys.stdout)
+        stream_handler.setFormatter(ConsoleFormatter(console_format))
+        log_path.parent.mkdir(parents=True, exist_ok=True)
+        file_handler = RotatingFileHandler(log_path, maxBytes=max_bytes, backupCount=backup_count, encoding='utf-8')
+        file_handler.setFormatter(JsonFormatter())
+        return LoggingBackend([stream_handler, file_handler])
 
 
 class LoggerFactory:
-    def __init__(self, format: str, level: int):
+    def __init__(self, format: str, level: int, backend: Optional[LoggingBackend] = None):
         self.__format = format
         self.__level = level
+        self.__backend = backend
 
-    def logger(self, name: str) -> Logger:
-        stream_handler = StreamHandler(stream=sys.stdout)
-        stream_handler.setFormatter(Formatter(self.__format))
+    def logger(self, name: str, rate_limit_in_sec: Optional[float] = None) -> Logger:
         logger = logging.getLogger(name)
         logger.setLevel(self.__level)
-        logger.addHandler(stream_handler)
+        if not logger.handlers:
+            logger.addHandler(self.__handler())
+        if rate_limit_in_sec is not None:
+            self.__rate_limit(logger, rate_limit_in_sec)
         return logger
+
+    @staticmethod
+    def __rate_limit(logger: Logger, rate_limit_in_sec: float):
+        # A logger is shared by name, so a later call with another rate limit replaces the one set before
+        rate_limit_filters = [log_filter for log_filter in logger.filters if isinstance(log_filter, RateLimitFilter)]
+        if any(log_filter.interval_in_sec() == rate_limit_in_sec for log_filter in rate_limit_filters):
+            return
+        for log_filter in rate_limit_filters:
+            logger.removeFilter(log_filter)
+        logger.addFilter(RateLimitFilter(rate_limit_in_sec))
+
+    def __handler(self) -> Handler:
+        if self.__backend is not None:
+            return LazyQueueHandler(self.__backend.queue(), self.__format)
+        stream_handler = StreamHandler(stream=sys.stdout)
+        stream_handler.setFormatter(Formatter(self.__format))
+        return stream_handler
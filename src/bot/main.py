@@ -1,59 +1,185 @@
-"""This script runs the application"""
-from logging import DEBUG
-from _decimal import Decimal
+"""This script runs the application
 
-from binance.client import Client as BinanceClient
+Nothing talks to the exchange until the first order needs it: the REST client is built lazily, the exchange info
+and the server time offset are read from an on-disk cache while they are fresh, and the user data and market data
+streams start with the first order, so a restart goes straight to it.
+"""
+import atexit
+import time
+from logging import DEBUG, Logger
+from pathlib import Path
+from typing import Callable
+from _decimal import Decimal
 
-from binance_client import LoggingBinanceClient, MarginClient, SpotClient, RetryClient
+from binance_client import (
+    CachingTimeOffsetLoader, ClockSyncClient, LazyClient, LeanBinanceClient, LoggingBinanceClient, MarginClient,
+    SpotClient, RetryClient, RateLimitClient, RequestWeightLimiter, TimingBinanceClient
+)
+from clock_sync import ClockSync
+from metrics import CycleBreakdown, Metrics, MetricsServer
+from http_session import HttpSessionFactory
 from action import Sleep, NoopAction, LoggingAction, LimitAction, Exit, CompositeAction, QuantityReset
 from quantity import Quantity
-from logger_factory import LoggerFactory
+from symbol_registry import CachingSymbolRegistryLoader
+from logger_factory import LoggerFactory, LoggingBackend
+from market_data import MarketDataRegistry, MarketDataStream
 from trade_bot import TradeBot
-from trade_client import BasicTradeClient, LoggingTradeClient, RecoveringTradeClient
-from trade_strategy import CycleTradeStrategySupplier, BuyStrategy, SellStrategy, LoggingTradeStrategySupplier
-
-logger_factory = LoggerFactory('%(asctime)s %(name)s: %(message)s', DEBUG)
-red_logger_factory = LoggerFactory("\x1b[31;20m%(asctime)s %(name)s: %(message)s\x1b[0m", DEBUG)
-trade_client = LoggingTradeClient(
-    RecoveringTradeClient(
-        BasicTradeClient(
-            client=LoggingBinanceClient(
-                RetryClient(
-                    SpotClient(
-                        BinanceClient(
-                            'api-key',
-                            'api-secret'
-                        )
+from order_status_coordinator import OrderStatusCoordinator
+from trade_client import (
+    BasicTradeClient, LoggingTradeClient, RecoveringTradeClient, StreamingTradeClient, CoordinatedTradeClient,
+    EntryGapTradeClient, TimingTradeClient, JournalingTradeClient, StartupTimingTradeClient, HistoryTradeClient,
+    DeferredStartTradeClient
+)
+from trade_history import TradeHistory
+from trade_journal import TradeJournal
+from trade_strategy import AdaptiveTradeStrategySupplier, BuyStrategy, SellStrategy, LoggingTradeStrategySupplier
+from user_data_stream import OrderStatusRegistry, UserDataStream
+
+
+def spot_client_factory(
+        http_session_factory: HttpSessionFactory,
+        time_offset_cache_path: Path,
+        clock_sync_logger: Logger,
+        logger: Logger
+) -> Callable[[], ClockSyncClient]:
+    def build() -> ClockSyncClient:
+        # python-binance pings the exchange in its constructor unless it is told not to
+        binance_client = LeanBinanceClient('api-key', 'api-secret', ping=False)
+        spot_client = SpotClient(binance_client, http_session_factory)
+        time_offset = CachingTimeOffsetLoader(binance_client, time_offset_cache_path).load()
+        # Warm connections only save the handshakes of the first orders, so a failure must not fail the build; a
+        # failed build is retried on the next call, which is also why the clock sync thread starts last
+        try:
+            http_session_factory.warm_up(binance_client.session, binance_client.API_URL + '/v3/ping')
+        except Exception as exception:  # pylint: disable=broad-exception-caught
+            logger.warning('Failed to warm up the connections: %s', exception)
+        clock_sync = ClockSync(binance_client, clock_sync_logger, time_offset)
+        clock_sync.start()
+        return ClockSyncClient(spot_client, clock_sync)
+
+    return build
+
+
+def main():
+    started_in_ns = time.perf_counter_ns()
+    logging_backend = LoggingBackend.console_and_file(
+        '%(asctime)s %(name)s: %(message)s', Path('logs', 'trader.log')
+    )
+    logging_backend.start()
+    atexit.register(logging_backend.stop)
+    logger_factory = LoggerFactory('%(asctime)s %(name)s: %(message)s', DEBUG, logging_backend)
+    red_logger_factory = LoggerFactory("\x1b[31;20m%(asctime)s %(name)s: %(message)s\x1b[0m", DEBUG, logging_backend)
+    http_session_factory = HttpSessionFactory(pool_size=10, connect_timeout_in_sec=3.05, read_timeout_in_sec=10)
+    metrics = Metrics()
+    MetricsServer(metrics).start()
+    spot_client = RateLimitClient(
+        TimingBinanceClient(
+            LazyClient(spot_client_factory(
+                http_session_factory,
+                Path('cache', 'time_offset.json'),
+                logger_factory.logger('Clock sync            '),
+                logger_factory.logger('Spot client           ')
+            )),
+            metrics,
+            'exchange'
+        ),
+        RequestWeightLimiter()
+    )
+    symbol = CachingSymbolRegistryLoader(
+        spot_client, Path('cache', 'symbols.json'), ttl_in_sec=24 * 60 * 60
+    ).load().symbol('BTCFDUSD')
+    order_status_registry = OrderStatusRegistry()
+    order_status_coordinator = OrderStatusCoordinator(
+        LoggingBinanceClient(RetryClient(spot_client), logger_factory.logger('Order status client   ', 60)),
+        logger_factory.logger('Order status          ', 60)
+    )
+    order_status_coordinator.start()
+    user_data_stream = UserDataStream(
+        spot_client, order_status_registry, logger_factory.logger('User data stream      ')
+    )
+    market_data = MarketDataRegistry()
+    market_data_stream = MarketDataStream(
+        spot_client, market_data, [symbol.name()], logger_factory.logger('Market data stream    ')
+    )
+    cycle_breakdown = CycleBreakdown(metrics)
+    journal = TradeJournal(Path('journal', 'trades.sqlite3'))
+    journal.start()
+    atexit.register(journal.close)
+    history = TradeHistory(symbol.name(), directory=Path('history', symbol.name()))
+    atexit.register(history.close)
+    history_trade_client = HistoryTradeClient(
+        StreamingTradeClient(
+            CoordinatedTradeClient(
+                RecoveringTradeClient(
+                    BasicTradeClient(
+                        client=LoggingBinanceClient(
+                            TimingBinanceClient(RetryClient(spot_client, metrics=metrics), metrics, 'retrying'),
+                            logger_factory.logger('Binance client        ')
+                        ),
+                        sell_raise_coefficient=Decimal('1.0005'),
+                        sell_decrease_coefficient=Decimal('0.9995'),
+                        buy_raise_coefficient=Decimal('1.0005'),
+                        buy_decrease_coefficient=Decimal('0.9995'),
+                        symbol=symbol,
+                        market_data=market_data,
+                        decode_fills=True
                     )
                 ),
-                logger_factory.logger('Binance client        ')
+                order_status_coordinator,
+                symbol
             ),
-            sell_raise_coefficient=Decimal(1.0005),
-            sell_decrease_coefficient=Decimal(0.9995),
-            buy_raise_coefficient=Decimal(1.0005),
-            buy_decrease_coefficient=Decimal(0.9995)
-        )
-    ),
-    logger_factory.logger('Trade client          ')
-)
-quantity = Quantity(0.00088000)
-TradeBot(
-    strategy_supplier=LoggingTradeStrategySupplier(
-        CycleTradeStrategySupplier(
-            [
-                BuyStrategy(trade_client),
-                SellStrategy(trade_client)
-            ]
+            order_status_registry
+        ),
+        history,
+        'BTC',
+        'FDUSD',
+        logger_factory.logger('Trade history         '),
+        order_status_registry=order_status_registry
+    )
+    # The exits waiting for their commissions are recorded before the history is saved, as atexit runs backwards
+    atexit.register(history_trade_client.close)
+    trade_client = TimingTradeClient(
+        JournalingTradeClient(
+            LoggingTradeClient(history_trade_client, logger_factory.logger('Trade client          ')), journal
+        ),
+        metrics,
+        'trade client',
+        cycle_breakdown
+    )
+    trade_client = DeferredStartTradeClient(trade_client, [user_data_stream.start, market_data_stream.start])
+    trade_client = StartupTimingTradeClient(
+        trade_client, metrics, logger_factory.logger('Startup               '), started_in_ns
+    )
+    # The gap is measured where the bot sees the orders, so it covers every layer between the market order and
+    # the OCO: logging, journaling, history and timing on the way back up and down again
+    trade_client = EntryGapTradeClient(trade_client, logger_factory.logger('Entry gap             '))
+    quantity = Quantity(0.00088000, symbol.step_size())
+    TradeBot(
+        strategy_supplier=LoggingTradeStrategySupplier(
+            AdaptiveTradeStrategySupplier(
+                [
+                    BuyStrategy(trade_client),
+                    SellStrategy(trade_client)
+                ],
+                price=lambda: market_data.last_price(symbol.name())
+            ),
+            logger_factory.logger('Strategy supplier     ')
+        ),
+        # The adaptive supplier picks the next strategy after every bracket, filled or expired, so it can switch
+        # strategies while the first expired bracket still stops the bot
+        strategy_changes_limit=LimitAction(
+            5,
+            LoggingAction(
+                CompositeAction([QuantityReset(quantity), Sleep(600)]),
+                logger_factory.logger('Strategy change action')
+            )
         ),
-        logger_factory.logger('Strategy supplier     ')
-    ),
-    strategy_changes_limit=LimitAction(
-        5,
-        LoggingAction(
-            CompositeAction([QuantityReset(quantity), Sleep(600)]),
-            logger_factory.logger('Strategy change action')
-        )
-    ),
-    expiration_limit=LimitAction(1, LoggingAction(Exit(), logger_factory.logger('Expiration action     '))),
-    logger=red_logger_factory.logger('Bot                   ')
-).start(quantity)
+        expiration_limit=LimitAction(1, LoggingAction(Exit(), logger_factory.logger('Expiration action     '))),
+        logger=red_logger_factory.logger('Bot                   '),
+        cycle_breakdown=cycle_breakdown,
+        journal=journal
+    ).start(quantity)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,275 @@
+"""This module contains an in-process market data cache fed by the depth, book ticker and trade streams
+
+The local order book is synchronized the way Binance documents it: the diff events are buffered until a REST
+snapshot is loaded, events older than the snapshot are dropped and a gap in the update ids triggers a new
+snapshot. One cache is shared by every strategy of the process, so OCO prices are checked against the last
+price locally instead of being rejected by the exchange.
+"""
+import threading
+import time
+from logging import Logger
+from typing import Any, Callable, Optional
+from _decimal import Decimal
+
+import orjson
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+
+class OrderBook:
+    def __init__(self, max_levels: int = 1000):
+        self.__max_levels = max_levels
+        self.__bids: dict[Decimal, Decimal] = {}
+        self.__asks: dict[Decimal, Decimal] = {}
+        self.__last_update_id: Optional[int] = None
+        self.__best_bid_ask: Optional[tuple[Decimal, Decimal]] = None
+        self.__last_price: Optional[Decimal] = None
+
+    def is_synced(self) -> bool:
+        return self.__last_update_id is not None
+
+    def reset(self):
+        self.__bids.clear()
+        self.__asks.clear()
+        self.__last_update_id = None
+        self.__best_bid_ask = None
+
+    def load_snapshot(self, snapshot: dict[str, Any]):
+        self.__bids = {Decimal(price): Decimal(quantity) for price, quantity in snapshot['bids']}
+        self.__asks = {Decimal(price): Decimal(quantity) for price, quantity in snapshot['asks']}
+        self.__last_update_id = snapshot['lastUpdateId']
+
+    def apply_diff(self, event: dict[str, Any]) -> bool:
+        if event['u'] <= self.__last_update_id:
+            return True
+        if event['U'] > self.__last_update_id + 1:
+            return False
+        self.__apply_levels(self.__bids, event['b'], reverse=True)
+        self.__apply_levels(self.__asks, event['a'], reverse=False)
+        self.__last_update_id = event['u']
+        return True
+
+    def update_best_bid_ask(self, event: dict[str, Any]):
+        self.__best_bid_ask = (Decimal(event['b']), Decimal(event['a']))
+
+    def update_last_price(self, event: dict[str, Any]):
+        self.__last_price = Decimal(event['p'])
+
+    def best_bid_ask(self) -> Optional[tuple[Decimal, Decimal]]:
+        if self.__best_bid_ask is not None:
+            return self.__best_bid_ask
+        if self.__bids and self.__asks:
+            return max(self.__bids), min(self.__asks)
+        return None
+
+    def last_price(self) -> Optional[Decimal]:
+        return self.__last_price
+
+    def depth(self, levels: int) -> tuple[list[tuple[Decimal, Decimal]], list[tuple[Decimal, Decimal]]]:
+        return (
+            sorted(self.__bids.items(), reverse=True)[:levels],
+            sorted(self.__asks.items())[:levels]
+        )
+
+    def __apply_levels(self, book_side: dict[Decimal, Decimal], levels: list[list[str]], reverse: bool):
+        for price, quantity in levels:
+            decimal_quantity = Decimal(quantity)
+            if decimal_quantity:
+                book_side[Decimal(price)] = decimal_quantity
+            else:
+                book_side.pop(Decimal(price), None)
+        if len(book_side) > 2 * self.__max_levels:
+            # Levels far from the top are dropped so a drifting price does not grow the book without a bound
+            for price in sorted(book_side, reverse=reverse)[self.__max_levels:]:
+                del book_side[price]
+
+
+class MarketDataRegistry:
+    def __init__(self, max_age_in_sec: float = 1.0, clock: Callable[[], float] = time.monotonic):
+        self.__max_age_in_sec = max_age_in_sec
+        self.__clock = clock
+        self.__books: dict[str, OrderBook] = {}
+        # The book and the trades are timed apart: a busy book ticker must not keep an old trade price alive
+        self.__book_updated: dict[str, float] = {}
+        self.__trade_updated: dict[str, float] = {}
+        self.__lock = threading.Lock()
+
+    def reset(self, symbol: str):
+        with self.__lock:
+            self.__book(symbol).reset()
+
+    def is_synced(self, symbol: str) -> bool:
+        with self.__lock:
+            return self.__book(symbol).is_synced()
+
+    def load_snapshot(self, symbol: str, snapshot: dict[str, Any]):
+        with self.__lock:
+            self.__book(symbol).load_snapshot(snapshot)
+            self.__book_updated[symbol] = self.__clock()
+
+    def apply_diff(self, symbol: str, event: dict[str, Any]) -> bool:
+        with self.__lock:
+            book = self.__book(symbol)
+            if not book.is_synced() or not book.apply_diff(event):
+                return False
+            self.__book_updated[symbol] = self.__clock()
+            return True
+
+    def update_best_bid_ask(self, symbol: str, event: dict[str, Any]):
+        with self.__lock:
+            self.__book(symbol).update_best_bid_ask(event)
+            self.__book_updated[symbol] = self.__clock()
+
+    def update_last_price(self, symbol: str, event: dict[str, Any]):
+        with self.__lock:
+            self.__book(symbol).update_last_price(event)
+            self.__trade_updated[symbol] = self.__clock()
+
+    def best_bid_ask(self, symbol: str) -> Optional[tuple[Decimal, Decimal]]:
+        with self.__lock:
+            return self.__book(symbol).best_bid_ask() if self.__is_fresh(self.__book_updated, symbol) else None
+
+    def last_price(self, symbol: str) -> Optional[Decimal]:
+        with self.__lock:
+            return self.__book(symbol).last_price() if self.__is_fresh(self.__trade_updated, symbol) else None
+
+    def depth(self, symbol: str, levels: int) -> tuple[list[tuple[Decimal, Decimal]], list[tuple[Decimal, Decimal]]]:
+        with self.__lock:
+            return self.__book(symbol).depth(levels)
+
+    def reference_price(self, symbol: str) -> Optional[Decimal]:
+        with self.__lock:
+            book = self.__book(symbol)
+            last_price = book.last_price()
+            if last_price is not None and self.__is_fresh(self.__trade_updated, symbol):
+                return last_price
+            # A quiet market trades rarely, so the middle of a fresh book stands in for a stale trade price
+            best_bid_ask = book.best_bid_ask()
+            if best_bid_ask is not None and self.__is_fresh(self.__book_updated, symbol):
+                return (best_bid_ask[0] + best_bid_ask[1]) / 2
+            return None
+
+    def is_oco_price_valid(self, symbol: str, side: str, limit_price: Decimal, stop_price: Decimal) -> bool:
+        # Binance requires limit > last > stop for a SELL OCO and limit < last < stop for a BUY OCO;
+        # without fresh market data the order is left for the exchange to check
+        reference_price = self.reference_price(symbol)
+        if reference_price is None:
+            return True
+        if side == 'SELL':
+            return limit_price > reference_price > stop_price
+        return limit_price < reference_price < stop_price
+
+    def __book(self, symbol: str) -> OrderBook:
+        book = self.__books.get(symbol)
+        if book is None:
+            book = self.__books.setdefault(symbol, OrderBook())
+        return book
+
+    def __is_fresh(self, updated_by_symbol: dict[str, float], symbol: str) -> bool:
+        updated = updated_by_symbol.get(symbol)
+        return updated is not None and self.__clock() - updated <= self.__max_age_in_sec
+
+
+class MarketDataStream:
+    def __init__(
+            self,
+            client,
+            registry: MarketDataRegistry,
+            symbols: list[str],
+            logger: Logger,
+            url: str = 'wss://stream.binance.com:9443/stream',
+            snapshot_limit: int = 100,
+            reconnect_delay_in_sec: int = 1,
+            snapshot_backoff_in_sec: float = 1,
+            max_snapshot_backoff_in_sec: float = 30,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.__client = client
+        self.__registry = registry
+        self.__symbols = {symbol.lower(): symbol for symbol in symbols}
+        self.__logger = logger
+        self.__url = url
+        self.__snapshot_limit = snapshot_limit
+        self.__reconnect_delay_in_sec = reconnect_delay_in_sec
+        self.__snapshot_backoff_in_sec = snapshot_backoff_in_sec
+        self.__max_snapshot_backoff_in_sec = max_snapshot_backoff_in_sec
+        self.__clock = clock
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='market-data-stream', daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            try:
+                self.__listen()
+            except (ConnectionClosed, OSError) as exception:
+                self.__logger.debug('Market data stream is down: %s', exception)
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                self.__logger.exception('Market data stream failed: %s', exception)
+            finally:
+                for symbol in self.__symbols.values():
+                    self.__registry.reset(symbol)
+            self.__stopped.wait(self.__reconnect_delay_in_sec)
+
+    def __listen(self):
+        streams = '/'.join(
+            f'{stream_symbol}@{stream}'
+            for stream_symbol in self.__symbols
+            for stream in ('depth@100ms', 'bookTicker', 'aggTrade')
+        )
+        buffered_diffs: dict[str, list[dict[str, Any]]] = {symbol: [] for symbol in self.__symbols.values()}
+        failed_snapshots = dict.fromkeys(self.__symbols.values(), 0)
+        next_snapshot_at = dict.fromkeys(self.__symbols.values(), float('-inf'))
+        with connect(f'{self.__url}?streams={streams}') as websocket:
+            self.__logger.debug('Market data stream is up')
+            while not self.__stopped.is_set():
+                try:
+                    message = websocket.recv(timeout=1)
+                except TimeoutError:
+                    continue
+                combined_event = orjson.loads(message)
+                stream = combined_event['stream']
+                event = combined_event['data']
+                symbol = self.__symbols[stream.split('@', 1)[0]]
+                if stream.endswith('@bookTicker'):
+                    self.__registry.update_best_bid_ask(symbol, event)
+                elif stream.endswith('@aggTrade'):
+                    self.__registry.update_last_price(symbol, event)
+                elif not self.__registry.apply_diff(symbol, event):
+                    buffered_diffs[symbol].append(event)
+                    # A snapshot weighs at least 5, so a book that fails to synchronize is retried with a backoff
+                    # instead of on every diff event; the events keep being buffered in the meantime
+                    if self.__clock() < next_snapshot_at[symbol]:
+                        continue
+                    self.__synchronize(symbol, buffered_diffs[symbol])
+                    if self.__registry.is_synced(symbol):
+                        failed_snapshots[symbol] = 0
+                        next_snapshot_at[symbol] = float('-inf')
+                    else:
+                        backoff = self.__snapshot_backoff_in_sec * 2 ** min(failed_snapshots[symbol], 16)
+                        failed_snapshots[symbol] = failed_snapshots[symbol] + 1
+                        next_snapshot_at[symbol] = self.__clock() + min(backoff, self.__max_snapshot_backoff_in_sec)
+
+    def __synchronize(self, symbol: str, buffered_diffs: list[dict[str, Any]]):
+        # The snapshot must be at least as new as the first buffered event, otherwise the events in between
+        # are lost and the book can only be fixed by another snapshot
+        self.__registry.reset(symbol)
+        snapshot = self.__client.get_order_book(symbol=symbol, limit=self.__snapshot_limit)
+        if snapshot['lastUpdateId'] < buffered_diffs[0]['U'] - 1:
+            self.__logger.debug('Order book snapshot of %s is older than the stream, retrying', symbol)
+            del buffered_diffs[:-1]
+            return
+        self.__registry.load_snapshot(symbol, snapshot)
+        for event in buffered_diffs:
+            if not self.__registry.apply_diff(symbol, event):
+                self.__registry.reset(symbol)
+                break
+        buffered_diffs.clear()
+        self.__logger.debug('Order book of %s is synchronized at %s', symbol, snapshot['lastUpdateId'])
@@ -0,0 +1,339 @@
+"""This module contains a local store of historical klines and aggregate trades and its bulk downloader
+
+Every series is kept column by column in append-only files of fixed-width numbers, so a column is read with
+numpy.memmap without a copy and replay or parameter tooling can scan years of ticks while the operating system
+pages in only what is touched. A sparse index of every n-th time narrows a time range lookup to one block of
+the time column. The downloader fetches pages in parallel through a rate limited client and appends them in
+order, so an interrupted download resumes from the last stored record.
+
+Run it from the repository root: PYTHONPATH=src/bot python src/bot/market_history.py BTCFDUSD --since 2023-03-01
+"""
+import argparse
+import logging
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timezone
+from functools import partial
+from logging import Logger
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+import numpy as np
+
+from binance_client import LeanBinanceClient, RateLimitClient, RequestWeightLimiter, SpotClient
+from http_session import HttpSessionFactory
+
+KLINE_DTYPE = np.dtype([
+    ('open_time', '<i8'),
+    ('open', '<f8'),
+    ('high', '<f8'),
+    ('low', '<f8'),
+    ('close', '<f8'),
+    ('volume', '<f8'),
+    ('close_time', '<i8'),
+    ('quote_volume', '<f8'),
+    ('trades', '<i8')
+])
+
+AGGREGATE_TRADE_DTYPE = np.dtype([
+    ('id', '<i8'),
+    ('price', '<f8'),
+    ('quantity', '<f8'),
+    ('first_trade_id', '<i8'),
+    ('last_trade_id', '<i8'),
+    ('time', '<i8'),
+    ('is_buyer_maker', '?')
+])
+
+INTERVALS_IN_MS = {
+    '1s': 1000,
+    '1m': 60 * 1000,
+    '3m': 3 * 60 * 1000,
+    '5m': 5 * 60 * 1000,
+    '15m': 15 * 60 * 1000,
+    '30m': 30 * 60 * 1000,
+    '1h': 60 * 60 * 1000,
+    '2h': 2 * 60 * 60 * 1000,
+    '4h': 4 * 60 * 60 * 1000,
+    '6h': 6 * 60 * 60 * 1000,
+    '8h': 8 * 60 * 60 * 1000,
+    '12h': 12 * 60 * 60 * 1000,
+    '1d': 24 * 60 * 60 * 1000,
+    '3d': 3 * 24 * 60 * 60 * 1000,
+    '1w': 7 * 24 * 60 * 60 * 1000,
+    '1M': 30 * 24 * 60 * 60 * 1000
+}
+
+HOUR_IN_MS = 60 * 60 * 1000
+
+
+def kline_records(klines: list[list]) -> np.ndarray:
+    return np.array([tuple(kline[:9]) for kline in klines], KLINE_DTYPE)
+
+
+def aggregate_trade_records(trades: list[dict]) -> np.ndarray:
+    return np.array(
+        [(trade['a'], trade['p'], trade['q'], trade['f'], trade['l'], trade['T'], trade['m']) for trade in trades],
+        AGGREGATE_TRADE_DTYPE
+    )
+
+
+class HistorySeries:
+    def __init__(self, directory: Path, dtype: np.dtype, key: str, time_column: str, index_stride: int = 4096):
+        self.__directory = directory
+        self.__dtype = dtype
+        self.__key = key
+        self.__time_column = time_column
+        self.__index_stride = index_stride
+        self.__index_path = directory / f'{time_column}.idx'
+        self.__lock = threading.Lock()
+        directory.mkdir(parents=True, exist_ok=True)
+        for name in dtype.names:
+            self.__column_path(name).touch(exist_ok=True)
+        self.__index_path.touch(exist_ok=True)
+        self.__recover()
+
+    def rows(self) -> int:
+        return min(
+            self.__column_path(name).stat().st_size // self.__dtype[name].itemsize for name in self.__dtype.names
+        )
+
+    def last_key(self) -> Optional[int]:
+        keys = self.column(self.__key)
+        return int(keys[-1]) if len(keys) else None
+
+    def column(self, name: str, start: Optional[int] = None, end: Optional[int] = None) -> np.ndarray:
+        rows = self.rows()
+        return self.__map(name, rows, *self.__slice(rows, start, end))
+
+    def records(self, start: Optional[int] = None, end: Optional[int] = None) -> dict[str, np.ndarray]:
+        rows = self.rows()
+        first, last = self.__slice(rows, start, end)
+        return {name: self.__map(name, rows, first, last) for name in self.__dtype.names}
+
+    def append(self, records: np.ndarray) -> int:
+        with self.__lock:
+            last_key = self.last_key()
+            if last_key is not None:
+                # Pages overlap the stored records when a download resumes, so only the newer ones are kept
+                records = records[records[self.__key] > last_key]
+            if len(records) == 0:
+                return 0
+            if np.any(np.diff(records[self.__key]) <= 0):
+                raise ValueError(f"Records of {self.__directory} must be sorted by {self.__key} without duplicates")
+            rows = self.rows()
+            for name in self.__dtype.names:
+                with self.__column_path(name).open('ab') as column_file:
+                    records[name].astype(self.__dtype[name], copy=False).tofile(column_file)
+            first_indexed = -(-rows // self.__index_stride) * self.__index_stride - rows
+            with self.__index_path.open('ab') as index_file:
+                records[self.__time_column][first_indexed::self.__index_stride].astype('<i8').tofile(index_file)
+            return len(records)
+
+    def __slice(self, rows: int, start: Optional[int], end: Optional[int]) -> tuple[int, int]:
+        first = 0 if start is None else self.__position(rows, start)
+        last = rows if end is None else self.__position(rows, end)
+        return first, max(first, last)
+
+    def __map(self, name: str, rows: int, first: int, last: int) -> np.ndarray:
+        if first == last:
+            return np.empty(0, self.__dtype[name])
+        return np.memmap(self.__column_path(name), self.__dtype[name], mode='r', shape=(rows,))[first:last]
+
+    def __position(self, rows: int, time_in_ms: int) -> int:
+        # The index holds the time of every n-th row, so the binary search over the time column is one block wide
+        if rows == 0:
+            return 0
+        index = np.fromfile(self.__index_path, '<i8', count=-(-rows // self.__index_stride))
+        block = int(np.searchsorted(index, time_in_ms))
+        first = max(0, (block - 1) * self.__index_stride)
+        last = min(rows, block * self.__index_stride)
+        times = np.memmap(self.__column_path(self.__time_column), '<i8', mode='r', shape=(rows,))
+        return first + int(np.searchsorted(times[first:last], time_in_ms))
+
+    def __recover(self):
+        # A download interrupted in the middle of an append leaves columns of different lengths
+        rows = self.rows()
+        for name in self.__dtype.names:
+            size = rows * self.__dtype[name].itemsize
+            if self.__column_path(name).stat().st_size != size:
+                with self.__column_path(name).open('r+b') as column_file:
+                    column_file.truncate(size)
+        indexed = -(-rows // self.__index_stride)
+        if self.__index_path.stat().st_size != indexed * 8:
+            times = np.memmap(self.__column_path(self.__time_column), '<i8', mode='r', shape=(rows,)) if rows else []
+            with self.__index_path.open('wb') as index_file:
+                np.asarray(times[::self.__index_stride], '<i8').tofile(index_file)
+
+    def __column_path(self, name: str) -> Path:
+        return self.__directory / f'{name}.bin'
+
+
+class MarketHistoryStore:
+    def __init__(self, directory: Path, index_stride: int = 4096):
+        self.__directory = directory
+        self.__index_stride = index_stride
+        self.__series: dict[Path, HistorySeries] = {}
+        self.__lock = threading.Lock()
+
+    def klines(self, symbol: str, interval: str) -> HistorySeries:
+        return self.__get(self.__directory / symbol / f'klines-{interval}', KLINE_DTYPE, 'open_time', 'open_time')
+
+    def aggregate_trades(self, symbol: str) -> HistorySeries:
+        return self.__get(self.__directory / symbol / 'aggTrades', AGGREGATE_TRADE_DTYPE, 'id', 'time')
+
+    def __get(self, directory: Path, dtype: np.dtype, key: str, time_column: str) -> HistorySeries:
+        with self.__lock:
+            series = self.__series.get(directory)
+            if series is None:
+                series = HistorySeries(directory, dtype, key, time_column, self.__index_stride)
+                self.__series[directory] = series
+            return series
+
+
+class HistoryDownloader:
+    def __init__(
+            self,
+            client,
+            store: MarketHistoryStore,
+            logger: Logger,
+            page_size: int = 1000,
+            workers: int = 4,
+            clock: Callable[[], float] = time.time
+    ):
+        self.__client = client
+        self.__store = store
+        self.__logger = logger
+        self.__page_size = page_size
+        self.__workers = workers
+        self.__clock = clock
+
+    def download_klines(
+            self,
+            symbol: str,
+            interval: str,
+            start_time_in_ms: int,
+            end_time_in_ms: Optional[int] = None
+    ) -> int:
+        series = self.__store.klines(symbol, interval)
+        now_in_ms = int(self.__clock() * 1000)
+        end_time_in_ms = min(end_time_in_ms or now_in_ms, now_in_ms)
+        last_key = series.last_key()
+        start_time_in_ms = max(start_time_in_ms, last_key + 1) if last_key is not None else start_time_in_ms
+        # Klines are identified by their open time, so the pages are known in advance and fetched side by side
+        span_in_ms = self.__page_size * INTERVALS_IN_MS[interval]
+        pages = (
+            partial(self.__kline_page, symbol, interval, page_start, min(page_start + span_in_ms, end_time_in_ms),
+                    now_in_ms)
+            for page_start in range(start_time_in_ms, end_time_in_ms, span_in_ms)
+        )
+        stored = self.__store_pages(series, pages)
+        self.__logger.info('Stored %s %s klines of %s, %s in total', stored, interval, symbol, series.rows())
+        return stored
+
+    def download_aggregate_trades(
+            self,
+            symbol: str,
+            start_time_in_ms: int,
+            end_time_in_ms: Optional[int] = None
+    ) -> int:
+        series = self.__store.aggregate_trades(symbol)
+        now_in_ms = int(self.__clock() * 1000)
+        end_time_in_ms = min(end_time_in_ms or now_in_ms, now_in_ms)
+        last_key = series.last_key()
+        first_id = last_key + 1 if last_key is not None else self.__first_trade_id(symbol, start_time_in_ms,
+                                                                                   end_time_in_ms)
+        if first_id is None:
+            return 0
+        end_id = self.__first_trade_id(symbol, end_time_in_ms, now_in_ms)
+        if end_id is None:
+            latest = self.__client.get_aggregate_trades(symbol=symbol, limit=1)
+            end_id = latest[-1]['a'] + 1 if latest else first_id
+        # Aggregate trade ids have no gaps, so the pages are known in advance by their first id
+        pages = (
+            partial(self.__aggregate_trade_page, symbol, from_id, min(from_id + self.__page_size, end_id),
+                    end_time_in_ms)
+            for from_id in range(first_id, end_id, self.__page_size)
+        )
+        stored = self.__store_pages(series, pages)
+        self.__logger.info('Stored %s aggregate trades of %s, %s in total', stored, symbol, series.rows())
+        return stored
+
+    def __store_pages(self, series: HistorySeries, pages: Iterable[Callable[[], np.ndarray]]) -> int:
+        stored = 0
+        pending: deque[Future] = deque()
+        with ThreadPoolExecutor(self.__workers, thread_name_prefix='history') as executor:
+            try:
+                for page in pages:
+                    pending.append(executor.submit(page))
+                    if len(pending) > 2 * self.__workers:
+                        stored = stored + series.append(pending.popleft().result())
+                while pending:
+                    stored = stored + series.append(pending.popleft().result())
+            finally:
+                for future in pending:
+                    future.cancel()
+        return stored
+
+    def __kline_page(self, symbol: str, interval: str, start_in_ms: int, end_in_ms: int, now_in_ms: int) -> np.ndarray:
+        records = kline_records(self.__client.get_klines(
+            symbol=symbol, interval=interval, startTime=start_in_ms, endTime=end_in_ms - 1, limit=self.__page_size
+        ))
+        # The last kline is still open until its close time has passed
+        return records[records['close_time'] < now_in_ms]
+
+    def __aggregate_trade_page(self, symbol: str, from_id: int, end_id: int, end_time_in_ms: int) -> np.ndarray:
+        records = aggregate_trade_records(self.__client.get_aggregate_trades(
+            symbol=symbol, fromId=from_id, limit=end_id - from_id
+        ))
+        return records[(records['id'] < end_id) & (records['time'] < end_time_in_ms)]
+
+    def __first_trade_id(self, symbol: str, start_in_ms: int, end_in_ms: int) -> Optional[int]:
+        # The exchange searches aggregate trades by time only within an hour
+        while start_in_ms < end_in_ms:
+            trades = self.__client.get_aggregate_trades(
+                symbol=symbol, startTime=start_in_ms, endTime=min(start_in_ms + HOUR_IN_MS, end_in_ms) - 1, limit=1
+            )
+            if trades:
+                return trades[0]['a']
+            start_in_ms = start_in_ms + HOUR_IN_MS
+        return None
+
+
+def time_in_ms(date: str) -> int:
+    moment = datetime.fromisoformat(date)
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Downloads historical klines or aggregate trades into a local store')
+    parser.add_argument('symbol')
+    parser.add_argument('--store', type=Path, default=Path('history'), help='the store directory')
+    parser.add_argument('--klines', help='download klines of this interval instead of aggregate trades')
+    parser.add_argument('--since', required=True, help='an ISO date or time in UTC')
+    parser.add_argument('--until', help='an ISO date or time in UTC, now by default')
+    parser.add_argument('--workers', type=int, default=4)
+    parser.add_argument('--weight-limit', type=int, default=3000, help='request weight per minute to stay within')
+    arguments = parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s %(levelname)s %(message)s')
+    # python-binance pings the exchange in its constructor unless it is told not to
+    client = RateLimitClient(
+        SpotClient(LeanBinanceClient(ping=False), HttpSessionFactory(pool_size=arguments.workers)),
+        RequestWeightLimiter(weight_limit_per_minute=arguments.weight_limit)
+    )
+    downloader = HistoryDownloader(
+        client, MarketHistoryStore(arguments.store), logging.getLogger('History'), workers=arguments.workers
+    )
+    until = time_in_ms(arguments.until) if arguments.until else None
+    if arguments.klines:
+        downloader.download_klines(arguments.symbol, arguments.klines, time_in_ms(arguments.since), until)
+    else:
+        downloader.download_aggregate_trades(arguments.symbol, time_in_ms(arguments.since), until)
+
+
+if __name__ == '__main__':
+    main()
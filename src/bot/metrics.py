@@ -0,0 +1,205 @@
+"""This module contains HDR-style latency histograms and counters exportable as Prometheus text or a JSON snapshot
+
+Durations are recorded in nanoseconds into log-linear buckets: 64 linear sub-buckets per power of two keep
+the relative error of every percentile below 1.6% over the whole range at a constant cost per record.
+"""
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional
+
+_SUB_BUCKET_BITS = 7
+_SUB_BUCKET_COUNT = 1 << _SUB_BUCKET_BITS
+_SUB_BUCKET_HALF_COUNT = _SUB_BUCKET_COUNT >> 1
+_MAX_SHIFT = 40
+
+
+def _bucket_index(value: int) -> int:
+    shift = value.bit_length() - _SUB_BUCKET_BITS
+    if shift <= 0:
+        return value
+    return _SUB_BUCKET_HALF_COUNT * shift + (value >> shift)
+
+
+def _bucket_value(index: int) -> int:
+    if index < _SUB_BUCKET_COUNT:
+        return index
+    shift = index // _SUB_BUCKET_HALF_COUNT - 1
+    return ((index - _SUB_BUCKET_HALF_COUNT * shift) << shift) + (1 << shift) - 1
+
+
+class Histogram:
+    def __init__(self):
+        self.__size = _bucket_index((1 << (_MAX_SHIFT + _SUB_BUCKET_BITS)) - 1) + 1
+        self.__counts = [0] * self.__size
+        self.__count = 0
+        self.__total = 0
+        self.__max = 0
+        self.__last = 0
+        self.__lock = threading.Lock()
+
+    def record(self, duration_in_ns: int):
+        shift = duration_in_ns.bit_length() - _SUB_BUCKET_BITS
+        index = _SUB_BUCKET_HALF_COUNT * shift + (duration_in_ns >> shift) if shift > 0 else duration_in_ns
+        if index >= self.__size:
+            index = self.__size - 1
+        with self.__lock:
+            self.__counts[index] += 1
+            self.__count += 1
+            self.__total += duration_in_ns
+            self.__last = duration_in_ns
+            if duration_in_ns > self.__max:
+                self.__max = duration_in_ns
+
+    def count(self) -> int:
+        return self.__count
+
+    def total_in_sec(self) -> float:
+        return self.__total / 1e9
+
+    def max_in_sec(self) -> float:
+        return self.__max / 1e9
+
+    def last_in_sec(self) -> float:
+        return self.__last / 1e9
+
+    def percentile_in_sec(self, percentile: float) -> float:
+        with self.__lock:
+            rank = max(1, round(self.__count * percentile / 100))
+            seen = 0
+            for index, count in enumerate(self.__counts):
+                seen += count
+                if seen >= rank:
+                    return min(_bucket_value(index), self.__max) / 1e9
+        return 0.0
+
+
+class Metrics:
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self):
+        self.__histograms: dict[str, dict[tuple, Histogram]] = {}
+        self.__counters: dict[str, dict[tuple, int]] = {}
+        self.__lock = threading.Lock()
+
+    def histogram(self, name: str, **labels: str) -> Histogram:
+        key = tuple(sorted(labels.items()))
+        histograms = self.__histograms.get(name)
+        if histograms is None or key not in histograms:
+            with self.__lock:
+                histograms = self.__histograms.setdefault(name, {})
+                if key not in histograms:
+                    histograms[key] = Histogram()
+        return histograms[key]
+
+    def increment(self, name: str, **labels: str):
+        key = tuple(sorted(labels.items()))
+        with self.__lock:
+            counters = self.__counters.setdefault(name, {})
+            counters[key] = counters.get(key, 0) + 1
+
+    def counter(self, name: str, **labels: str) -> int:
+        return self.__counters.get(name, {}).get(tuple(sorted(labels.items())), 0)
+
+    def prometheus(self) -> str:
+        lines = []
+        for name, histograms in sorted(self.__histograms.items()):
+            lines.append(f'# TYPE {name} summary')
+            for key, histogram in sorted(histograms.items()):
+                for quantile in self.QUANTILES:
+                    labels = _labels(key + (('quantile', str(quantile)),))
+                    lines.append(f'{name}{labels} {histogram.percentile_in_sec(quantile * 100):.9f}')
+                lines.append(f'{name}_sum{_labels(key)} {histogram.total_in_sec():.9f}')
+                lines.append(f'{name}_count{_labels(key)} {histogram.count()}')
+        for name, counters in sorted(self.__counters.items()):
+            lines.append(f'# TYPE {name} counter')
+            for key, value in sorted(counters.items()):
+                lines.append(f'{name}{_labels(key)} {value}')
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> dict:
+        histograms = {}
+        for name, labelled_histograms in self.__histograms.items():
+            histograms[name] = [
+                {
+                    'labels': dict(key),
+                    'count': histogram.count(),
+                    'sum': histogram.total_in_sec(),
+                    'max': histogram.max_in_sec(),
+                    **{
+                        f'p{quantile * 100:g}': histogram.percentile_in_sec(quantile * 100)
+                        for quantile in self.QUANTILES
+                    }
+                }
+                for key, histogram in labelled_histograms.items()
+            ]
+        counters = {
+            name: [{'labels': dict(key), 'value': value} for key, value in labelled_counters.items()]
+            for name, labelled_counters in self.__counters.items()
+        }
+        return {'histograms': histograms, 'counters': counters}
+
+
+def _labels(key: tuple) -> str:
+    if not key:
+        return ''
+    return '{' + ','.join(f'{name}="{value}"' for name, value in key) + '}'
+
+
+class CycleBreakdown:
+    def __init__(self, metrics: Metrics):
+        self.__metrics = metrics
+        self.__phases: dict[str, int] = {}
+        self.__started: Optional[int] = None
+
+    def start(self):
+        self.__phases = {}
+        self.__started = time.perf_counter_ns()
+
+    def record(self, phase: str, duration_in_ns: int):
+        self.__phases[phase] = self.__phases.get(phase, 0) + duration_in_ns
+
+    def finish(self, status: str) -> str:
+        total = time.perf_counter_ns() - self.__started
+        self.__metrics.histogram('trade_cycle_seconds', status=status).record(total)
+        for phase, duration_in_ns in self.__phases.items():
+            self.__metrics.histogram('trade_cycle_phase_seconds', phase=phase).record(duration_in_ns)
+        phases = ', '.join(f'{phase} {duration / 1e6:.3f} ms' for phase, duration in self.__phases.items())
+        return f'{status} in {total / 1e6:.3f} ms: {phases}'
+
+
+class MetricsServer:
+    def __init__(self, metrics: Metrics, host: str = 'localhost', port: int = 9108):
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    self.__respond('text/plain; version=0.0.4', metrics.prometheus())
+                elif self.path == '/metrics.json':
+                    self.__respond('application/json', json.dumps(metrics.snapshot()))
+                else:
+                    self.send_error(404)
+
+            def __respond(self, content_type: str, body: str):
+                encoded_body = body.encode()
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(encoded_body)))
+                self.end_headers()
+                self.wfile.write(encoded_body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.__server = ThreadingHTTPServer((host, port), Handler)
+        self.__thread = threading.Thread(target=self.__server.serve_forever, name='metrics-server', daemon=True)
+
+    def port(self) -> int:
+        return self.__server.server_port
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__server.shutdown()
+        self.__server.server_close()
@@ -0,0 +1,110 @@
+"""This module contains a coordinator resolving pending order statuses with one open orders call per symbol"""
+import threading
+import time
+from concurrent.futures import Future
+from logging import Logger
+from typing import Callable
+
+from binance_client import is_transient
+
+
+class OrderStatusCoordinator:
+    def __init__(
+            self,
+            client,
+            logger: Logger,
+            polling_interval_in_sec: float = 2,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.__client = client
+        self.__logger = logger
+        self.__polling_interval_in_sec = polling_interval_in_sec
+        self.__clock = clock
+        self.__pending: dict[str, dict[int, Future]] = {}
+        self.__polled_at = float('-inf')
+        self.__lock = threading.Lock()
+        self.__stopped = threading.Event()
+        self.__watched = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='order-status-coordinator', daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        self.__watched.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def watch(self, symbol: str, order_id: int) -> Future:
+        with self.__lock:
+            orders = self.__pending.setdefault(symbol, {})
+            if order_id not in orders:
+                orders[order_id] = Future()
+                # A new order is checked at once instead of after the rest of the polling interval
+                self.__watched.set()
+            return orders[order_id]
+
+    def unwatch(self, symbol: str, order_id: int):
+        with self.__lock:
+            self.__pending.get(symbol, {}).pop(order_id, None)
+
+    def is_healthy(self, max_age_in_sec: float) -> bool:
+        return (
+            self.__thread.is_alive()
+            and not self.__stopped.is_set()
+            and self.__clock() - self.__polled_at <= max_age_in_sec
+        )
+
+    def poll(self):
+        with self.__lock:
+            pending = {symbol: dict(orders) for symbol, orders in self.__pending.items() if orders}
+        answered = True
+        for symbol, orders in pending.items():
+            try:
+                answered = self.__poll_symbol(symbol, orders) and answered
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                answered = self.__fail(symbol, orders, exception) and answered
+        if answered:
+            self.__polled_at = self.__clock()
+
+    def __poll_symbol(self, symbol: str, orders: dict[int, Future]) -> bool:
+        if len(orders) == 1:
+            # A single order is looked up by itself, which weighs 4 against 6 for the open orders of the symbol
+            open_order_ids = set()
+        else:
+            open_order_ids = {order['orderId'] for order in self.__client.get_open_orders(symbol=symbol)}
+        answered = True
+        for order_id, future in orders.items():
+            if order_id not in open_order_ids:
+                try:
+                    self.__resolve(symbol, order_id, future)
+                except Exception as exception:  # pylint: disable=broad-exception-caught
+                    answered = self.__fail(symbol, {order_id: future}, exception) and answered
+        return answered
+
+    def __resolve(self, symbol: str, order_id: int, future: Future):
+        status = self.__client.get_order(symbol=symbol, orderId=order_id)['status']
+        if status not in ('NEW', 'PARTIALLY_FILLED'):
+            with self.__lock:
+                self.__pending[symbol].pop(order_id, None)
+            future.set_result(status)
+
+    def __fail(self, symbol: str, orders: dict[int, Future], exception: Exception) -> bool:
+        if is_transient(exception):
+            self.__logger.debug('Failed to poll %s orders, polling again: %s', symbol, exception)
+            return False
+        # The exchange answered with an error that polling again would repeat, so the waiting bots get it
+        self.__logger.warning('Failed to poll %s orders %s: %s', symbol, list(orders), exception)
+        with self.__lock:
+            for order_id in orders:
+                self.__pending[symbol].pop(order_id, None)
+        for future in orders.values():
+            future.set_exception(exception)
+        return True
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            self.poll()
+            self.__watched.wait(self.__polling_interval_in_sec)
+            self.__watched.clear()
@@ -0,0 +1,203 @@
+"""This module contains a vectorized sweep of the OCO raise/decrease coefficients over a price series
+
+Every combination is evaluated on independent brackets opened at regularly spaced entries: the first touch of
+the raise and decrease levels is found with array operations over all entries and combinations at once.
+The quantity multiplier makes consecutive brackets path-dependent, so it is left to the backtester.
+
+Run it from the repository root: PYTHONPATH=src/bot python src/bot/parameter_sweep.py trades.csv
+"""
+import argparse
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+from backtest import kline_ticks, trade_ticks
+from market_history import MarketHistoryStore
+
+
+class SweepResult:
+    def __init__(self, raise_coefficients: np.ndarray, decrease_coefficients: np.ndarray, totals: np.ndarray):
+        brackets = totals[:, 0]
+        self.raise_coefficients = raise_coefficients
+        self.decrease_coefficients = decrease_coefficients
+        self.brackets = brackets
+        self.long_pnl = totals[:, 1]
+        self.short_pnl = totals[:, 2]
+        self.up_first_rate = totals[:, 3] / brackets
+        self.down_first_rate = totals[:, 4] / brackets
+        self.open_rate = 1 - self.up_first_rate - self.down_first_rate
+
+    def long_fill_rate(self) -> np.ndarray:
+        return self.up_first_rate
+
+    def long_expiry_rate(self) -> np.ndarray:
+        return self.down_first_rate
+
+    def short_fill_rate(self) -> np.ndarray:
+        return self.down_first_rate
+
+    def short_expiry_rate(self) -> np.ndarray:
+        return self.up_first_rate
+
+    def best(self, count: int) -> np.ndarray:
+        return np.argsort(-np.maximum(self.long_pnl, self.short_pnl))[:count]
+
+    def __str__(self) -> str:
+        lines = [f'{"raise":>10} {"decrease":>10} {"long PnL":>10} {"short PnL":>10} {"fill L/S":>13} '
+                 f'{"expiry L/S":>13} {"open":>6}']
+        for index in self.best(20):
+            lines.append(
+                f'{self.raise_coefficients[index]:>10.6f} {self.decrease_coefficients[index]:>10.6f} '
+                f'{self.long_pnl[index]:>10.6f} {self.short_pnl[index]:>10.6f} '
+                f'{self.up_first_rate[index]:>6.1%} {self.down_first_rate[index]:>6.1%} '
+                f'{self.down_first_rate[index]:>6.1%} {self.up_first_rate[index]:>6.1%} '
+                f'{self.open_rate[index]:>6.1%}'
+            )
+        return '\n'.join(lines)
+
+
+def grid(raise_coefficients: np.ndarray, decrease_coefficients: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    raise_grid, decrease_grid = np.meshgrid(raise_coefficients, decrease_coefficients, indexing='ij')
+    return raise_grid.ravel(), decrease_grid.ravel()
+
+
+def random_combinations(
+        count: int,
+        raise_range: tuple[float, float],
+        decrease_range: tuple[float, float],
+        seed: Optional[int] = None
+) -> tuple[np.ndarray, np.ndarray]:
+    generator = np.random.default_rng(seed)
+    return generator.uniform(*raise_range, count), generator.uniform(*decrease_range, count)
+
+
+def _first_touches(path: np.ndarray, levels: np.ndarray) -> np.ndarray:
+    # Rows of a running maximum are sorted, so shifting every row above the previous one makes the whole block
+    # sorted and a single searchsorted finds the first touch for every row and level; horizon means no touch
+    rows, horizon = path.shape
+    lowest = path.min()
+    span = np.ceil(path.max() - lowest) + 1
+    offsets = np.arange(rows) * span
+    shifted_path = (path - lowest + offsets[:, None]).ravel()
+    shifted_levels = np.clip(levels - lowest, 0, span - 0.5)[None, :] + offsets[:, None]
+    return np.searchsorted(shifted_path, shifted_levels) - np.arange(rows)[:, None] * horizon
+
+
+def _evaluate_block(
+        windows: np.ndarray,
+        raise_coefficients: np.ndarray,
+        decrease_coefficients: np.ndarray
+) -> np.ndarray:
+    ratios = windows[:, 1:] / windows[:, :1]
+    horizon = ratios.shape[1]
+    up_touches = _first_touches(np.maximum.accumulate(ratios, axis=1), raise_coefficients)
+    down_touches = _first_touches(-np.minimum.accumulate(ratios, axis=1), -decrease_coefficients)
+    down_first = (down_touches < horizon) & (down_touches <= up_touches)
+    up_first = (up_touches < horizon) & ~down_first
+    expired_ratios = np.broadcast_to(ratios[:, -1:], up_first.shape)
+    exit_ratios = np.where(up_first, raise_coefficients, np.where(down_first, decrease_coefficients, expired_ratios))
+    return np.stack([
+        np.full(raise_coefficients.shape, float(len(windows))),
+        (exit_ratios - 1).sum(axis=0),
+        (1 - exit_ratios).sum(axis=0),
+        up_first.sum(axis=0),
+        down_first.sum(axis=0)
+    ], axis=1)
+
+
+_prices: Optional[np.ndarray] = None
+
+
+def _initialize_worker(prices: np.ndarray):
+    global _prices  # pylint: disable=global-statement
+    _prices = prices
+
+
+def _evaluate(
+        raise_coefficients: np.ndarray,
+        decrease_coefficients: np.ndarray,
+        horizon: int,
+        entry_step: int,
+        block_size: int = 256
+) -> np.ndarray:
+    windows = sliding_window_view(_prices, horizon + 1)[::entry_step]
+    totals = np.zeros((len(raise_coefficients), 5))
+    for start in range(0, len(windows), block_size):
+        totals = totals + _evaluate_block(windows[start:start + block_size], raise_coefficients, decrease_coefficients)
+    return totals
+
+
+def sweep(
+        prices: np.ndarray,
+        raise_coefficients: np.ndarray,
+        decrease_coefficients: np.ndarray,
+        horizon: int,
+        entry_step: int = 60,
+        workers: Optional[int] = None,
+        chunk_size: int = 512
+) -> SweepResult:
+    prices = np.ascontiguousarray(prices, dtype=np.float64)
+    if len(prices) <= horizon:
+        raise ValueError(f"The price series is shorter than the horizon {horizon}")
+    chunks = range(0, len(raise_coefficients), chunk_size)
+    workers = workers or os.cpu_count()
+    if workers == 1 or len(chunks) == 1:
+        _initialize_worker(prices)
+        totals = [
+            _evaluate(raise_coefficients[start:start + chunk_size], decrease_coefficients[start:start + chunk_size],
+                      horizon, entry_step)
+            for start in chunks
+        ]
+    else:
+        with ProcessPoolExecutor(workers, initializer=_initialize_worker, initargs=(prices,)) as executor:
+            totals = list(executor.map(
+                _evaluate,
+                [raise_coefficients[start:start + chunk_size] for start in chunks],
+                [decrease_coefficients[start:start + chunk_size] for start in chunks],
+                [horizon] * len(chunks),
+                [entry_step] * len(chunks)
+            ))
+    return SweepResult(raise_coefficients, decrease_coefficients, np.concatenate(totals))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Sweeps the OCO coefficients over historical trades or klines')
+    parser.add_argument('path', type=Path, help='a Binance trades or klines CSV file or a history store directory')
+    parser.add_argument('--klines', action='store_true', help='the file contains klines instead of trades')
+    parser.add_argument('--store', action='store_true', help='read the prices of a symbol from a history store')
+    parser.add_argument('--symbol', default='BTCFDUSD', help='the symbol in the history store')
+    parser.add_argument('--interval', default='1m', help='the kline interval in the history store')
+    parser.add_argument('--horizon', type=int, default=3600, help='ticks a bracket stays open')
+    parser.add_argument('--entry-step', type=int, default=60, help='ticks between bracket entries')
+    parser.add_argument('--raise-range', type=float, nargs=2, default=(1.0001, 1.005))
+    parser.add_argument('--decrease-range', type=float, nargs=2, default=(0.995, 0.9999))
+    parser.add_argument('--steps', type=int, default=50, help='grid steps per coefficient')
+    parser.add_argument('--random', type=int, help='evaluate this many random combinations instead of a grid')
+    parser.add_argument('--workers', type=int)
+    arguments = parser.parse_args()
+    if arguments.store:
+        # The price column is mapped straight from the store, so years of ticks are not read into memory
+        store = MarketHistoryStore(arguments.path)
+        if arguments.klines:
+            prices = store.klines(arguments.symbol, arguments.interval).column('close')
+        else:
+            prices = store.aggregate_trades(arguments.symbol).column('price')
+    else:
+        ticks = kline_ticks(arguments.path) if arguments.klines else trade_ticks(arguments.path)
+        prices = np.fromiter((tick.close for tick in ticks), dtype=np.float64)
+    if arguments.random:
+        combinations = random_combinations(arguments.random, arguments.raise_range, arguments.decrease_range)
+    else:
+        combinations = grid(
+            np.linspace(*arguments.raise_range, arguments.steps),
+            np.linspace(*arguments.decrease_range, arguments.steps)
+        )
+    print(sweep(prices, *combinations, arguments.horizon, arguments.entry_step, arguments.workers))
+
+
+if __name__ == '__main__':
+    main()
@@ -1,22 +1,79 @@
-"""This module contains a quantity implementation"""
+"""This module contains a quantity implementation counted in whole step-size lots
+
+Growth after an expired order follows a precomputed ladder of lot counts, so every size is a multiple of the step
+size and the ladder does not drift however many times the quantity grows.
+"""
+from bisect import bisect_right
+from typing import Optional
+from _decimal import Decimal, ROUND_HALF_EVEN
 
 
 class Quantity:
-    def __init__(self, init_value: float):
-        self.__init_value = init_value
-        self.__quantity = init_value
+    def __init__(
+            self,
+            init_value: float,
+            step_size: Decimal = Decimal('0.00000001'),
+            growth: Decimal = Decimal('1.1'),
+            ladder_size: int = 32
+    ):
+        init_lots = int(Decimal(str(init_value)) / step_size)
+        if init_lots <= 0:
+            raise ValueError(f"Quantity {init_value} is below the step size {step_size}")
+        self.__step_size = step_size
+        self.__growth = growth
+        self.__ladder = [init_lots]
+        self.__ladder_values = [float(init_lots * step_size)]
+        self.__extend_ladder(ladder_size)
+        self.__lots = init_lots
+        self.__value = self.__ladder_values[0]
+        self.__rung: Optional[int] = 0
+
+    def grow(self):
+        if self.__rung is None:
+            self.multiply(self.__growth)
+            return
+        rung = self.__rung + 1
+        if rung == len(self.__ladder):
+            self.__extend_ladder(len(self.__ladder))
+        self.__lots = self.__ladder[rung]
+        self.__value = self.__ladder_values[rung]
+        self.__rung = rung
 
     def double(self):
-        self.__quantity = self.__quantity * 2
+        self.__set_lots(self.__lots * 2)
 
     def multiply(self, multiplier: float):
-        self.__quantity = self.__quantity * multiplier
+        self.__set_lots(int(self.__lots * Decimal(str(multiplier))))
 
     def reset(self):
-        self.__quantity = self.__init_value
+        self.__lots = self.__ladder[0]
+        self.__value = self.__ladder_values[0]
+        self.__rung = 0
+
+    def restore(self, quantity: float):
+        self.__set_lots(int((Decimal(str(quantity)) / self.__step_size).to_integral_value(ROUND_HALF_EVEN)))
+
+    def lots(self) -> int:
+        return self.__lots
+
+    def decimal_value(self) -> Decimal:
+        return self.__lots * self.__step_size
 
     def float_value(self) -> float:
-        return self.__quantity
+        return self.__value
+
+    def __set_lots(self, lots: int):
+        self.__lots = max(lots, 1)
+        self.__value = float(self.__lots * self.__step_size)
+        # The last rung with the same lot count is taken, so the growth continues from where it was
+        rung = bisect_right(self.__ladder, self.__lots) - 1
+        self.__rung = rung if rung >= 0 and self.__ladder[rung] == self.__lots else None
+
+    def __extend_ladder(self, rungs: int):
+        for _ in range(rungs):
+            lots = int(self.__ladder[0] * self.__growth ** len(self.__ladder))
+            self.__ladder.append(lots)
+            self.__ladder_values.append(float(lots * self.__step_size))
 
     def __str__(self) -> str:
-        return str(self.__quantity)
+        return str(self.decimal_value())
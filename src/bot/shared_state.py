@@ -0,0 +1,204 @@
+"""This module contains state shared by the bot processes of one account through shared memory
+
+The supervisor creates the shared blocks and passes them to the worker processes, which attach to them by name.
+Every field is a double guarded by one process-shared lock, so the account-wide notional cap and the request
+weight limits are enforced across all workers without a round trip to the supervisor.
+"""
+import multiprocessing
+import time
+from multiprocessing.shared_memory import SharedMemory
+from typing import Any, Callable, Mapping, Optional
+
+
+class SharedDoubles:
+    def __init__(self, size: int, name: Optional[str] = None, lock: Optional[Any] = None):
+        self.__size = size
+        self.__owner = name is None
+        self.__memory = SharedMemory(name=name, create=self.__owner, size=size * 8)
+        self.__values = self.__memory.buf.cast('d')
+        if self.__owner:
+            for index in range(size):
+                self.__values[index] = 0.0
+        self.__lock = lock if lock is not None else multiprocessing.get_context('spawn').Lock()
+
+    def lock(self):
+        return self.__lock
+
+    def values(self) -> memoryview:
+        return self.__values
+
+    def close(self):
+        self.__values.release()
+        self.__memory.close()
+        if self.__owner:
+            self.__memory.unlink()
+
+    def __reduce__(self):
+        # A worker process attaches to the block by its name instead of copying it
+        return SharedDoubles, (self.__size, self.__memory.name, self.__lock)
+
+
+class SharedAccountState:
+    QUANTITY = 0
+    NOTIONAL = 1
+    OPEN_ORDERS = 2
+    HEARTBEAT = 3
+    FIELDS = 4
+
+    def __init__(
+            self,
+            workers: int,
+            max_notional: float,
+            clock: Callable[[], float] = time.time,
+            doubles: Optional[SharedDoubles] = None
+    ):
+        self.__workers = workers
+        self.__max_notional = max_notional
+        self.__clock = clock
+        self.__doubles = doubles if doubles is not None else SharedDoubles(workers * self.FIELDS)
+
+    def try_reserve(self, worker: int, quantity: float, notional: float) -> bool:
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            others = self.__total_notional() - values[worker * self.FIELDS + self.NOTIONAL]
+            if others + notional > self.__max_notional:
+                return False
+            values[worker * self.FIELDS + self.QUANTITY] = quantity
+            values[worker * self.FIELDS + self.NOTIONAL] = notional
+            values[worker * self.FIELDS + self.HEARTBEAT] = self.__clock()
+            return True
+
+    def open_position(self, worker: int, notional: float):
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            values[worker * self.FIELDS + self.NOTIONAL] = notional
+            values[worker * self.FIELDS + self.OPEN_ORDERS] = 1
+            values[worker * self.FIELDS + self.HEARTBEAT] = self.__clock()
+
+    def close_position(self, worker: int):
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            values[worker * self.FIELDS + self.NOTIONAL] = 0.0
+            values[worker * self.FIELDS + self.OPEN_ORDERS] = 0
+            values[worker * self.FIELDS + self.HEARTBEAT] = self.__clock()
+
+    def total_notional(self) -> float:
+        with self.__doubles.lock():
+            return self.__total_notional()
+
+    def worker_state(self, worker: int) -> dict[str, float]:
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            return {
+                'quantity': values[worker * self.FIELDS + self.QUANTITY],
+                'notional': values[worker * self.FIELDS + self.NOTIONAL],
+                'open_orders': int(values[worker * self.FIELDS + self.OPEN_ORDERS]),
+                'heartbeat': values[worker * self.FIELDS + self.HEARTBEAT]
+            }
+
+    def close(self):
+        self.__doubles.close()
+
+    def __total_notional(self) -> float:
+        values = self.__doubles.values()
+        return sum(values[worker * self.FIELDS + self.NOTIONAL] for worker in range(self.__workers))
+
+    def __reduce__(self):
+        return SharedAccountState, (self.__workers, self.__max_notional, self.__clock, self.__doubles)
+
+
+class SharedRequestWeightLimiter:
+    WEIGHT_TOKENS = 0
+    ORDER_TOKENS = 1
+    REFILLED_AT = 2
+    PAUSED_UNTIL = 3
+    USED_WEIGHT = 4
+    FIELDS = 5
+
+    def __init__(
+            self,
+            weight_limit_per_minute: int = 6000,
+            order_limit_per_10_sec: int = 50,
+            clock: Callable[[], float] = time.monotonic,
+            sleep: Callable[[float], None] = time.sleep,
+            doubles: Optional[SharedDoubles] = None
+    ):
+        self.__weight_limit = weight_limit_per_minute
+        self.__order_limit = order_limit_per_10_sec
+        self.__clock = clock
+        self.__sleep = sleep
+        if doubles is None:
+            doubles = SharedDoubles(self.FIELDS)
+            values = doubles.values()
+            values[self.WEIGHT_TOKENS] = weight_limit_per_minute
+            values[self.ORDER_TOKENS] = order_limit_per_10_sec
+            values[self.REFILLED_AT] = clock()
+        self.__doubles = doubles
+
+    def acquire(self, weight: int, orders: int = 0):
+        while True:
+            with self.__doubles.lock():
+                values = self.__doubles.values()
+                self.__refill(values)
+                now = self.__clock()
+                if (
+                        now >= values[self.PAUSED_UNTIL]
+                        and values[self.WEIGHT_TOKENS] >= weight
+                        and values[self.ORDER_TOKENS] >= orders
+                ):
+                    values[self.WEIGHT_TOKENS] = values[self.WEIGHT_TOKENS] - weight
+                    values[self.ORDER_TOKENS] = values[self.ORDER_TOKENS] - orders
+                    return
+                delay = max(
+                    values[self.PAUSED_UNTIL] - now,
+                    (weight - values[self.WEIGHT_TOKENS]) * 60 / self.__weight_limit,
+                    (orders - values[self.ORDER_TOKENS]) * 10 / self.__order_limit
+                )
+            self.__sleep(delay)
+
+    def observe(self, headers: Mapping[str, str]):
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            used_weight = headers.get('x-mbx-used-weight-1m')
+            if used_weight is not None:
+                values[self.USED_WEIGHT] = int(used_weight)
+                values[self.WEIGHT_TOKENS] = min(values[self.WEIGHT_TOKENS], self.__weight_limit - int(used_weight))
+            order_count = headers.get('x-mbx-order-count-10s')
+            if order_count is not None:
+                values[self.ORDER_TOKENS] = min(values[self.ORDER_TOKENS], self.__order_limit - int(order_count))
+
+    def pause(self, duration_in_sec: float):
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            values[self.PAUSED_UNTIL] = max(values[self.PAUSED_UNTIL], self.__clock() + duration_in_sec)
+
+    def metrics(self) -> dict[str, float]:
+        with self.__doubles.lock():
+            values = self.__doubles.values()
+            self.__refill(values)
+            return {
+                'weight_limit': self.__weight_limit,
+                'weight_available': values[self.WEIGHT_TOKENS],
+                'weight_used_reported': values[self.USED_WEIGHT],
+                'orders_limit': self.__order_limit,
+                'orders_available': values[self.ORDER_TOKENS]
+            }
+
+    def close(self):
+        self.__doubles.close()
+
+    def __refill(self, values: memoryview):
+        now = self.__clock()
+        elapsed = now - values[self.REFILLED_AT]
+        values[self.REFILLED_AT] = now
+        values[self.WEIGHT_TOKENS] = min(
+            self.__weight_limit, values[self.WEIGHT_TOKENS] + elapsed * self.__weight_limit / 60
+        )
+        values[self.ORDER_TOKENS] = min(
+            self.__order_limit, values[self.ORDER_TOKENS] + elapsed * self.__order_limit / 10
+        )
+
+    def __reduce__(self):
+        return SharedRequestWeightLimiter, (
+            self.__weight_limit, self.__order_limit, self.__clock, self.__sleep, self.__doubles
+        )
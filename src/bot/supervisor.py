@@ -0,0 +1,224 @@
+"""This script runs one bot process per symbol under a supervisor that restarts crashed workers
+
+The workers share the account-wide notional cap and the request weight limits through shared memory,
+so the caps hold across processes without a round trip to the supervisor.
+
+Run it from src/bot: python supervisor.py BTCFDUSD:0.00088 ETHFDUSD:0.0125 --max-notional 200
+"""
+import argparse
+import logging
+import multiprocessing
+import time
+from logging import DEBUG, Logger
+from pathlib import Path
+from typing import Callable, Optional
+from _decimal import Decimal
+
+from action import CompositeAction, Exit, LimitAction, LoggingAction, QuantityReset, Sleep
+from binance_client import LazyClient, LeanBinanceClient, LoggingBinanceClient, RateLimitClient, RetryClient, \
+    SpotClient
+from http_session import HttpSessionFactory
+from logger_factory import LoggerFactory, LoggingBackend
+from main import spot_client_factory
+from quantity import Quantity
+from shared_state import SharedAccountState, SharedRequestWeightLimiter
+from symbol_registry import CachingSymbolRegistryLoader
+from trade_bot import TradeBot
+from trade_client import BasicTradeClient, ExposureLimitTradeClient, JournalingTradeClient, LoggingTradeClient, \
+    RecoveringTradeClient, ReferencePrice
+from trade_journal import TradeJournal
+from trade_strategy import BuyStrategy, CycleTradeStrategySupplier, SellStrategy
+
+
+class WorkerSpec:
+    def __init__(self, symbol: str, quantity: float):
+        self.__symbol = symbol
+        self.__quantity = quantity
+
+    def symbol(self) -> str:
+        return self.__symbol
+
+    def quantity(self) -> float:
+        return self.__quantity
+
+    def __str__(self) -> str:
+        return f'{self.__symbol} x {self.__quantity}'
+
+
+class Supervisor:
+    def __init__(
+            self,
+            specs: list[WorkerSpec],
+            worker: Callable[[WorkerSpec, int, SharedAccountState, SharedRequestWeightLimiter], None],
+            account: SharedAccountState,
+            limiter: SharedRequestWeightLimiter,
+            logger: Logger,
+            restart_delay_in_sec: float = 1,
+            max_restart_delay_in_sec: float = 60,
+            clock: Callable[[], float] = time.monotonic
+    ):
+        self.__specs = specs
+        self.__worker = worker
+        self.__account = account
+        self.__limiter = limiter
+        self.__logger = logger
+        self.__restart_delay_in_sec = restart_delay_in_sec
+        self.__max_restart_delay_in_sec = max_restart_delay_in_sec
+        self.__clock = clock
+        self.__context = multiprocessing.get_context('spawn')
+        self.__processes: list[Optional[multiprocessing.Process]] = [None] * len(specs)
+        self.__started: list[float] = [0.0] * len(specs)
+        self.__restart_at: list[Optional[float]] = [None] * len(specs)
+        self.__crashes_in_a_row: list[int] = [0] * len(specs)
+        self.__restarts: list[int] = [0] * len(specs)
+
+    def start(self):
+        for index in range(len(self.__specs)):
+            self.__spawn(index)
+
+    def supervise(self) -> bool:
+        running = False
+        for index, process in enumerate(self.__processes):
+            if process is not None and process.is_alive():
+                running = True
+            elif process is not None and process.exitcode == 0:
+                self.__logger.debug('Worker %s finished', self.__specs[index])
+                self.__processes[index] = None
+            elif process is not None:
+                self.__schedule_restart(index, process.exitcode)
+                running = True
+            elif self.__restart_at[index] is not None:
+                running = True
+                if self.__clock() >= self.__restart_at[index]:
+                    self.__restarts[index] = self.__restarts[index] + 1
+                    self.__spawn(index)
+        return running
+
+    def run(self, poll_interval_in_sec: float = 1):
+        while self.supervise():
+            time.sleep(poll_interval_in_sec)
+
+    def stop(self):
+        for process in self.__processes:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.__processes:
+            if process is not None:
+                process.join()
+
+    def restarts(self, index: int) -> int:
+        return self.__restarts[index]
+
+    def __spawn(self, index: int):
+        process = self.__context.Process(
+            target=self.__worker,
+            args=(self.__specs[index], index, self.__account, self.__limiter),
+            name=f'worker-{self.__specs[index].symbol()}',
+            daemon=True
+        )
+        process.start()
+        self.__processes[index] = process
+        self.__started[index] = self.__clock()
+        self.__restart_at[index] = None
+        self.__logger.debug('Worker %s started with pid %s', self.__specs[index], process.pid)
+
+    def __schedule_restart(self, index: int, exitcode: int):
+        # A worker that crashes right after a restart is restarted with a growing delay; one that ran for longer
+        # than the maximum delay is considered healthy again
+        if self.__clock() - self.__started[index] > self.__max_restart_delay_in_sec:
+            self.__crashes_in_a_row[index] = 0
+        delay = min(self.__max_restart_delay_in_sec, self.__restart_delay_in_sec * 2 ** self.__crashes_in_a_row[index])
+        self.__crashes_in_a_row[index] = self.__crashes_in_a_row[index] + 1
+        self.__processes[index] = None
+        self.__restart_at[index] = self.__clock() + delay
+        self.__logger.warning(
+            'Worker %s exited with %s, restarting in %.1f sec, account state %s',
+            self.__specs[index], exitcode, delay, self.__account.worker_state(index)
+        )
+
+
+def run_worker(spec: WorkerSpec, index: int, account: SharedAccountState, limiter: SharedRequestWeightLimiter):
+    logging_backend = LoggingBackend.console_and_file(
+        f'%(asctime)s {spec.symbol()} %(name)s: %(message)s', Path('logs', f'{spec.symbol()}.log')
+    )
+    logging_backend.start()
+    logger_factory = LoggerFactory(f'%(asctime)s {spec.symbol()} %(name)s: %(message)s', DEBUG, logging_backend)
+    spot_client = RateLimitClient(
+        LazyClient(spot_client_factory(
+            HttpSessionFactory(),
+            Path('cache', f'time_offset_{spec.symbol()}.json'),
+            logger_factory.logger('Clock sync'),
+            logger_factory.logger('Spot client')
+        )),
+        limiter
+    )
+    symbol = CachingSymbolRegistryLoader(spot_client, Path('cache', 'symbols.json')).load().symbol(spec.symbol())
+    journal = TradeJournal(Path('journal', f'{spec.symbol()}.sqlite3'))
+    journal.start()
+    trade_client = JournalingTradeClient(
+        LoggingTradeClient(
+            ExposureLimitTradeClient(
+                RecoveringTradeClient(
+                    BasicTradeClient(
+                        client=LoggingBinanceClient(RetryClient(spot_client), logger_factory.logger('Binance client')),
+                        sell_raise_coefficient=Decimal('1.0005'),
+                        sell_decrease_coefficient=Decimal('0.9995'),
+                        buy_raise_coefficient=Decimal('1.0005'),
+                        buy_decrease_coefficient=Decimal('0.9995'),
+                        symbol=symbol
+                    )
+                ),
+                account,
+                index,
+                ReferencePrice(spot_client, symbol.name()).price
+            ),
+            logger_factory.logger('Trade client')
+        ),
+        journal
+    )
+    quantity = Quantity(spec.quantity(), symbol.step_size())
+    try:
+        TradeBot(
+            strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client), SellStrategy(trade_client)]),
+            strategy_changes_limit=LimitAction(
+                5,
+                LoggingAction(CompositeAction([QuantityReset(quantity), Sleep(600)]), logger_factory.logger('Action'))
+            ),
+            expiration_limit=LimitAction(1, LoggingAction(Exit(), logger_factory.logger('Expiration action'))),
+            logger=logger_factory.logger('Bot'),
+            journal=journal
+        ).start(quantity)
+    finally:
+        journal.close()
+        logging_backend.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Runs one bot process per symbol under a supervisor')
+    parser.add_argument('workers', nargs='+', help='SYMBOL:QUANTITY per worker')
+    parser.add_argument('--max-notional', type=float, required=True, help='account-wide open notional cap')
+    parser.add_argument('--weight-limit', type=int, default=6000, help='request weight per minute for all workers')
+    parser.add_argument('--order-limit', type=int, default=50, help='orders per 10 seconds for all workers')
+    arguments = parser.parse_args()
+    logging.basicConfig(level=DEBUG, format='%(asctime)s Supervisor: %(message)s')
+    specs = [WorkerSpec(symbol, float(quantity)) for symbol, quantity in (w.split(':') for w in arguments.workers)]
+    # The symbol cache is filled once here, so the workers only read it
+    CachingSymbolRegistryLoader(
+        LazyClient(lambda: SpotClient(LeanBinanceClient('api-key', 'api-secret', ping=False))),
+        Path('cache', 'symbols.json'),
+        ttl_in_sec=24 * 60 * 60
+    ).load()
+    account = SharedAccountState(len(specs), arguments.max_notional)
+    limiter = SharedRequestWeightLimiter(arguments.weight_limit, arguments.order_limit)
+    supervisor = Supervisor(specs, run_worker, account, limiter, logging.getLogger('Supervisor'))
+    supervisor.start()
+    try:
+        supervisor.run()
+    finally:
+        supervisor.stop()
+        account.close()
+        limiter.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""This module contains a registry of symbols with their exchange filters loaded from the exchange info"""
+import json
+import time
+from pathlib import Path
+from typing import Any, Callable, Optional
+from _decimal import Decimal, ROUND_DOWN, ROUND_HALF_EVEN
+
+
+def _without_trailing_zeros(value: Decimal) -> Decimal:
+    normalized = value.normalize()
+    return normalized if normalized.as_tuple().exponent <= 0 else normalized.quantize(Decimal(1))
+
+
+class Symbol:
+    def __init__(self, name: str, tick_size: Decimal, step_size: Decimal, min_notional: Decimal):
+        self.__name = name
+        self.__tick_size = _without_trailing_zeros(tick_size)
+        self.__step_size = _without_trailing_zeros(step_size)
+        self.__min_notional = _without_trailing_zeros(min_notional)
+
+    def name(self) -> str:
+        return self.__name
+
+    def tick_size(self) -> Decimal:
+        return self.__tick_size
+
+    def step_size(self) -> Decimal:
+        return self.__step_size
+
+    def min_notional(self) -> Decimal:
+        return self.__min_notional
+
+    def round_price(self, price: Decimal) -> Decimal:
+        return (price / self.__tick_size).quantize(Decimal(1), ROUND_HALF_EVEN) * self.__tick_size
+
+    def round_quantity(self, quantity: Decimal) -> Decimal:
+        return (quantity / self.__step_size).quantize(Decimal(1), ROUND_DOWN) * self.__step_size
+
+    def is_notional_valid(self, quantity: Decimal, price: Decimal) -> bool:
+        return quantity * price >= self.__min_notional
+
+    def filters(self) -> dict[str, str]:
+        return {
+            'tickSize': str(self.__tick_size),
+            'stepSize': str(self.__step_size),
+            'minNotional': str(self.__min_notional)
+        }
+
+    def __eq__(self, other):
+        if isinstance(other, Symbol):
+            return self.__name == other.__name and self.filters() == other.filters()
+        return False
+
+    def __str__(self) -> str:
+        return f'{self.__name}, tick size {self.__tick_size}, step size {self.__step_size}'
+
+
+class SymbolRegistry:
+    def __init__(self, symbols: dict[str, Symbol]):
+        self.__symbols = symbols
+
+    def symbol(self, name: str) -> Symbol:
+        if name in self.__symbols:
+            return self.__symbols[name]
+        raise ValueError(f"Unknown symbol: {name}")
+
+    def symbols(self) -> list[Symbol]:
+        return list(self.__symbols.values())
+
+    @staticmethod
+    def from_exchange_info(exchange_info: dict[str, Any]) -> 'SymbolRegistry':
+        symbols = {}
+        for symbol_info in exchange_info['symbols']:
+            filters = {symbol_filter['filterType']: symbol_filter for symbol_filter in symbol_info['filters']}
+            notional_filter = filters.get('NOTIONAL', filters.get('MIN_NOTIONAL', {'minNotional': '0'}))
+            symbols[symbol_info['symbol']] = Symbol(
+                symbol_info['symbol'],
+                Decimal(filters['PRICE_FILTER']['tickSize']),
+                Decimal(filters['LOT_SIZE']['stepSize']),
+                Decimal(notional_filter['minNotional'])
+            )
+        return SymbolRegistry(symbols)
+
+    @staticmethod
+    def from_filters(filters: dict[str, dict[str, str]]) -> 'SymbolRegistry':
+        return SymbolRegistry({
+            name: Symbol(
+                name,
+                Decimal(symbol_filters['tickSize']),
+                Decimal(symbol_filters['stepSize']),
+                Decimal(symbol_filters['minNotional'])
+            ) for name, symbol_filters in filters.items()
+        })
+
+    def filters(self) -> dict[str, dict[str, str]]:
+        return {name: symbol.filters() for name, symbol in self.__symbols.items()}
+
+
+class CachingSymbolRegistryLoader:
+    def __init__(
+            self,
+            client,
+            cache_path: Path,
+            ttl_in_sec: Optional[float] = None,
+            clock: Callable[[], float] = time.time
+    ):
+        self.__client = client
+        self.__cache_path = cache_path
+        self.__ttl_in_sec = ttl_in_sec
+        self.__clock = clock
+
+    def load(self) -> SymbolRegistry:
+        if self.__is_fresh():
+            with self.__cache_path.open() as cache:
+                return SymbolRegistry.from_filters(json.load(cache))
+        registry = SymbolRegistry.from_exchange_info(self.__client.get_exchange_info())
+        self.__cache_path.parent.mkdir(parents=True, exist_ok=True)
+        with self.__cache_path.open('w') as cache:
+            json.dump(registry.filters(), cache)
+        return registry
+
+    def __is_fresh(self) -> bool:
+        if not self.__cache_path.exists():
+            return False
+        return self.__ttl_in_sec is None or self.__clock() - self.__cache_path.stat().st_mtime <= self.__ttl_in_sec
@@ -1,48 +1,78 @@
 """This module contains a bot that can trade with a special client following special strategies"""
+import threading
+import time
 from logging import Logger
+from queue import Queue
+from typing import Callable, Optional
 
 from action import LimitAction
 from quantity import Quantity
 from counter import Counter
-from trade_strategy import TradeStrategySupplier
+from metrics import CycleBreakdown
+from trade_client import LimitMakerOrder, Order
+from trade_journal import TradeJournal
+from trade_strategy import TradeStrategy, TradeStrategySupplier
 
 
 class TradeBot:
+    MAX_STRATEGIES = 16
+
     def __init__(
             self,
             strategy_supplier: TradeStrategySupplier,
             strategy_changes_limit: LimitAction,
             expiration_limit: LimitAction,
-            logger: Logger
+            logger: Logger,
+            cycle_breakdown: Optional[CycleBreakdown] = None,
+            journal: Optional[TradeJournal] = None,
+            clock: Callable[[], float] = time.monotonic
     ):
         self.__strategy_changes_in_a_row_counter = Counter(0)
         self.__strategy_supplier = strategy_supplier
         self.__strategy_changes_limit = strategy_changes_limit
         self.__expiration_limit = expiration_limit
         self.__logger = logger
+        self.__cycle_breakdown = cycle_breakdown
+        self.__journal = journal
+        self.__clock = clock
         self.__run_counter = Counter(1)
         self.__filled_counter = Counter(0)
         self.__expired_counter = Counter(0)
 
     def start(self, quantity: Quantity):
         strategy = self.__strategy_supplier.next_strategy()
+        pending_order = None
+        if self.__journal is not None:
+            strategy, pending_order = self.__recover(strategy, quantity)
+            self.__record_state(strategy, quantity)
         while True:
-            self.__logger.debug("Run %s, strategy %s", str(self.__run_counter), str(strategy))
+            self.__logger.debug("Run %s, strategy %s", self.__run_counter.int_value(), strategy)
             self.__logger.debug(
                 "Orders filled %s, expired %s",
-                str(self.__filled_counter),
-                str(self.__expired_counter)
+                self.__filled_counter.int_value(),
+                self.__expired_counter.int_value()
             )
-            status = strategy.run(quantity)
+            if self.__cycle_breakdown is not None:
+                self.__cycle_breakdown.start()
+            started = self.__clock()
+            if pending_order is not None:
+                status = strategy.resume(pending_order)
+                pending_order = None
+            else:
+                status = strategy.run(quantity)
+            if self.__cycle_breakdown is not None:
+                self.__logger.debug("Cycle %s", self.__cycle_breakdown.finish(status))
+            self.__strategy_supplier.record(strategy, status, self.__clock() - started)
             self.__run_counter.inc()
             if status == 'FILLED':
                 self.__filled_counter.inc()
                 self.__strategy_changes_in_a_row_counter.reset()
                 quantity.reset()
+                strategy = self.__strategy_supplier.strategy_after_fill(strategy)
             elif status == 'EXPIRED':
                 self.__expired_counter.inc()
                 self.__expiration_limit.run(self.__expired_counter)
-                quantity.multiply(1.1)
+                quantity.grow()
                 next_strategy = self.__strategy_supplier.next_strategy()
                 if strategy != next_strategy:
                     self.__strategy_changes_in_a_row_counter.inc()
@@ -50,3 +80,57 @@ class TradeBot:
                 strategy = next_strategy
             else:
                 raise ValueError(f"Unknown order status: {status}. I'm stopping.")
+            if self.__journal is not None:
+                self.__record_state(strategy, quantity)
+
+    def __recover(self, strategy: TradeStrategy, quantity: Quantity) -> tuple[TradeStrategy, Optional[Order]]:
+        recovered_state = self.__journal.recover()
+        state = recovered_state.state()
+        if state is None:
+            return strategy, None
+        self.__run_counter = Counter(state['run'])
+        self.__filled_counter = Counter(state['filled'])
+        self.__expired_counter = Counter(state['expired'])
+        self.__strategy_changes_in_a_row_counter = Counter(state['strategy_changes_in_a_row'])
+        quantity.restore(state['quantity'])
+        for _ in range(self.MAX_STRATEGIES):
+            if str(strategy) == state['strategy']:
+                break
+            strategy = self.__strategy_supplier.next_strategy()
+        else:
+            raise ValueError(f"Unknown journaled strategy: {state['strategy']}. I'm stopping.")
+        if recovered_state.unbracketed_market_order() is not None:
+            self.__logger.warning(
+                "The market order %s was journaled without its OCO order", recovered_state.unbracketed_market_order()
+            )
+        self.__logger.debug("Recovered %s", state)
+        if recovered_state.outstanding_order_id() is None:
+            return strategy, None
+        return strategy, LimitMakerOrder(recovered_state.outstanding_order_id())
+
+    def __record_state(self, strategy: TradeStrategy, quantity: Quantity):
+        self.__journal.record(
+            'bot_state',
+            run=self.__run_counter.int_value(),
+            filled=self.__filled_counter.int_value(),
+            expired=self.__expired_counter.int_value(),
+            strategy_changes_in_a_row=self.__strategy_changes_in_a_row_counter.int_value(),
+            quantity=quantity.float_value(),
+            strategy=str(strategy)
+        )
+
+
+def run_bots(bots: list[tuple[TradeBot, Quantity]]):
+    # Every bot waits for its bracket in its own thread, so capital of one symbol is not idle while the bracket of
+    # another one waits to fill; the first bot to stop stops the caller with its exception
+    stopped: Queue[BaseException] = Queue()
+
+    def run(bot: TradeBot, quantity: Quantity):
+        try:
+            bot.start(quantity)
+        except BaseException as exception:  # pylint: disable=broad-exception-caught
+            stopped.put(exception)
+
+    for index, (bot, quantity) in enumerate(bots):
+        threading.Thread(target=run, args=(bot, quantity), name=f'trade-bot-{index}', daemon=True).start()
+    raise stopped.get()
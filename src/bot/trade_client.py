@@ -1,14 +1,29 @@
 """This module contains a client with specific methods over basic Binance client's methods"""
+import sys
 import time
 from abc import ABC, abstractmethod
+from collections import deque
+from concurrent import futures
 from logging import Logger
-from typing import Any
+from typing import Any, Callable, Optional
 from _decimal import Decimal
 
 import binance_client
+from action import Action, Sleep
+from market_data import MarketDataRegistry
+from metrics import CycleBreakdown, Histogram, Metrics
+from order_status_coordinator import OrderStatusCoordinator
+from shared_state import SharedAccountState
+from symbol_registry import Symbol
+from trade_history import TradeHistory
+from trade_journal import TradeJournal
+from user_data_stream import OrderStatusRegistry
 
 
 class Order(ABC):
+    # Orders are created for every cycle and kept by the journal and the logs, so they carry no instance dict
+    __slots__ = ('__id',)
+
     def __init__(self, id: int):
         self.__id = id
 
@@ -19,14 +34,41 @@ class Order(ABC):
     def get_status(self, client) -> str:
         pass
 
+    @abstractmethod
+    async def get_status_async(self, client) -> str:
+        pass
+
 
 class LimitMakerOrder(Order):
-    def __init__(self, id: int):
+    __slots__ = ('__limit_price', '__stop_price', '__stop_order_id')
+
+    def __init__(
+            self,
+            id: int,
+            limit_price: Optional[str] = None,
+            stop_price: Optional[str] = None,
+            stop_order_id: Optional[int] = None
+    ):
+        self.__limit_price = limit_price
+        self.__stop_price = stop_price
+        self.__stop_order_id = stop_order_id
         super().__init__(id)
 
+    def limit_price(self) -> Optional[str]:
+        return self.__limit_price
+
+    def stop_price(self) -> Optional[str]:
+        return self.__stop_price
+
+    def stop_order_id(self) -> Optional[int]:
+        return self.__stop_order_id
+
     def get_status(self, client) -> str:
         return client.poll_terminal_order_status(self.id())
 
+    async def get_status_async(self, client) -> str:
+        return await client.poll_terminal_order_status(self.id())
+
     def __eq__(self, other):
         if isinstance(other, LimitMakerOrder):
             return self.id() == other.id()
@@ -37,20 +79,50 @@ class LimitMakerOrder(Order):
 
 
 class MarketOrder(Order):
-    def __init__(self, id: int, status: str, price: str):
+    __slots__ = ('__status', '__price', '__quantity', '__commission', '__commission_asset', '__average_price')
+
+    def __init__(
+            self,
+            id: int,
+            status: str,
+            price: str,
+            quantity: Optional[Decimal] = None,
+            commission: Decimal = Decimal(0),
+            commission_asset: Optional[str] = None,
+            average_price: Optional[Decimal] = None
+    ):
         self.__status = status
         self.__price = price
+        self.__quantity = quantity
+        self.__commission = commission
+        self.__commission_asset = commission_asset
+        self.__average_price = average_price
         super().__init__(id)
 
     def price(self) -> str:
         return self.__price
 
+    def average_price(self) -> Optional[Decimal]:
+        return self.__average_price
+
+    def quantity(self) -> Optional[Decimal]:
+        return self.__quantity
+
+    def commission(self) -> Decimal:
+        return self.__commission
+
+    def commission_asset(self) -> Optional[str]:
+        return self.__commission_asset
+
     def get_status(self, client) -> str:
         return self.__status
 
+    async def get_status_async(self, client) -> str:
+        return self.__status
+
     def __eq__(self, other):
         if isinstance(other, MarketOrder):
-            return self.id() == other.id() and self.__status == self.__status and self.__price == self.__price
+            return self.id() == other.id() and self.__status == other.__status and self.__price == other.__price
         return False
 
     def __str__(self) -> str:
@@ -87,22 +159,22 @@ class LoggingTradeClient(TradeClient):
 
     def buy_market_order(self, quantity: float) -> MarketOrder:
         order = self.__trade_client.buy_market_order(quantity)
-        self.__logger.debug(str(order))
+        self.__logger.debug('%s', order)
         return order
 
     def sell_market_order(self, quantity: float) -> MarketOrder:
         order = self.__trade_client.sell_market_order(quantity)
-        self.__logger.debug(str(order))
+        self.__logger.debug('%s', order)
         return order
 
     def sell_oco_order(self, quantity: float, market_price: str) -> Order:
         order = self.__trade_client.sell_oco_order(quantity, market_price)
-        self.__logger.debug(str(order))
+        self.__logger.debug('%s', order)
         return order
 
     def buy_oco_order(self, quantity: float, market_price: str) -> Order:
         order_id = self.__trade_client.buy_oco_order(quantity, market_price)
-        self.__logger.debug(str(order_id))
+        self.__logger.debug('%s', order_id)
         return order_id
 
     def poll_terminal_order_status(self, order_id: int) -> str:
@@ -112,6 +184,434 @@ class LoggingTradeClient(TradeClient):
         return status
 
 
+class EntryGapTradeClient(TradeClient):
+    def __init__(self, trade_client: TradeClient, logger: Logger, clock: Callable[[], float] = time.perf_counter):
+        self.__trade_client = trade_client
+        self.__logger = logger
+        self.__clock = clock
+        self.__market_order_filled_at: Optional[float] = None
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(self.__trade_client.buy_market_order(quantity))
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(self.__trade_client.sell_market_order(quantity))
+
+    def __market_order(self, order: MarketOrder) -> MarketOrder:
+        self.__market_order_filled_at = self.__clock()
+        return order
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        started = self.__clock()
+        order = self.__trade_client.sell_oco_order(quantity, market_price)
+        self.__report_gap(started)
+        return order
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        started = self.__clock()
+        order = self.__trade_client.buy_oco_order(quantity, market_price)
+        self.__report_gap(started)
+        return order
+
+    def __report_gap(self, started: float):
+        if self.__market_order_filled_at is not None:
+            placed = self.__clock()
+            self.__logger.debug(
+                'Market to OCO gap %.3f ms: %.3f ms before sending, %.3f ms placing',
+                (placed - self.__market_order_filled_at) * 1000,
+                (started - self.__market_order_filled_at) * 1000,
+                (placed - started) * 1000
+            )
+            self.__market_order_filled_at = None
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        return self.__trade_client.poll_terminal_order_status(order_id)
+
+
+class TimingTradeClient(TradeClient):
+    def __init__(
+            self,
+            trade_client: TradeClient,
+            metrics: Metrics,
+            layer: str,
+            cycle_breakdown: Optional[CycleBreakdown] = None
+    ):
+        self.__trade_client = trade_client
+        self.__market_fill = metrics.histogram('trade_client_seconds', layer=layer, phase='market_fill')
+        self.__oco_placement = metrics.histogram('trade_client_seconds', layer=layer, phase='oco_placement')
+        self.__terminal_status = metrics.histogram('trade_client_seconds', layer=layer, phase='terminal_status')
+        self.__cycle_breakdown = cycle_breakdown
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        started = time.perf_counter_ns()
+        try:
+            return self.__trade_client.buy_market_order(quantity)
+        finally:
+            self.__record(self.__market_fill, 'market_fill', started)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        started = time.perf_counter_ns()
+        try:
+            return self.__trade_client.sell_market_order(quantity)
+        finally:
+            self.__record(self.__market_fill, 'market_fill', started)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        started = time.perf_counter_ns()
+        try:
+            return self.__trade_client.sell_oco_order(quantity, market_price)
+        finally:
+            self.__record(self.__oco_placement, 'oco_placement', started)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        started = time.perf_counter_ns()
+        try:
+            return self.__trade_client.buy_oco_order(quantity, market_price)
+        finally:
+            self.__record(self.__oco_placement, 'oco_placement', started)
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        started = time.perf_counter_ns()
+        try:
+            return self.__trade_client.poll_terminal_order_status(order_id)
+        finally:
+            self.__record(self.__terminal_status, 'terminal_status', started)
+
+    def __record(self, histogram: Histogram, phase: str, started: int):
+        duration_in_ns = time.perf_counter_ns() - started
+        histogram.record(duration_in_ns)
+        if self.__cycle_breakdown is not None:
+            self.__cycle_breakdown.record(phase, duration_in_ns)
+
+
+class StartupTimingTradeClient(TradeClient):
+    def __init__(self, trade_client: TradeClient, metrics: Metrics, logger: Logger, started_in_ns: int):
+        self.__trade_client = trade_client
+        self.__startup = metrics.histogram('startup_to_first_order_seconds')
+        self.__logger = logger
+        self.__started_in_ns: Optional[int] = started_in_ns
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        order = self.__trade_client.buy_market_order(quantity)
+        self.__record()
+        return order
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        order = self.__trade_client.sell_market_order(quantity)
+        self.__record()
+        return order
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__trade_client.sell_oco_order(quantity, market_price)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__trade_client.buy_oco_order(quantity, market_price)
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        return self.__trade_client.poll_terminal_order_status(order_id)
+
+    def __record(self):
+        if self.__started_in_ns is None:
+            return
+        duration_in_ns = time.perf_counter_ns() - self.__started_in_ns
+        self.__started_in_ns = None
+        self.__startup.record(duration_in_ns)
+        self.__logger.debug('The first order is filled %.3f sec after the start', duration_in_ns / 1e9)
+
+
+class DeferredStartTradeClient(TradeClient):
+    def __init__(self, trade_client: TradeClient, starters: list[Callable[[], None]]):
+        self.__trade_client = trade_client
+        self.__starters: Optional[list[Callable[[], None]]] = starters
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        self.__start()
+        return self.__trade_client.buy_market_order(quantity)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        self.__start()
+        return self.__trade_client.sell_market_order(quantity)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        self.__start()
+        return self.__trade_client.sell_oco_order(quantity, market_price)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        self.__start()
+        return self.__trade_client.buy_oco_order(quantity, market_price)
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        self.__start()
+        return self.__trade_client.poll_terminal_order_status(order_id)
+
+    def __start(self):
+        # The streams talk to the exchange as soon as they run, so they are started with the first order instead
+        # of delaying it; until the user data stream is up the order statuses are polled
+        if self.__starters is None:
+            return
+        starters, self.__starters = self.__starters, None
+        for start in starters:
+            start()
+
+
+class HistoryTradeClient(TradeClient):
+    def __init__(
+            self,
+            trade_client: TradeClient,
+            history: TradeHistory,
+            base_asset: str,
+            quote_asset: str,
+            logger: Logger,
+            clock: Callable[[], float] = time.time,
+            order_status_registry: Optional[OrderStatusRegistry] = None,
+            commission_timeout_in_sec: float = 5
+    ):
+        self.__trade_client = trade_client
+        self.__history = history
+        self.__base_asset = base_asset
+        self.__quote_asset = quote_asset
+        self.__logger = logger
+        self.__clock = clock
+        self.__order_status_registry = order_status_registry
+        self.__commission_timeout_in_sec = commission_timeout_in_sec
+        self.__entry: Optional[tuple[int, MarketOrder, float, float]] = None
+        self.__brackets: dict[int, tuple[tuple[int, MarketOrder, float, float], LimitMakerOrder]] = {}
+        self.__exits: deque[tuple[tuple[int, MarketOrder, float, float], float, Optional[float], Optional[int], bool,
+                                  float]] = deque()
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        order = self.__trade_client.buy_market_order(quantity)
+        self.__entry = (1, order, quantity, self.__clock())
+        return order
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        order = self.__trade_client.sell_market_order(quantity)
+        self.__entry = (-1, order, quantity, self.__clock())
+        return order
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__bracket(self.__trade_client.sell_oco_order(quantity, market_price))
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__bracket(self.__trade_client.buy_oco_order(quantity, market_price))
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        status = self.__trade_client.poll_terminal_order_status(order_id)
+        bracket = self.__brackets.pop(order_id, None)
+        if bracket is not None:
+            # The limit maker leg expires when the stop leg executes, so an expired bracket exited at the stop
+            entry, order = bracket
+            filled = status == 'FILLED'
+            exit_price = order.limit_price() if filled else order.stop_price()
+            if exit_price is not None:
+                exit_order_id = order.id() if filled else order.stop_order_id()
+                self.__exits.append((entry, float(exit_price), None, exit_order_id, filled, self.__clock()))
+        self.__record_exits()
+        return status
+
+    def close(self):
+        # The exits still waiting for their commissions are recorded with the fees known so far
+        self.__record_exits(True)
+
+    def __bracket(self, order: Order) -> Order:
+        entry = self.__entry
+        self.__entry = None
+        if entry is None:
+            return order
+        if isinstance(order, MarketOrder):
+            exit_price = self.__price(order)
+            exit_fee = self.__fee(order.commission(), order.commission_asset(), exit_price)
+            self.__exits.append((entry, exit_price, exit_fee, None, False, self.__clock()))
+        elif isinstance(order, LimitMakerOrder):
+            self.__brackets[order.id()] = (entry, order)
+        self.__record_exits()
+        return order
+
+    def __record_exits(self, final: bool = False):
+        # The commission of an OCO leg comes with its trades on the user data stream, which may be later than the
+        # status the bot waited for. The trading thread only looks it up and records the exit on a later call,
+        # and the exits are recorded in the order they closed, as the history is kept in time order
+        while self.__exits:
+            entry, exit_price, exit_fee, exit_order_id, filled, closed_at = self.__exits[0]
+            if exit_fee is None:
+                exit_fee = self.__exit_fee(exit_order_id, exit_price, closed_at, final)
+                if exit_fee is None:
+                    return
+            self.__exits.popleft()
+            self.__close(entry, exit_price, exit_fee, filled, closed_at)
+
+    def __close(
+            self,
+            entry: tuple[int, MarketOrder, float, float],
+            exit_price: float,
+            exit_fee: float,
+            filled: bool,
+            closed_at: float
+    ):
+        side, market_order, requested_quantity, opened_at = entry
+        quantity = market_order.quantity()
+        entry_price = self.__price(market_order)
+        self.__history.append(
+            closed_at,
+            side,
+            filled,
+            float(quantity) if quantity is not None else requested_quantity,
+            entry_price,
+            exit_price,
+            self.__fee(market_order.commission(), market_order.commission_asset(), entry_price) + exit_fee,
+            closed_at - opened_at
+        )
+        self.__logger.debug('%s', self.__history.statistics())
+
+    def __exit_fee(self, order_id: Optional[int], exit_price: float, closed_at: float, final: bool) -> Optional[float]:
+        if order_id is None or self.__order_status_registry is None:
+            return 0.0
+        commission = self.__order_status_registry.wait_commission(order_id, 0)
+        if commission is not None:
+            return self.__fee(commission[0], commission[1], exit_price)
+        # A report missed while the stream was down is not sent again, so only a connected stream is waited for
+        if not final and self.__order_status_registry.connection_epoch() is not None \
+                and self.__clock() - closed_at < self.__commission_timeout_in_sec:
+            return None
+        self.__logger.debug('Commission of the order %s is unknown', order_id)
+        return 0.0
+
+    def __fee(self, commission: Decimal, commission_asset: Optional[str], price: float) -> float:
+        # Commissions paid in a third asset, such as BNB, have no price here and are left out of the fees
+        if commission_asset == self.__base_asset:
+            return float(commission) * price
+        if commission_asset == self.__quote_asset:
+            return float(commission)
+        return 0.0
+
+    @staticmethod
+    def __price(order: MarketOrder) -> float:
+        average_price = order.average_price()
+        return float(average_price) if average_price is not None else float(order.price())
+
+
+class JournalingTradeClient(TradeClient):
+    def __init__(self, trade_client: TradeClient, journal: TradeJournal):
+        self.__trade_client = trade_client
+        self.__journal = journal
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(self.__trade_client.buy_market_order(quantity), 'BUY', quantity)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(self.__trade_client.sell_market_order(quantity), 'SELL', quantity)
+
+    def __market_order(self, order: MarketOrder, side: str, quantity: float) -> MarketOrder:
+        self.__journal.record('market_order', order_id=order.id(), side=side, quantity=quantity, price=order.price())
+        return order
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__oco_order(self.__trade_client.sell_oco_order(quantity, market_price), 'SELL', quantity)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__oco_order(self.__trade_client.buy_oco_order(quantity, market_price), 'BUY', quantity)
+
+    def __oco_order(self, order: Order, side: str, quantity: float) -> Order:
+        if isinstance(order, LimitMakerOrder):
+            self.__journal.record('oco_order', order_id=order.id(), side=side, quantity=quantity)
+        else:
+            self.__journal.record('closing_market_order', order_id=order.id(), side=side, quantity=quantity)
+        return order
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        status = self.__trade_client.poll_terminal_order_status(order_id)
+        self.__journal.record('order_status', order_id=order_id, status=status)
+        return status
+
+
+class ReferencePrice:
+    def __init__(self, client, symbol: str, market_data: Optional[MarketDataRegistry] = None):
+        self.__client = client
+        self.__symbol = symbol
+        self.__market_data = market_data
+
+    def price(self) -> Optional[float]:
+        # The streamed price costs nothing; the top of the REST order book is the fallback without one
+        if self.__market_data is not None:
+            reference_price = self.__market_data.reference_price(self.__symbol)
+            if reference_price is not None:
+                return float(reference_price)
+        order_book = self.__client.get_order_book(symbol=self.__symbol, limit=1)
+        if not order_book['bids'] or not order_book['asks']:
+            return None
+        return (float(order_book['bids'][0][0]) + float(order_book['asks'][0][0])) / 2
+
+
+class ExposureLimitTradeClient(TradeClient):
+    def __init__(
+            self,
+            trade_client: TradeClient,
+            account: SharedAccountState,
+            worker: int,
+            reference_price: Callable[[], Optional[float]],
+            pause: Action = Sleep(1),
+            max_pauses_without_price: int = 30
+    ):
+        self.__trade_client = trade_client
+        self.__account = account
+        self.__worker = worker
+        self.__reference_price = reference_price
+        self.__pause = pause
+        self.__max_pauses_without_price = max_pauses_without_price
+        self.__last_price: Optional[float] = None
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        self.__reserve(quantity)
+        return self.__open_position(lambda: self.__trade_client.buy_market_order(quantity), quantity)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        self.__reserve(quantity)
+        return self.__open_position(lambda: self.__trade_client.sell_market_order(quantity), quantity)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__bracket(self.__trade_client.sell_oco_order(quantity, market_price))
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__bracket(self.__trade_client.buy_oco_order(quantity, market_price))
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        status = self.__trade_client.poll_terminal_order_status(order_id)
+        self.__account.close_position(self.__worker)
+        return status
+
+    def __reserve(self, quantity: float):
+        # The notional is estimated with the last fill price of the worker until the market order is filled;
+        # the first order is estimated with the market price. Without any price the cap cannot be checked, so the
+        # worker waits for one and stops when none comes, rather than ordering past the cap
+        pauses_without_price = 0
+        while True:
+            if self.__last_price is None:
+                self.__last_price = self.__reference_price()
+            if self.__last_price is None:
+                if pauses_without_price >= self.__max_pauses_without_price:
+                    raise ValueError(f"No price to check the exposure of {quantity} against. I'm stopping.")
+                pauses_without_price = pauses_without_price + 1
+            elif self.__account.try_reserve(self.__worker, quantity, quantity * self.__last_price):
+                return
+            self.__pause.run()
+
+    def __open_position(self, place: Callable[[], MarketOrder], quantity: float) -> MarketOrder:
+        try:
+            order = place()
+        except Exception:
+            self.__account.close_position(self.__worker)
+            raise
+        self.__last_price = float(order.price())
+        self.__account.open_position(self.__worker, quantity * self.__last_price)
+        return order
+
+    def __bracket(self, order: Order) -> Order:
+        if isinstance(order, MarketOrder):
+            # The OCO order was replaced with a closing market order, so the position is already flat
+            self.__account.close_position(self.__worker)
+        return order
+
+
 class RecoveringTradeClient(TradeClient):
     def __init__(self, client: TradeClient):
         self.__client = client
@@ -140,70 +640,282 @@ class RecoveringTradeClient(TradeClient):
         return self.__client.poll_terminal_order_status(order_id)
 
 
-class BasicTradeClient(TradeClient):
+class StreamingTradeClient(TradeClient):
+    def __init__(self, client: TradeClient, registry: OrderStatusRegistry, wait_timeout_in_sec: int = 60):
+        self.__client = client
+        self.__registry = registry
+        self.__wait_timeout_in_sec = wait_timeout_in_sec
+        self.__order_epochs: dict[int, int] = {}
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return self.__client.buy_market_order(quantity)
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return self.__client.sell_market_order(quantity)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        epoch = self.__registry.connection_epoch()
+        return self.__remember_epoch(self.__client.sell_oco_order(quantity, market_price), epoch)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        epoch = self.__registry.connection_epoch()
+        return self.__remember_epoch(self.__client.buy_oco_order(quantity, market_price), epoch)
+
+    def __remember_epoch(self, order: Order, epoch: Optional[int]) -> Order:
+        if isinstance(order, MarketOrder):
+            # A market order taken when the OCO is rejected is never polled, so no epoch is kept for it
+            self.__order_epochs.pop(order.id(), None)
+        elif epoch is not None:
+            self.__order_epochs[order.id()] = epoch
+        return order
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        epoch = self.__order_epochs.pop(order_id, None)
+        while epoch is not None and self.__registry.connection_epoch() == epoch:
+            status = self.__registry.wait_terminal_status(order_id, epoch, self.__wait_timeout_in_sec)
+            if status is not None:
+                return status
+        return self.__client.poll_terminal_order_status(order_id)
+
+
+class CoordinatedTradeClient(TradeClient):
     def __init__(
             self,
-            client,
-            sell_raise_coefficient: Decimal,
-            sell_decrease_coefficient: Decimal,
-            buy_raise_coefficient: Decimal,
-            buy_decrease_coefficient: Decimal,
+            client: TradeClient,
+            coordinator: OrderStatusCoordinator,
+            symbol: Symbol,
+            wait_timeout_in_sec: float = 30
     ):
         self.__client = client
-        self.__sell_raise_coefficient = sell_raise_coefficient
-        self.__sell_decrease_coefficient = sell_decrease_coefficient
-        self.__buy_raise_coefficient = buy_raise_coefficient
-        self.__buy_decrease_coefficient = buy_decrease_coefficient
-        self.__price_decimal_digits = 2
-        self.__quantity_decimal_digits = 2
-        self.__symbol = 'BTCFDUSD'
+        self.__coordinator = coordinator
+        self.__symbol = symbol
+        self.__wait_timeout_in_sec = wait_timeout_in_sec
 
     def buy_market_order(self, quantity: float) -> MarketOrder:
-        return self.__market_order(quantity, 'BUY')
+        return self.__client.buy_market_order(quantity)
 
     def sell_market_order(self, quantity: float) -> MarketOrder:
-        return self.__market_order(quantity, 'SELL')
-
-    def __market_order(self, quantity: float, side: str) -> MarketOrder:
-        request = {
-            'symbol': self.__symbol,
-            'side': side,
-            'type': 'MARKET',
-            'quantity': round(quantity, self.__quantity_decimal_digits)
-        }
-        response = self.__client.create_order(**request)
-        status = response['status']
-        fills = response['fills']
-        if status == 'FILLED':
-            if fills:
-                return MarketOrder(response['orderId'], status, fills[0]['price'])
-            raise ValueError(f"Price is undefined: {response}")
-        raise ValueError(f"Unexpected order status: {status}")
+        return self.__client.sell_market_order(quantity)
 
     def sell_oco_order(self, quantity: float, market_price: str) -> Order:
-        limit_price = str(round(Decimal(market_price) * self.__sell_raise_coefficient, self.__price_decimal_digits))
-        stop_price = str(round(Decimal(market_price) * self.__sell_decrease_coefficient, self.__price_decimal_digits))
-        return self.__oco_order(quantity, 'SELL', limit_price, stop_price)
+        return self.__client.sell_oco_order(quantity, market_price)
 
     def buy_oco_order(self, quantity: float, market_price: str) -> Order:
-        limit_price = str(round(Decimal(market_price) * self.__buy_decrease_coefficient, self.__price_decimal_digits))
-        stop_price = str(round(Decimal(market_price) * self.__buy_raise_coefficient, self.__price_decimal_digits))
-        return self.__oco_order(quantity, 'BUY', limit_price, stop_price)
+        return self.__client.buy_oco_order(quantity, market_price)
 
-    def __oco_order(self, quantity: float, side: str, limit_price: str, stop_price: str) -> LimitMakerOrder:
-        request = {
-            'symbol': self.__symbol,
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        future = self.__coordinator.watch(self.__symbol.name(), order_id)
+        while True:
+            try:
+                return future.result(timeout=self.__wait_timeout_in_sec)
+            except futures.TimeoutError:
+                if self.__coordinator.is_healthy(self.__wait_timeout_in_sec):
+                    continue
+            # The coordinator is not running or has not reached the exchange for a while, so the order is polled
+            # directly, where a failure is raised to the bot
+            self.__coordinator.unwatch(self.__symbol.name(), order_id)
+            return self.__client.poll_terminal_order_status(order_id)
+
+
+def _normalized_coefficient(coefficient: Decimal) -> Decimal:
+    # Decimal(1.0005) keeps the whole binary expansion of the float literal, while 1.0005 is what was meant
+    if len(coefficient.as_tuple().digits) > 17:
+        return Decimal(repr(float(coefficient)))
+    return coefficient
+
+
+def _round_half_even(numerator: int, denominator: int) -> int:
+    quotient, remainder = divmod(numerator, denominator)
+    if 2 * remainder > denominator or (2 * remainder == denominator and quotient % 2 == 1):
+        return quotient + 1
+    return quotient
+
+
+class OcoPricer:
+    PRICES_LIMIT = 1024
+
+    def __init__(self, symbol: Symbol, limit_coefficient: Decimal, stop_coefficient: Decimal):
+        tick_numerator, tick_denominator = symbol.tick_size().as_integer_ratio()
+        limit_numerator, limit_denominator = _normalized_coefficient(limit_coefficient).as_integer_ratio()
+        stop_numerator, stop_denominator = _normalized_coefficient(stop_coefficient).as_integer_ratio()
+        # A price in ticks times a coefficient is an exact ratio of integers, so both legs are rounded to whole
+        # ticks with integer arithmetic only
+        self.__limit_numerator = tick_denominator * limit_numerator
+        self.__limit_denominator = tick_numerator * limit_denominator
+        self.__stop_numerator = tick_denominator * stop_numerator
+        self.__stop_denominator = tick_numerator * stop_denominator
+        _, tick_digits, self.__tick_exponent = symbol.tick_size().as_tuple()
+        self.__tick_units = int(''.join(map(str, tick_digits)))
+        self.__prices: dict[str, tuple[int, int, str, str]] = {}
+
+    def prices(self, market_price: str) -> tuple[int, int, str, str]:
+        # Fill prices repeat a lot, so both legs are remembered in ticks and as request strings
+        prices = self.__prices.get(market_price)
+        if prices is None:
+            whole, _, fraction = market_price.partition('.')
+            if whole.isdigit() and (fraction.isdigit() or not fraction):
+                scaled_price, scale = int(whole + fraction), 10 ** len(fraction)
+            else:
+                scaled_price, scale = Decimal(market_price).as_integer_ratio()
+            limit_ticks = _round_half_even(scaled_price * self.__limit_numerator, scale * self.__limit_denominator)
+            stop_ticks = _round_half_even(scaled_price * self.__stop_numerator, scale * self.__stop_denominator)
+            prices = (limit_ticks, stop_ticks, self.__price(limit_ticks), self.__price(stop_ticks))
+            if len(self.__prices) >= self.PRICES_LIMIT:
+                self.__prices.clear()
+            self.__prices[market_price] = prices
+        return prices
+
+    def __price(self, ticks: int) -> str:
+        units = ticks * self.__tick_units
+        digits = str(units)
+        if self.__tick_exponent >= 0 or len(digits) - 1 + self.__tick_exponent < -6:
+            return str(Decimal(units).scaleb(self.__tick_exponent))
+        digits = digits.rjust(1 - self.__tick_exponent, '0')
+        return f'{digits[:self.__tick_exponent]}.{digits[self.__tick_exponent:]}'
+
+
+class OcoOrderTemplate:
+    def __init__(self, symbol: Symbol, side: str, quantity: Decimal, pricer: OcoPricer):
+        self.__symbol = symbol
+        self.__quantity = quantity
+        self.__pricer = pricer
+        notional_numerator, notional_denominator = symbol.min_notional().as_integer_ratio()
+        tick_notional_numerator, tick_notional_denominator = (quantity * symbol.tick_size()).as_integer_ratio()
+        self.__min_ticks = -(-notional_numerator * tick_notional_denominator
+                             // (notional_denominator * tick_notional_numerator))
+        self.__request = {
+            'symbol': symbol.name(),
             'side': side,
-            'quantity': round(quantity, self.__quantity_decimal_digits),
-            'price': limit_price,
-            'stopPrice': stop_price,
-            'stopLimitPrice': stop_price,
+            'quantity': str(quantity),
             'stopLimitTimeInForce': 'GTC'
         }
-        response = self.__client.create_oco_order(**request)
-        return self.__limit_maker_order(response)
 
-    def __limit_maker_order(self, oco_order: dict[str, Any]) -> LimitMakerOrder:
+    def quantity(self) -> Decimal:
+        return self.__quantity
+
+    def request(self, market_price: str) -> dict[str, Any]:
+        limit_ticks, stop_ticks, limit_price, stop_price = self.__pricer.prices(market_price)
+        if min(limit_ticks, stop_ticks) < self.__min_ticks:
+            # The lower leg is the one checked, which is the limit for a buy and the stop for a sell
+            lower_price = limit_price if limit_ticks < stop_ticks else stop_price
+            raise ValueError(f"Notional is below {self.__symbol.min_notional()}: {self.__quantity} x {lower_price}")
+        request = dict(self.__request)
+        request['price'] = limit_price
+        request['stopPrice'] = stop_price
+        request['stopLimitPrice'] = stop_price
+        return request
+
+
+class OrderMapper:
+    ROUNDED_QUANTITIES_LIMIT = 1024
+    DECIMALS_LIMIT = 1024
+
+    def __init__(
+            self,
+            sell_raise_coefficient: Decimal,
+            sell_decrease_coefficient: Decimal,
+            buy_raise_coefficient: Decimal,
+            buy_decrease_coefficient: Decimal,
+            symbol: Symbol,
+            decode_fills: bool = False
+    ):
+        self.__symbol = symbol
+        self.__decode_fills = decode_fills
+        self.__sell_pricer = OcoPricer(symbol, sell_raise_coefficient, sell_decrease_coefficient)
+        self.__buy_pricer = OcoPricer(symbol, buy_decrease_coefficient, buy_raise_coefficient)
+        self.__oco_order_templates: dict[str, OcoOrderTemplate] = {}
+        self.__rounded_quantities: dict[float, Decimal] = {}
+        self.__decimals: dict[str, Decimal] = {}
+
+    def market_order_request(self, quantity: float, side: str) -> dict[str, Any]:
+        return {
+            'symbol': self.__symbol.name(),
+            'side': side,
+            'type': 'MARKET',
+            'quantity': str(self.__quantity(quantity))
+        }
+
+    def oco_order_template(self, quantity: float, side: str) -> OcoOrderTemplate:
+        # A market order is followed by the opposite OCO of the same quantity, so the template is built and
+        # validated before the market order is sent and only the prices are left to compute after the fill
+        rounded_quantity = self.__quantity(quantity)
+        template = self.__oco_order_templates.get(side)
+        if template is None or template.quantity() != rounded_quantity:
+            pricer = self.__sell_pricer if side == 'SELL' else self.__buy_pricer
+            template = OcoOrderTemplate(self.__symbol, side, rounded_quantity, pricer)
+            self.__oco_order_templates[side] = template
+        return template
+
+    def sell_oco_order_request(self, quantity: float, market_price: str) -> dict[str, Any]:
+        return self.oco_order_template(quantity, 'SELL').request(market_price)
+
+    def buy_oco_order_request(self, quantity: float, market_price: str) -> dict[str, Any]:
+        return self.oco_order_template(quantity, 'BUY').request(market_price)
+
+    def __quantity(self, quantity: float) -> Decimal:
+        # A lot-based Quantity only takes the few sizes of its ladder, so their conversions are remembered
+        rounded_quantity = self.__rounded_quantities.get(quantity)
+        if rounded_quantity is None:
+            rounded_quantity = self.__symbol.round_quantity(Decimal(str(quantity)))
+            if rounded_quantity <= 0:
+                raise ValueError(f"Quantity {quantity} is below the step size {self.__symbol.step_size()}")
+            if len(self.__rounded_quantities) >= self.ROUNDED_QUANTITIES_LIMIT:
+                self.__rounded_quantities.clear()
+            self.__rounded_quantities[quantity] = rounded_quantity
+        return rounded_quantity
+
+    def order_request(self, order_id: int) -> dict[str, Any]:
+        return {'symbol': self.__symbol.name(), 'orderId': order_id}
+
+    def market_order(self, response: dict[str, Any]) -> MarketOrder:
+        # Only the fields the bot uses are taken from the response; the price is kept as the exchange sent it,
+        # since the OCO prices are computed from its exact digits
+        status = response['status']
+        fills = response['fills']
+        if status == 'FILLED':
+            if not fills:
+                raise ValueError(f"Price is undefined: {response}")
+            first_fill = fills[0]
+            if not self.__decode_fills:
+                # Only the trade history reads the quantity and the commission, so without it they are not decoded
+                return MarketOrder(response['orderId'], 'FILLED', first_fill['price'])
+            if len(fills) == 1:
+                quantity = self.__decimal(first_fill['qty'])
+                commission = self.__decimal(first_fill.get('commission', '0'))
+                average_price = self.__decimal(first_fill['price'])
+            else:
+                quantities = [Decimal(fill['qty']) for fill in fills]
+                quantity = sum(quantities, Decimal(0))
+                commission = sum((Decimal(fill.get('commission', '0')) for fill in fills), Decimal(0))
+                # A market order sweeps several levels of the book, so it entered at the fill-weighted price
+                average_price = sum(
+                    (Decimal(fill['price']) * fill_quantity for fill, fill_quantity in zip(fills, quantities)),
+                    Decimal(0)
+                ) / quantity
+            commission_asset = first_fill.get('commissionAsset')
+            return MarketOrder(
+                response['orderId'],
+                'FILLED',
+                first_fill['price'],
+                quantity,
+                commission,
+                sys.intern(commission_asset) if commission_asset is not None else None,
+                average_price
+            )
+        raise ValueError(f"Unexpected order status: {status}")
+
+    def __decimal(self, value: str) -> Decimal:
+        # Quantities and commissions repeat from order to order, so the orders share one Decimal per value
+        decimal = self.__decimals.get(value)
+        if decimal is None:
+            decimal = Decimal(value)
+            if len(self.__decimals) >= self.DECIMALS_LIMIT:
+                self.__decimals.clear()
+            self.__decimals[value] = decimal
+        return decimal
+
+    @staticmethod
+    def limit_maker_order(oco_order: dict[str, Any]) -> LimitMakerOrder:
         oco_status = oco_order['listOrderStatus']
         if oco_status in ('EXECUTING', 'ALL_DONE'):
             reports = oco_order['orderReports']
@@ -211,24 +923,83 @@ class BasicTradeClient(TradeClient):
                 first_report = reports[0]
                 second_report = reports[1]
                 if second_report['type'] == 'LIMIT_MAKER':
-                    order_id = second_report['orderId']
+                    limit_report, stop_report = second_report, first_report
                 elif first_report['type'] == 'LIMIT_MAKER':
-                    order_id = first_report['orderId']
+                    limit_report, stop_report = first_report, second_report
                 else:
                     raise ValueError(f"No LIMIT MAKER order in the OCO order: {oco_order}")
-                return LimitMakerOrder(order_id)
+                # The stop leg executes as a limit order at its own price once the stop price is touched
+                return LimitMakerOrder(
+                    limit_report['orderId'],
+                    limit_report.get('price'),
+                    stop_report.get('price', stop_report.get('stopPrice')),
+                    stop_report['orderId']
+                )
             raise ValueError(f"Order reports are undefined: {oco_order}")
         raise ValueError(f"Unexpected order status: {oco_status}")
 
+
+class BasicTradeClient(TradeClient):
+    def __init__(
+            self,
+            client,
+            sell_raise_coefficient: Decimal,
+            sell_decrease_coefficient: Decimal,
+            buy_raise_coefficient: Decimal,
+            buy_decrease_coefficient: Decimal,
+            symbol: Symbol,
+            polling_pause: Action = Sleep(2),
+            market_data: Optional[MarketDataRegistry] = None,
+            decode_fills: bool = False
+    ):
+        self.__client = client
+        self.__market_data = market_data
+        self.__mapper = OrderMapper(
+            sell_raise_coefficient,
+            sell_decrease_coefficient,
+            buy_raise_coefficient,
+            buy_decrease_coefficient,
+            symbol,
+            decode_fills
+        )
+        self.__polling_pause = polling_pause
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(quantity, 'BUY')
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return self.__market_order(quantity, 'SELL')
+
+    def __market_order(self, quantity: float, side: str) -> MarketOrder:
+        request = self.__mapper.market_order_request(quantity, side)
+        self.__mapper.oco_order_template(quantity, 'SELL' if side == 'BUY' else 'BUY')
+        response = self.__client.create_order(**request)
+        return self.__mapper.market_order(response)
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__oco_order(self.__mapper.sell_oco_order_request(quantity, market_price))
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> Order:
+        return self.__oco_order(self.__mapper.buy_oco_order_request(quantity, market_price))
+
+    def __oco_order(self, request: dict[str, Any]) -> Order:
+        if self.__market_data is not None and not self.__market_data.is_oco_price_valid(
+                request['symbol'], request['side'], Decimal(request['price']), Decimal(request['stopPrice'])
+        ):
+            # The exchange would reject these prices, so the rejection is raised without the round trip
+            raise binance_client.PriceOcoOrderException('The relationship of the prices for the orders is not correct')
+        response = self.__client.create_oco_order(**request)
+        return self.__mapper.limit_maker_order(response)
+
     def poll_terminal_order_status(self, order_id: int) -> str:
         polling_counter = 1
         status = self.__get_order_status(order_id)
         while status in ('NEW', 'PARTIALLY_FILLED'):
-            time.sleep(2)
+            self.__polling_pause.run()
             polling_counter = polling_counter + 1
             status = self.__get_order_status(order_id)
         return status
 
     def __get_order_status(self, order_id: int) -> str:
-        response = self.__client.get_order(symbol=self.__symbol, orderId=order_id)
+        response = self.__client.get_order(**self.__mapper.order_request(order_id))
         return response['status']
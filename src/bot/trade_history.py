@@ -0,0 +1,247 @@
+"""This module contains an append-only columnar history of the closed trades of one symbol
+
+Every column is an array of machine numbers, and the running totals are stored next to each row as prefix
+sums, so a new trade updates the statistics in constant time and any time window is answered from two prefix
+sums found by binary search instead of a scan. Full chunks are spilled to disk and only a few of them are kept
+in memory, so a bot running for months holds millions of rows in bounded memory. A history kept in a directory
+of its own is continued by the next run.
+"""
+import shutil
+import tempfile
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+from pathlib import Path
+from typing import Optional
+
+COLUMNS = {
+    'closed_at': 'd',
+    'side': 'b',
+    'filled': 'b',
+    'quantity': 'd',
+    'entry_price': 'd',
+    'exit_price': 'd',
+    'fee': 'd',
+    'pnl': 'd',
+    'time_to_fill': 'd',
+    'total_pnl': 'd',
+    'total_fees': 'd',
+    'total_wins': 'q',
+    'total_time_to_fill': 'd'
+}
+
+
+class TradeStatistics:
+    def __init__(self, trades: int, realized_pnl: float, fees: float, wins: int, time_to_fill_in_sec: float):
+        self.__trades = trades
+        self.__realized_pnl = realized_pnl
+        self.__fees = fees
+        self.__wins = wins
+        self.__time_to_fill_in_sec = time_to_fill_in_sec
+
+    def trades(self) -> int:
+        return self.__trades
+
+    def realized_pnl(self) -> float:
+        return self.__realized_pnl
+
+    def fees(self) -> float:
+        return self.__fees
+
+    def win_rate(self) -> float:
+        return self.__wins / self.__trades if self.__trades else 0.0
+
+    def average_time_to_fill_in_sec(self) -> float:
+        return self.__time_to_fill_in_sec / self.__trades if self.__trades else 0.0
+
+    def __str__(self) -> str:
+        return (
+            f'{self.__trades} trades, realized PnL {self.__realized_pnl:.8f}, fees {self.__fees:.8f}, '
+            f'win rate {self.win_rate():.2f}, average time to fill {self.average_time_to_fill_in_sec():.1f} sec'
+        )
+
+
+class TradeChunk:
+    def __init__(self, columns: Optional[dict[str, array]] = None):
+        self.__columns = columns if columns is not None else {name: array(code) for name, code in COLUMNS.items()}
+
+    def size(self) -> int:
+        return len(self.__columns['closed_at'])
+
+    def column(self, name: str) -> array:
+        return self.__columns[name]
+
+    def append(self, row: tuple):
+        for column, value in zip(self.__columns.values(), row):
+            column.append(value)
+
+    def save(self, path: Path):
+        with path.open('wb') as chunk_file:
+            for column in self.__columns.values():
+                column.tofile(chunk_file)
+
+    @staticmethod
+    def load(path: Path, size: int) -> 'TradeChunk':
+        columns = {}
+        with path.open('rb') as chunk_file:
+            for name, code in COLUMNS.items():
+                column = array(code)
+                column.fromfile(chunk_file, size)
+                columns[name] = column
+        return TradeChunk(columns)
+
+
+class TradeHistory:
+    def __init__(
+            self,
+            symbol: str,
+            chunk_size: int = 65536,
+            cached_chunks: int = 2,
+            directory: Optional[Path] = None
+    ):
+        self.__owns_directory = directory is None
+        self.__directory = directory if directory is not None else Path(tempfile.mkdtemp(prefix=f'{symbol}-'))
+        self.__directory.mkdir(parents=True, exist_ok=True)
+        self.__symbol = symbol
+        self.__chunk_size = chunk_size
+        self.__cached_chunks = cached_chunks
+        self.__spilled_chunks = 0
+        self.__chunk_starts = array('d')
+        self.__current = TradeChunk()
+        self.__cache: OrderedDict[int, TradeChunk] = OrderedDict()
+        self.__trades = 0
+        self.__realized_pnl = 0.0
+        self.__fees = 0.0
+        self.__wins = 0
+        self.__time_to_fill_in_sec = 0.0
+        self.__last_closed_at = float('-inf')
+        if not self.__owns_directory:
+            self.__restore()
+
+    def append(
+            self,
+            closed_at: float,
+            side: int,
+            filled: bool,
+            quantity: float,
+            entry_price: float,
+            exit_price: float,
+            fee: float,
+            time_to_fill_in_sec: float
+    ) -> float:
+        if closed_at < self.__last_closed_at:
+            raise ValueError(f"Trade closed at {closed_at} is older than the last one at {self.__last_closed_at}")
+        pnl = side * (exit_price - entry_price) * quantity - fee
+        self.__trades = self.__trades + 1
+        self.__realized_pnl = self.__realized_pnl + pnl
+        self.__fees = self.__fees + fee
+        self.__wins = self.__wins + (pnl > 0)
+        self.__time_to_fill_in_sec = self.__time_to_fill_in_sec + time_to_fill_in_sec
+        self.__last_closed_at = closed_at
+        if self.__current.size() == 0:
+            self.__chunk_starts.append(closed_at)
+        self.__current.append((
+            closed_at, side, filled, quantity, entry_price, exit_price, fee, pnl, time_to_fill_in_sec,
+            self.__realized_pnl, self.__fees, self.__wins, self.__time_to_fill_in_sec
+        ))
+        if self.__current.size() == self.__chunk_size:
+            self.__spill()
+        return pnl
+
+    def statistics(self) -> TradeStatistics:
+        return TradeStatistics(self.__trades, self.__realized_pnl, self.__fees, self.__wins, self.__time_to_fill_in_sec)
+
+    def window(self, start: float, end: float) -> TradeStatistics:
+        first = self.__index(start)
+        last = max(first, self.__index(end))
+        before = self.__totals(first)
+        through = self.__totals(last)
+        return TradeStatistics(last - first, *(total - previous for total, previous in zip(through, before)))
+
+    def column(self, name: str, start: float, end: float) -> array:
+        first = self.__index(start)
+        last = self.__index(end)
+        values = array(COLUMNS[name])
+        while first < last:
+            chunk_index, offset = divmod(first, self.__chunk_size)
+            taken = min(last - first, self.__chunk_size - offset)
+            values.extend(self.__chunk(chunk_index).column(name)[offset:offset + taken])
+            first = first + taken
+        return values
+
+    def rows(self) -> int:
+        return self.__trades
+
+    def close(self):
+        self.__cache.clear()
+        if self.__owns_directory:
+            shutil.rmtree(self.__directory, ignore_errors=True)
+        elif self.__current.size() > 0:
+            # The chunk being filled is saved too, so the next run continues the history where this one stopped
+            self.__current.save(self.__chunk_path(self.__spilled_chunks))
+
+    def __restore(self):
+        # Only the first closing time of every chunk is read, and the running totals come from the last row
+        row_size = sum(array(code).itemsize for code in COLUMNS.values())
+        paths = sorted(self.__directory.glob(f'{self.__symbol}-[0-9][0-9][0-9][0-9][0-9][0-9].bin'))
+        for chunk_index, path in enumerate(paths):
+            rows = path.stat().st_size // row_size
+            if path != self.__chunk_path(chunk_index) or rows > self.__chunk_size \
+                    or rows < self.__chunk_size and chunk_index < len(paths) - 1:
+                raise ValueError(f"Trade history chunk {path} does not fit chunks of {self.__chunk_size} rows")
+            with path.open('rb') as chunk_file:
+                closed_at = array(COLUMNS['closed_at'])
+                closed_at.fromfile(chunk_file, 1)
+            self.__chunk_starts.append(closed_at[0])
+            if rows == self.__chunk_size:
+                self.__spilled_chunks = self.__spilled_chunks + 1
+            else:
+                self.__current = TradeChunk.load(path, rows)
+        self.__trades = self.__spilled_chunks * self.__chunk_size + self.__current.size()
+        if self.__trades > 0:
+            self.__realized_pnl, self.__fees, self.__wins, self.__time_to_fill_in_sec = self.__totals(self.__trades)
+            chunk_index, offset = divmod(self.__trades - 1, self.__chunk_size)
+            self.__last_closed_at = self.__chunk(chunk_index).column('closed_at')[offset]
+
+    def __index(self, closed_at: float) -> int:
+        # The first row closed at or after the given time: the chunk is found by its first row, then the row in it
+        chunk_index = bisect_left(self.__chunk_starts, closed_at) - 1
+        if chunk_index < 0:
+            return 0
+        return chunk_index * self.__chunk_size + bisect_left(self.__chunk(chunk_index).column('closed_at'), closed_at)
+
+    def __totals(self, index: int) -> tuple[float, float, int, float]:
+        if index == 0:
+            return 0.0, 0.0, 0, 0.0
+        chunk_index, offset = divmod(index - 1, self.__chunk_size)
+        chunk = self.__chunk(chunk_index)
+        return (
+            chunk.column('total_pnl')[offset],
+            chunk.column('total_fees')[offset],
+            chunk.column('total_wins')[offset],
+            chunk.column('total_time_to_fill')[offset]
+        )
+
+    def __chunk(self, chunk_index: int) -> TradeChunk:
+        if chunk_index == self.__spilled_chunks:
+            return self.__current
+        chunk = self.__cache.get(chunk_index)
+        if chunk is None:
+            chunk = TradeChunk.load(self.__chunk_path(chunk_index), self.__chunk_size)
+            self.__cache[chunk_index] = chunk
+            if len(self.__cache) > self.__cached_chunks:
+                self.__cache.popitem(last=False)
+        else:
+            self.__cache.move_to_end(chunk_index)
+        return chunk
+
+    def __spill(self):
+        self.__current.save(self.__chunk_path(self.__spilled_chunks))
+        self.__cache[self.__spilled_chunks] = self.__current
+        if len(self.__cache) > self.__cached_chunks:
+            self.__cache.popitem(last=False)
+        self.__spilled_chunks = self.__spilled_chunks + 1
+        self.__current = TradeChunk()
+
+    def __chunk_path(self, chunk_index: int) -> Path:
+        return self.__directory / f'{self.__symbol}-{chunk_index:06d}.bin'
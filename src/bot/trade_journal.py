@@ -0,0 +1,168 @@
+"""This module contains an append-only SQLite trade journal and the recovery of the bot state from it
+
+Trading threads only enqueue events. A writer thread appends them in WAL mode and commits them in batches,
+so one fsync covers every event of a batch and no disk I/O happens between the market fill and the OCO.
+The same transaction keeps a checkpoint of the recovered state, so a start reads one row instead of the journal.
+"""
+import json
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from pathlib import Path
+from queue import Empty, SimpleQueue
+from typing import Any, Optional
+
+
+class RecoveredState:
+    def __init__(
+            self,
+            state: Optional[dict[str, Any]],
+            outstanding_order_id: Optional[int],
+            unbracketed_market_order: Optional[dict[str, Any]]
+    ):
+        self.__state = state
+        self.__outstanding_order_id = outstanding_order_id
+        self.__unbracketed_market_order = unbracketed_market_order
+
+    def state(self) -> Optional[dict[str, Any]]:
+        return self.__state
+
+    def outstanding_order_id(self) -> Optional[int]:
+        return self.__outstanding_order_id
+
+    def unbracketed_market_order(self) -> Optional[dict[str, Any]]:
+        return self.__unbracketed_market_order
+
+
+class JournalState:
+    def __init__(
+            self,
+            state: Optional[dict[str, Any]] = None,
+            outstanding_order_ids: Optional[list[int]] = None,
+            market_order: Optional[dict[str, Any]] = None
+    ):
+        self.__state = state
+        # A dict keeps the order of the brackets and closes one of them in constant time
+        self.__outstanding_order_ids = dict.fromkeys(outstanding_order_ids or [])
+        self.__market_order = market_order
+
+    def apply(self, kind: str, event: dict[str, Any]):
+        if kind == 'bot_state':
+            self.__state = event
+        elif kind == 'market_order':
+            self.__market_order = event
+        elif kind == 'oco_order':
+            self.__outstanding_order_ids[event['order_id']] = None
+            self.__market_order = None
+        elif kind == 'closing_market_order':
+            self.__market_order = None
+        elif kind == 'order_status':
+            self.__outstanding_order_ids.pop(event['order_id'], None)
+
+    def recovered(self) -> RecoveredState:
+        return RecoveredState(
+            self.__state,
+            next(reversed(self.__outstanding_order_ids)) if self.__outstanding_order_ids else None,
+            self.__market_order
+        )
+
+    def to_json(self) -> str:
+        return json.dumps({
+            'state': self.__state,
+            'outstanding_order_ids': list(self.__outstanding_order_ids),
+            'market_order': self.__market_order
+        })
+
+    @staticmethod
+    def from_json(payload: str) -> 'JournalState':
+        checkpoint = json.loads(payload)
+        return JournalState(checkpoint['state'], checkpoint['outstanding_order_ids'], checkpoint['market_order'])
+
+
+class TradeJournal:
+    def __init__(self, path: Path, batch_interval_in_sec: float = 0.05, batch_size: int = 256):
+        self.__path = path
+        self.__batch_interval_in_sec = batch_interval_in_sec
+        self.__batch_size = batch_size
+        self.__queue = SimpleQueue()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self.__connect()) as connection, connection:
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS events '
+                '(id INTEGER PRIMARY KEY, time REAL NOT NULL, kind TEXT NOT NULL, payload TEXT NOT NULL)'
+            )
+            connection.execute(
+                'CREATE TABLE IF NOT EXISTS checkpoint '
+                '(id INTEGER PRIMARY KEY CHECK (id = 0), event_id INTEGER NOT NULL, payload TEXT NOT NULL)'
+            )
+        self.__thread = threading.Thread(target=self.__write, name='trade-journal', daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def close(self):
+        if self.__thread.is_alive():
+            self.__queue.put(None)
+            self.__thread.join()
+
+    def flush(self):
+        if self.__thread.is_alive():
+            flushed = threading.Event()
+            self.__queue.put(flushed)
+            flushed.wait()
+
+    def record(self, kind: str, **payload):
+        self.__queue.put((time.time(), kind, payload))
+
+    def recover(self) -> RecoveredState:
+        with closing(self.__connect()) as connection:
+            return self.__load(connection)[0].recovered()
+
+    @staticmethod
+    def __load(connection: sqlite3.Connection) -> tuple[JournalState, int]:
+        # The checkpoint is written with every batch, so only the events of a journal written before it had one
+        # are replayed, and the start does not grow with the age of the journal
+        checkpoint = connection.execute('SELECT event_id, payload FROM checkpoint WHERE id = 0').fetchone()
+        journal_state, event_id = (JournalState(), 0) if checkpoint is None \
+            else (JournalState.from_json(checkpoint[1]), checkpoint[0])
+        for event_id, kind, payload in connection.execute(
+                'SELECT id, kind, payload FROM events WHERE id > ? ORDER BY id', (event_id,)
+        ):
+            journal_state.apply(kind, json.loads(payload))
+        return journal_state, event_id
+
+    def __connect(self) -> sqlite3.Connection:
+        connection = sqlite3.connect(self.__path)
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=FULL')
+        return connection
+
+    def __write(self):
+        with closing(self.__connect()) as connection:
+            journal_state, _ = self.__load(connection)
+            closed = False
+            while not closed:
+                batch = [self.__queue.get()]
+                deadline = time.monotonic() + self.__batch_interval_in_sec
+                while len(batch) < self.__batch_size and isinstance(batch[-1], tuple):
+                    try:
+                        batch.append(self.__queue.get(timeout=max(0.0, deadline - time.monotonic())))
+                    except Empty:
+                        break
+                events = [(item[0], item[1], json.dumps(item[2])) for item in batch if isinstance(item, tuple)]
+                if events:
+                    with connection:
+                        connection.executemany('INSERT INTO events (time, kind, payload) VALUES (?, ?, ?)', events)
+                        # The checkpoint sees the events as the replay would, decoded from the journal
+                        for _, kind, payload in events:
+                            journal_state.apply(kind, json.loads(payload))
+                        connection.execute(
+                            'INSERT OR REPLACE INTO checkpoint (id, event_id, payload) '
+                            'SELECT 0, max(id), ? FROM events',
+                            (journal_state.to_json(),)
+                        )
+                for item in batch:
+                    if isinstance(item, threading.Event):
+                        item.set()
+                closed = batch[-1] is None
@@ -1,10 +1,18 @@
+"""This module contains trade strategies and the suppliers that pick the next one
+
+The adaptive supplier keeps exponentially weighted statistics per strategy and of the market price, so one cycle
+updates them in constant time however long the bot has been running.
+"""
+import math
 from abc import ABC, abstractmethod
 from itertools import cycle
 from logging import Logger
+from typing import Callable, Optional
+from _decimal import Decimal
 
 from quantity import Quantity
 from counter import Counter
-from trade_client import TradeClient
+from trade_client import Order, TradeClient
 
 
 class TradeStrategy(ABC):
@@ -13,6 +21,10 @@ class TradeStrategy(ABC):
     def run(self, quantity: Quantity) -> str:
         pass
 
+    @abstractmethod
+    def resume(self, order: Order) -> str:
+        pass
+
 
 class TradeStrategySupplier(ABC):
 
@@ -20,6 +32,12 @@ class TradeStrategySupplier(ABC):
     def next_strategy(self) -> TradeStrategy:
         pass
 
+    def record(self, strategy: TradeStrategy, status: str, duration_in_sec: float):
+        pass
+
+    def strategy_after_fill(self, strategy: TradeStrategy) -> TradeStrategy:
+        return strategy
+
 
 class CountingTradeStrategySupplier(TradeStrategySupplier):
     def __init__(self, supplier: TradeStrategySupplier, counter: Counter):
@@ -31,6 +49,12 @@ class CountingTradeStrategySupplier(TradeStrategySupplier):
         self.__counter.inc()
         return strategy
 
+    def record(self, strategy: TradeStrategy, status: str, duration_in_sec: float):
+        self.__supplier.record(strategy, status, duration_in_sec)
+
+    def strategy_after_fill(self, strategy: TradeStrategy) -> TradeStrategy:
+        return self.__supplier.strategy_after_fill(strategy)
+
 
 class LoggingTradeStrategySupplier(TradeStrategySupplier):
     def __init__(self, supplier: TradeStrategySupplier, logger: Logger):
@@ -39,9 +63,18 @@ class LoggingTradeStrategySupplier(TradeStrategySupplier):
 
     def next_strategy(self) -> TradeStrategy:
         strategy = self.__supplier.next_strategy()
-        self.__logger.debug("Next strategy: %s", str(strategy))
+        self.__logger.debug("Next strategy: %s", strategy)
         return strategy
 
+    def record(self, strategy: TradeStrategy, status: str, duration_in_sec: float):
+        self.__supplier.record(strategy, status, duration_in_sec)
+
+    def strategy_after_fill(self, strategy: TradeStrategy) -> TradeStrategy:
+        next_strategy = self.__supplier.strategy_after_fill(strategy)
+        if next_strategy != strategy:
+            self.__logger.debug("Next strategy after fill: %s", next_strategy)
+        return next_strategy
+
 
 class CycleTradeStrategySupplier(TradeStrategySupplier):
     def __init__(self, strategies: list[TradeStrategy]):
@@ -51,6 +84,133 @@ class CycleTradeStrategySupplier(TradeStrategySupplier):
         return next(self.__strategies)
 
 
+class StrategyStatistics:
+    def __init__(self, alpha: float = 0.2):
+        self.__alpha = alpha
+        self.__cycles = 0
+        self.__fill_rate = 0.0
+        self.__time_to_fill_in_sec: Optional[float] = None
+
+    def record(self, status: str, duration_in_sec: float):
+        filled = 1.0 if status == 'FILLED' else 0.0
+        self.__fill_rate = filled if self.__cycles == 0 else self.__average(self.__fill_rate, filled)
+        if filled:
+            self.__time_to_fill_in_sec = duration_in_sec if self.__time_to_fill_in_sec is None \
+                else self.__average(self.__time_to_fill_in_sec, duration_in_sec)
+        self.__cycles = self.__cycles + 1
+
+    def cycles(self) -> int:
+        return self.__cycles
+
+    def fill_rate(self) -> float:
+        return self.__fill_rate
+
+    def time_to_fill_in_sec(self) -> Optional[float]:
+        return self.__time_to_fill_in_sec
+
+    def fills_per_sec(self) -> float:
+        if self.__time_to_fill_in_sec is None:
+            return 0.0
+        return self.__fill_rate / max(self.__time_to_fill_in_sec, 0.001)
+
+    def __average(self, average: float, value: float) -> float:
+        return average + self.__alpha * (value - average)
+
+    def __str__(self) -> str:
+        return f'fill rate {self.__fill_rate:.2f}, time to fill {self.__time_to_fill_in_sec}, cycles {self.__cycles}'
+
+
+class VolatilityEstimator:
+    def __init__(self, short_alpha: float = 0.3, long_alpha: float = 0.03):
+        self.__short_alpha = short_alpha
+        self.__long_alpha = long_alpha
+        self.__last_price: Optional[float] = None
+        self.__short_variance: Optional[float] = None
+        self.__long_variance: Optional[float] = None
+
+    def record(self, price: float):
+        if self.__last_price is not None:
+            squared_return = math.log(price / self.__last_price) ** 2
+            if self.__short_variance is None:
+                self.__short_variance = squared_return
+                self.__long_variance = squared_return
+            else:
+                self.__short_variance += self.__short_alpha * (squared_return - self.__short_variance)
+                self.__long_variance += self.__long_alpha * (squared_return - self.__long_variance)
+        self.__last_price = price
+
+    def recent_volatility(self) -> Optional[float]:
+        return math.sqrt(self.__short_variance) if self.__short_variance is not None else None
+
+    def is_elevated(self, ratio: float) -> bool:
+        # The recent variance is compared with the long-run one, so the threshold does not depend on the symbol
+        if self.__short_variance is None or self.__long_variance == 0:
+            return False
+        return self.__short_variance > ratio ** 2 * self.__long_variance
+
+
+class AdaptiveTradeStrategySupplier(TradeStrategySupplier):
+    def __init__(
+            self,
+            strategies: list[TradeStrategy],
+            price: Optional[Callable[[], Optional[Decimal]]] = None,
+            min_cycles: int = 3,
+            alpha: float = 0.2,
+            volatility_ratio: float = 2.0,
+            volatility: Optional[VolatilityEstimator] = None,
+            refresh_after_cycles: int = 20
+    ):
+        self.__strategies = strategies
+        self.__statistics = {id(strategy): StrategyStatistics(alpha) for strategy in strategies}
+        self.__price = price
+        self.__min_cycles = min_cycles
+        self.__volatility_ratio = volatility_ratio
+        self.__volatility = volatility if volatility is not None else VolatilityEstimator()
+        self.__refresh_after_cycles = refresh_after_cycles
+        self.__recorded_cycles = 0
+        self.__recorded_at = {id(strategy): 0 for strategy in strategies}
+        self.__next_index = 0
+
+    def next_strategy(self) -> TradeStrategy:
+        # Every strategy is tried in turn until it has enough cycles to be judged by; after that the one with the
+        # most fills per second wins, or the one that fills most reliably while the market is unusually volatile
+        for offset in range(len(self.__strategies)):
+            index = (self.__next_index + offset) % len(self.__strategies)
+            if self.__statistics[id(self.__strategies[index])].cycles() < self.__min_cycles:
+                self.__next_index = index + 1
+                return self.__strategies[index]
+        # Only the strategy that runs gets new statistics, so one that fell behind would never be picked again;
+        # the one left out for the longest is tried once more when its statistics are old enough
+        stalest = min(self.__strategies, key=lambda strategy: self.__recorded_at[id(strategy)])
+        if self.__recorded_cycles - self.__recorded_at[id(stalest)] >= self.__refresh_after_cycles:
+            return stalest
+        if self.__volatility.is_elevated(self.__volatility_ratio):
+            return max(self.__strategies, key=lambda strategy: self.__statistics[id(strategy)].fill_rate())
+        return max(self.__strategies, key=lambda strategy: self.__statistics[id(strategy)].fills_per_sec())
+
+    def record(self, strategy: TradeStrategy, status: str, duration_in_sec: float):
+        statistics = self.__statistics.get(id(strategy))
+        if statistics is not None:
+            statistics.record(status, duration_in_sec)
+            self.__recorded_cycles = self.__recorded_cycles + 1
+            self.__recorded_at[id(strategy)] = self.__recorded_cycles
+        if self.__price is not None:
+            price = self.__price()
+            if price is not None:
+                self.__volatility.record(float(price))
+
+    def strategy_after_fill(self, strategy: TradeStrategy) -> TradeStrategy:
+        # A fill is not a reason to leave a strategy for the cycling suppliers, but the statistics may already
+        # prefer another one, and waiting for an expired bracket would leave it to the expiration limit
+        return self.next_strategy()
+
+    def statistics(self, strategy: TradeStrategy) -> StrategyStatistics:
+        return self.__statistics[id(strategy)]
+
+    def volatility(self) -> VolatilityEstimator:
+        return self.__volatility
+
+
 class LoggingTradeStrategy(TradeStrategy):
     def __init__(self, strategy: TradeStrategy, logger: Logger):
         self.__strategy = strategy
@@ -60,6 +220,10 @@ class LoggingTradeStrategy(TradeStrategy):
         self.__logger.debug("Run %s", self.__strategy)
         return self.__strategy.run(quantity)
 
+    def resume(self, order: Order) -> str:
+        self.__logger.debug("Resume %s waiting for %s", self.__strategy, order)
+        return self.__strategy.resume(order)
+
     def __str__(self):
         return str(self.__strategy)
 
@@ -73,6 +237,9 @@ class SellStrategy(TradeStrategy):
         order = self.__client.buy_oco_order(quantity.float_value(), market_order.price())
         return order.get_status(self.__client)
 
+    def resume(self, order: Order) -> str:
+        return order.get_status(self.__client)
+
     def __str__(self) -> str:
         return 'Sell strategy'
 
@@ -86,5 +253,8 @@ class BuyStrategy(TradeStrategy):
         order = self.__client.sell_oco_order(quantity.float_value(), market_order.price())
         return order.get_status(self.__client)
 
+    def resume(self, order: Order) -> str:
+        return order.get_status(self.__client)
+
     def __str__(self):
         return 'Buy strategy'
@@ -0,0 +1,165 @@
+"""This module contains a user data stream subscriber that pushes order statuses into an in-process registry"""
+import threading
+import time
+from collections import OrderedDict
+from logging import Logger
+from typing import Optional
+from _decimal import Decimal
+
+import orjson
+from websockets.exceptions import ConnectionClosed
+from websockets.sync.client import connect
+
+
+class OrderStatusRegistry:
+    def __init__(self, capacity: int = 10000):
+        self.__capacity = capacity
+        self.__statuses: OrderedDict[int, str] = OrderedDict()
+        self.__commissions: OrderedDict[int, tuple[Decimal, Optional[str], bool]] = OrderedDict()
+        self.__condition = threading.Condition()
+        self.__connected = False
+        self.__connection_epoch = 0
+
+    def update(
+            self,
+            order_id: int,
+            status: str,
+            commission: Optional[str] = None,
+            commission_asset: Optional[str] = None
+    ):
+        with self.__condition:
+            self.__statuses[order_id] = status
+            self.__statuses.move_to_end(order_id)
+            if len(self.__statuses) > self.__capacity:
+                self.__statuses.popitem(last=False)
+            if commission is not None or order_id in self.__commissions:
+                self.__add_commission(order_id, status, commission, commission_asset)
+            self.__condition.notify_all()
+
+    def connected(self):
+        with self.__condition:
+            self.__connected = True
+            self.__connection_epoch = self.__connection_epoch + 1
+            self.__condition.notify_all()
+
+    def disconnected(self):
+        with self.__condition:
+            self.__connected = False
+            self.__condition.notify_all()
+
+    def connection_epoch(self) -> Optional[int]:
+        with self.__condition:
+            return self.__connection_epoch if self.__connected else None
+
+    def wait_terminal_status(self, order_id: int, epoch: int, timeout_in_sec: float) -> Optional[str]:
+        deadline = time.monotonic() + timeout_in_sec
+        with self.__condition:
+            while self.__connected and self.__connection_epoch == epoch:
+                status = self.__statuses.get(order_id)
+                if status is not None and status not in ('NEW', 'PARTIALLY_FILLED'):
+                    del self.__statuses[order_id]
+                    return status
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self.__condition.wait(remaining)
+            return None
+
+    def wait_commission(self, order_id: int, timeout_in_sec: float) -> Optional[tuple[Decimal, Optional[str]]]:
+        # Every trade of an order reports its own commission, so the total is known once the order is done
+        deadline = time.monotonic() + timeout_in_sec
+        with self.__condition:
+            while True:
+                commission = self.__commissions.get(order_id)
+                if commission is not None and commission[2]:
+                    del self.__commissions[order_id]
+                    return commission[0], commission[1]
+                remaining = deadline - time.monotonic()
+                if not self.__connected or remaining <= 0:
+                    return None
+                self.__condition.wait(remaining)
+
+    def __add_commission(
+            self,
+            order_id: int,
+            status: str,
+            commission: Optional[str],
+            commission_asset: Optional[str]
+    ):
+        total, asset, _ = self.__commissions.get(order_id, (Decimal(0), None, False))
+        if commission is not None:
+            total = total + Decimal(commission)
+            asset = commission_asset if commission_asset is not None else asset
+        self.__commissions[order_id] = (total, asset, status not in ('NEW', 'PARTIALLY_FILLED'))
+        self.__commissions.move_to_end(order_id)
+        if len(self.__commissions) > self.__capacity:
+            self.__commissions.popitem(last=False)
+
+
+class UserDataStream:
+    def __init__(
+            self,
+            client,
+            registry: OrderStatusRegistry,
+            logger: Logger,
+            url: str = 'wss://stream.binance.com:9443/ws',
+            keepalive_interval_in_sec: int = 1800,
+            reconnect_delay_in_sec: int = 1
+    ):
+        self.__client = client
+        self.__registry = registry
+        self.__logger = logger
+        self.__url = url
+        self.__keepalive_interval_in_sec = keepalive_interval_in_sec
+        self.__reconnect_delay_in_sec = reconnect_delay_in_sec
+        self.__stopped = threading.Event()
+        self.__thread = threading.Thread(target=self.__run, name='user-data-stream', daemon=True)
+
+    def start(self):
+        self.__thread.start()
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__thread.is_alive():
+            self.__thread.join()
+
+    def __run(self):
+        while not self.__stopped.is_set():
+            try:
+                self.__listen(self.__client.stream_get_listen_key())
+            except (ConnectionClosed, OSError) as exception:
+                self.__logger.debug('User data stream is down: %s', exception)
+            except Exception as exception:  # pylint: disable=broad-exception-caught
+                self.__logger.exception('User data stream failed: %s', exception)
+            finally:
+                self.__registry.disconnected()
+            self.__stopped.wait(self.__reconnect_delay_in_sec)
+
+    def __listen(self, listen_key: str):
+        with connect(f'{self.__url}/{listen_key}') as websocket:
+            self.__registry.connected()
+            self.__logger.debug('User data stream is up')
+            last_keepalive = time.monotonic()
+            while not self.__stopped.is_set():
+                if time.monotonic() - last_keepalive >= self.__keepalive_interval_in_sec:
+                    self.__client.stream_keepalive(listen_key)
+                    last_keepalive = time.monotonic()
+                try:
+                    message = websocket.recv(timeout=1)
+                except TimeoutError:
+                    continue
+                if not self.__handle(orjson.loads(message)):
+                    return
+
+    def __handle(self, event: dict) -> bool:
+        event_type = event.get('e')
+        if event_type == 'executionReport':
+            # Only a trade carries a commission; the other execution types report zero and no asset
+            if event.get('x') == 'TRADE':
+                self.__registry.update(event['i'], event['X'], event['n'], event['N'])
+            else:
+                self.__registry.update(event['i'], event['X'])
+        elif event_type == 'listenKeyExpired':
+            self.__logger.debug('Listen key expired')
+            return False
+        return True
@@ -0,0 +1,16 @@
+from client_stub import ClientStub
+
+
+class AsyncClientStub:
+
+    def __init__(self):
+        self.__client = ClientStub()
+
+    async def create_order(self, **params):
+        return self.__client.create_order(**params)
+
+    async def create_oco_order(self, **params):
+        return self.__client.create_oco_order(**params)
+
+    async def get_order(self, **params):
+        return self.__client.get_order(**params)
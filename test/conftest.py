@@ -0,0 +1,29 @@
+"""This module contains the test setup loading every bot module once
+
+The bot modules import each other by their bare names, while the tests import them from the bot package. Both
+names are bound to the same module here, so a class has one identity in the code under test and in the tests.
+"""
+import importlib
+import importlib.abc
+import importlib.util
+import sys
+from pathlib import Path
+
+BOT_DIRECTORY = Path(__file__).resolve().parent.parent / 'src' / 'bot'
+
+
+class BotModuleAliasFinder(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+
+    def find_spec(self, fullname, path, target=None):
+        if '.' not in fullname and (BOT_DIRECTORY / f'{fullname}.py').is_file():
+            return importlib.util.spec_from_loader(fullname, self)
+        return None
+
+    def create_module(self, spec):
+        return importlib.import_module(f'bot.{spec.name}')
+
+    def exec_module(self, module):
+        pass
+
+
+sys.meta_path.insert(0, BotModuleAliasFinder())
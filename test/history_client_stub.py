@@ -0,0 +1,37 @@
+import json
+import threading
+from pathlib import Path
+
+FIXTURES = Path(__file__).parent / 'fixtures'
+
+
+class HistoryClientStub:
+
+    def __init__(self, symbol: str = 'BTCFDUSD', interval: str = '1m'):
+        self.klines = json.loads((FIXTURES / f'{symbol}-klines-{interval}.json').read_text())
+        self.trades = json.loads((FIXTURES / f'{symbol}-aggTrades.json').read_text())
+        self.calls = []
+        self.__lock = threading.Lock()
+
+    def get_klines(self, symbol, interval, startTime=None, endTime=None, limit=500):
+        self.__record('klines', startTime=startTime, endTime=endTime, limit=limit)
+        klines = [
+            kline for kline in self.klines
+            if (startTime is None or kline[0] >= startTime) and (endTime is None or kline[0] <= endTime)
+        ]
+        return klines[:limit] if startTime is not None or endTime is None else klines[-limit:]
+
+    def get_aggregate_trades(self, symbol, fromId=None, startTime=None, endTime=None, limit=500):
+        self.__record('aggTrades', fromId=fromId, startTime=startTime, endTime=endTime, limit=limit)
+        if fromId is not None:
+            return [trade for trade in self.trades if trade['a'] >= fromId][:limit]
+        if startTime is not None:
+            return [trade for trade in self.trades if startTime <= trade['T'] <= endTime][:limit]
+        return self.trades[-limit:]
+
+    def response_headers(self):
+        return {}
+
+    def __record(self, endpoint: str, **params):
+        with self.__lock:
+            self.calls.append((endpoint, params))
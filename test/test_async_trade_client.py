@@ -0,0 +1,47 @@
+from _decimal import Decimal
+from unittest import IsolatedAsyncioTestCase
+
+from bot.async_trade_client import AsyncBasicTradeClient
+from bot.symbol_registry import Symbol
+from bot.trade_client import MarketOrder, LimitMakerOrder
+from async_client_stub import AsyncClientStub
+
+
+class TestAsyncTradeClient(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.__trade_client = AsyncBasicTradeClient(
+            AsyncClientStub(),
+            Decimal(1.0005),
+            Decimal(0.9995),
+            Decimal(1.0005),
+            Decimal(0.9995),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+        )
+
+    async def test_buy_market_order(self):
+        self.assertEqual(
+            MarketOrder(19744496177, "FILLED", "21472.15000000"),
+            await self.__trade_client.buy_market_order(0.00088000)
+        )
+
+    async def test_sell_market_order(self):
+        self.assertEqual(
+            MarketOrder(19744496177, "FILLED", "21472.15000000"),
+            await self.__trade_client.sell_market_order(0.00088000)
+        )
+
+    async def test_sell_oco_order(self):
+        self.assertEqual(
+            LimitMakerOrder(19747264211),
+            await self.__trade_client.sell_oco_order(0.00088000, "21472.15000000")
+        )
+
+    async def test_buy_oco_order(self):
+        self.assertEqual(
+            LimitMakerOrder(19747264211),
+            await self.__trade_client.buy_oco_order(0.00088000, "21472.15000000")
+        )
+
+    async def test_poll_terminal_status(self):
+        self.assertEqual('FILLED', await self.__trade_client.poll_terminal_order_status(19747264211))
@@ -0,0 +1,60 @@
+import logging
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.action import LimitAction, NoopAction
+from bot.backtest import Backtest, SimulatedExchange, Tick, replay_trade_client
+from bot.quantity import Quantity
+from bot.symbol_registry import Symbol
+from bot.trade_bot import TradeBot
+from bot.trade_strategy import CycleTradeStrategySupplier, BuyStrategy, SellStrategy
+
+
+def ticks(prices: list[float]) -> list[Tick]:
+    return [Tick(1000 * second, price, price, price) for second, price in enumerate(prices)]
+
+
+class TestBacktest(TestCase):
+
+    def __backtest(self, prices: list[float], raise_coefficient: Decimal = Decimal('1.0005')):
+        exchange = SimulatedExchange(ticks(prices))
+        trade_client = replay_trade_client(
+            exchange,
+            raise_coefficient,
+            Decimal('0.9995'),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+            logging.getLogger('Exchange')
+        )
+        bot = TradeBot(
+            strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client), SellStrategy(trade_client)]),
+            strategy_changes_limit=LimitAction(5, NoopAction()),
+            expiration_limit=LimitAction(1, NoopAction()),
+            logger=logging.getLogger('Backtest')
+        )
+        return Backtest(exchange, bot).run(Quantity(0.001))
+
+    def test_limit_maker_order_is_filled(self):
+        report = self.__backtest([20000.0] * 5 + [20010.0] * 5)
+        self.assertEqual(1, report.filled)
+        self.assertEqual(0, report.expired)
+        self.assertAlmostEqual(0.01, report.pnl)
+
+    def test_stop_loss_limit_order_expires_limit_maker_order(self):
+        report = self.__backtest([20000.0] * 5 + [19990.0] * 5)
+        self.assertEqual(0, report.filled)
+        self.assertEqual(1, report.expired)
+        self.assertAlmostEqual(-0.01, report.pnl)
+
+    def test_rejected_oco_order_is_closed_at_the_market(self):
+        report = self.__backtest([20000.0] * 10, raise_coefficient=Decimal('1'))
+        self.assertEqual(0, report.filled)
+        self.assertEqual(0, report.expired)
+        self.assertEqual(10, report.market_orders)
+        self.assertAlmostEqual(0.0, report.pnl)
+
+    def test_replay_is_deterministic(self):
+        prices = [20000.0 + (second % 40) * (1 if second % 80 < 40 else -1) for second in range(2000)]
+        first_report = self.__backtest(prices)
+        second_report = self.__backtest(prices)
+        self.assertEqual(str(first_report), str(second_report))
+        self.assertEqual(first_report.market_orders, first_report.filled + first_report.expired + 1)
@@ -0,0 +1,147 @@
+import email.utils
+import json
+import logging
+import time
+from unittest import TestCase
+
+from binance.exceptions import BinanceAPIException
+
+from bot.binance_client import ClockSyncClient
+from bot.clock_sync import ClockSync
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 1_700_000_000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+class ServerTimeClientStub:
+    REQUEST_RECVWINDOW = 10000
+
+    def __init__(self, clock: FakeClock, offset_in_ms: float, round_trip_in_ms: float):
+        self.timestamp_offset = 0
+        self.clock = clock
+        self.offset_in_ms = offset_in_ms
+        self.round_trip_in_ms = round_trip_in_ms
+        self.server_time_calls = 0
+
+    def get_server_time(self):
+        self.server_time_calls = self.server_time_calls + 1
+        self.clock.now = self.clock.now + self.round_trip_in_ms / 2000
+        server_time_in_ms = self.clock.now * 1000 + self.offset_in_ms
+        self.clock.now = self.clock.now + self.round_trip_in_ms / 2000
+        return {'serverTime': int(server_time_in_ms)}
+
+
+class RejectingClientStub:
+
+    def __init__(self, rejections: int, code: int = -1021):
+        self.rejections = rejections
+        self.code = code
+        self.orders = 0
+
+    def create_order(self, **params):
+        self.orders = self.orders + 1
+        if self.orders <= self.rejections:
+            raise BinanceAPIException(None, 400, json.dumps({
+                'code': self.code, 'msg': "Timestamp for this request is outside of the recvWindow."
+            }))
+        return {'orderId': 1}
+
+    def response_headers(self):
+        return {}
+
+
+class UnreachableClientStub:
+
+    def create_order(self, **params):
+        raise ConnectionError('Connection reset by peer')
+
+    def response_headers(self):
+        return {'Date': email.utils.formatdate(0, usegmt=True)}
+
+
+class TestClockSync(TestCase):
+
+    def setUp(self) -> None:
+        self.__clock = FakeClock()
+        self.__client = ServerTimeClientStub(self.__clock, 2000, 40)
+        self.__clock_sync = ClockSync(self.__client, logging.getLogger('Clock sync'), clock=self.__clock.time)
+
+    def test_apply_offset_measured_at_the_middle_of_the_round_trip(self):
+        self.assertEqual(10000, self.__client.REQUEST_RECVWINDOW)
+        self.__clock_sync.sync()
+        self.assertEqual(2000, self.__clock_sync.offset_in_ms())
+        self.assertEqual(2000, self.__client.timestamp_offset)
+        self.assertEqual(5000, self.__client.REQUEST_RECVWINDOW)
+
+    def test_smooth_jitter_and_follow_a_clock_step(self):
+        self.__clock_sync.sync()
+        self.__client.offset_in_ms = 2100
+        self.__clock_sync.sync()
+        self.assertEqual(2025, self.__clock_sync.offset_in_ms())
+        self.__client.offset_in_ms = -5000
+        self.__clock_sync.sync()
+        self.assertEqual(-5000, self.__clock_sync.offset_in_ms())
+
+    def test_tune_recv_window_from_latency(self):
+        for _ in range(20):
+            self.__clock_sync.observe({}, self.__clock.now, self.__clock.now + 0.05)
+        self.assertEqual(5000, self.__clock_sync.recv_window_in_ms())
+        for _ in range(40):
+            self.__clock_sync.observe({}, self.__clock.now, self.__clock.now + 6)
+        self.assertGreater(self.__clock_sync.recv_window_in_ms(), 6000)
+        self.assertLess(self.__clock_sync.recv_window_in_ms(), 9000)
+        self.assertEqual(self.__clock_sync.recv_window_in_ms(), self.__client.REQUEST_RECVWINDOW)
+        for _ in range(40):
+            self.__clock_sync.observe({}, self.__clock.now, self.__clock.now + 100)
+        self.assertEqual(60000, self.__clock_sync.recv_window_in_ms())
+
+    def test_resync_when_date_header_disagrees(self):
+        clock_sync = ClockSync(self.__client, logging.getLogger('Clock sync'), offset_in_ms=2000,
+                               sync_interval_in_sec=60, clock=self.__clock.time)
+        clock_sync.start()
+        try:
+            now = self.__clock.now
+            clock_sync.observe({'Date': email.utils.formatdate(now + 2, usegmt=True)}, now, now)
+            self.assertEqual(0, self.__client.server_time_calls)
+            clock_sync.observe({'Date': email.utils.formatdate(now + 12, usegmt=True)}, now, now)
+            deadline = time.monotonic() + 5
+            while self.__client.server_time_calls == 0 and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(1, self.__client.server_time_calls)
+        finally:
+            clock_sync.stop()
+
+
+class TestClockSyncClient(TestCase):
+
+    def setUp(self) -> None:
+        self.__clock = FakeClock()
+        self.__server = ServerTimeClientStub(self.__clock, 2000, 40)
+        self.__clock_sync = ClockSync(self.__server, logging.getLogger('Clock sync'), clock=self.__clock.time)
+
+    def test_resend_a_request_rejected_for_its_timestamp_after_a_sync(self):
+        exchange = RejectingClientStub(rejections=1)
+        client = ClockSyncClient(exchange, self.__clock_sync, self.__clock.time)
+        self.assertEqual({'orderId': 1}, client.create_order(symbol='BTCFDUSD', side='BUY', type='MARKET'))
+        self.assertEqual(2, exchange.orders)
+        self.assertEqual(1, self.__server.server_time_calls)
+        self.assertEqual(2000, self.__server.timestamp_offset)
+
+    def test_do_not_resend_other_rejections(self):
+        exchange = RejectingClientStub(rejections=1, code=-2010)
+        client = ClockSyncClient(exchange, self.__clock_sync, self.__clock.time)
+        self.assertRaises(BinanceAPIException, client.create_order, symbol='BTCFDUSD', side='BUY', type='MARKET')
+        self.assertEqual(1, exchange.orders)
+        self.assertEqual(0, self.__server.server_time_calls)
+        self.assertEqual(5000, self.__clock_sync.recv_window_in_ms())
+
+    def test_observe_nothing_without_a_response(self):
+        client = ClockSyncClient(UnreachableClientStub(), self.__clock_sync, self.__clock.time)
+        self.assertRaises(ConnectionError, client.create_order, symbol='BTCFDUSD', side='BUY', type='MARKET')
+        self.assertEqual(10000, self.__clock_sync.recv_window_in_ms())
@@ -0,0 +1,132 @@
+import json
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.action import LimitAction, NoopAction
+from bot.binance_client import CachingTimeOffsetLoader, ClockSyncClient, LazyClient
+from bot.http_session import HttpSessionFactory
+from bot.main import spot_client_factory
+from bot.metrics import Metrics
+from bot.quantity import Quantity
+from bot.symbol_registry import CachingSymbolRegistryLoader
+from bot.trade_bot import TradeBot
+from bot.trade_client import BasicTradeClient, DeferredStartTradeClient, StartupTimingTradeClient
+from bot.trade_strategy import BuyStrategy, CycleTradeStrategySupplier
+from client_stub import ClientStub
+
+
+class RecordingClientStub(ClientStub):
+
+    def __init__(self):
+        self.calls = []
+
+    def create_order(self, symbol, side, type, quantity):
+        self.calls.append('create_order')
+        return super().create_order(symbol, side, type, quantity)
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice, stopLimitTimeInForce):
+        self.calls.append('create_oco_order')
+        return super().create_oco_order(symbol, side, quantity, price, stopPrice, stopLimitPrice,
+                                        stopLimitTimeInForce)
+
+    def get_order(self, symbol, orderId):
+        self.calls.append('get_order')
+        raise StopIteration()
+
+    def stream_get_listen_key(self):
+        self.calls.append('stream_get_listen_key')
+        return 'listen-key'
+
+    def get_exchange_info(self):
+        self.calls.append('get_exchange_info')
+        raise AssertionError('The exchange info must come from the cache')
+
+    def get_server_time(self):
+        self.calls.append('get_server_time')
+        return {'serverTime': 1_700_000_000_500}
+
+
+class UnreachableHttpSessionFactory(HttpSessionFactory):
+
+    def warm_up(self, session, url, connections=None):
+        raise ConnectionError('The exchange is unreachable')
+
+
+class TestColdStart(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__stub = RecordingClientStub()
+        self.__builds = 0
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __factory(self) -> RecordingClientStub:
+        self.__builds = self.__builds + 1
+        return self.__stub
+
+    def test_no_network_call_before_the_first_order(self):
+        cache_path = Path(self.__directory.name, 'symbols.json')
+        cache_path.write_text(json.dumps({
+            'BTCFDUSD': {'tickSize': '0.01', 'stepSize': '0.00001', 'minNotional': '5'}
+        }))
+        client = LazyClient(self.__factory)
+        symbol = CachingSymbolRegistryLoader(client, cache_path, ttl_in_sec=60).load().symbol('BTCFDUSD')
+        metrics = Metrics()
+        # The stream asks for its listen key as soon as it runs, the way the user data stream does
+        trade_client = StartupTimingTradeClient(
+            DeferredStartTradeClient(
+                BasicTradeClient(
+                    client, Decimal('1.0005'), Decimal('0.9995'), Decimal('1.0005'), Decimal('0.9995'), symbol
+                ),
+                [client.stream_get_listen_key]
+            ),
+            metrics,
+            logging.getLogger('Startup'),
+            0
+        )
+        bot = TradeBot(
+            strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client)]),
+            strategy_changes_limit=LimitAction(5, NoopAction()),
+            expiration_limit=LimitAction(1, NoopAction()),
+            logger=logging.getLogger('Bot')
+        )
+        self.assertEqual(0, self.__builds)
+        self.assertEqual({}, client.response_headers())
+        self.assertRaises(StopIteration, bot.start, Quantity(0.00088, symbol.step_size()))
+        self.assertEqual(1, self.__builds)
+        self.assertEqual(
+            ['stream_get_listen_key', 'create_order', 'create_oco_order', 'get_order'], self.__stub.calls
+        )
+        self.assertEqual(1, metrics.histogram('startup_to_first_order_seconds').count())
+
+    def test_cache_time_offset(self):
+        cache_path = Path(self.__directory.name, 'time_offset.json')
+        now = [1_700_000_000.0]
+        loader = CachingTimeOffsetLoader(self.__stub, cache_path, 60, lambda: now[0])
+        self.assertEqual(500, loader.load())
+        now[0] = now[0] + 30
+        self.assertEqual(500, loader.load())
+        self.assertEqual(['get_server_time'], self.__stub.calls)
+        now[0] = now[0] + 31
+        self.assertEqual(-60500, loader.load())
+        self.assertEqual(['get_server_time', 'get_server_time'], self.__stub.calls)
+
+    def test_build_the_client_when_the_warm_up_fails(self):
+        cache_path = Path(self.__directory.name, 'time_offset.json')
+        cache_path.write_text(json.dumps({'offset_in_ms': 500, 'measured_at': time.time()}))
+        clock_sync_threads = sum(thread.name == 'clock-sync' for thread in threading.enumerate())
+        build = spot_client_factory(
+            UnreachableHttpSessionFactory(), cache_path, logging.getLogger('Clock sync'), logging.getLogger('Spot')
+        )
+        with self.assertLogs('Spot', logging.WARNING):
+            self.assertIsInstance(build(), ClockSyncClient)
+        self.assertEqual(
+            clock_sync_threads + 1, sum(thread.name == 'clock-sync' for thread in threading.enumerate())
+        )
@@ -0,0 +1,93 @@
+import logging
+from _decimal import Decimal
+from unittest import TestCase
+
+from binance.client import Client
+from binance.exceptions import BinanceAPIException
+
+from bot.action import NoopAction
+from bot.backtest import Tick
+from bot.binance_client import LoggingBinanceClient, SpotClient
+from bot.exchange_simulator import ExchangeSimulator, ExchangeSimulatorServer, RandomWalk
+from bot.symbol_registry import Symbol
+from bot.trade_client import BasicTradeClient, RecoveringTradeClient, MarketOrder
+
+SYMBOL = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+
+
+class ScriptedPrices:
+
+    def __init__(self, prices: list[tuple[float, float, float]]):
+        self.__prices = prices
+        self.__index = 0
+
+    def tick(self) -> Tick:
+        low, high, close = self.__prices[min(self.__index, len(self.__prices) - 1)]
+        self.__index = self.__index + 1
+        return Tick(self.__index, low, high, close)
+
+
+def trade_client(simulator: ExchangeSimulator) -> RecoveringTradeClient:
+    return RecoveringTradeClient(
+        BasicTradeClient(
+            LoggingBinanceClient(SpotClient(simulator), logging.getLogger('Exchange simulator')),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            SYMBOL,
+            polling_pause=NoopAction()
+        )
+    )
+
+
+class TestExchangeSimulator(TestCase):
+
+    def test_stop_loss_expires_limit_maker_order(self):
+        prices = ScriptedPrices([(20000, 20000, 20000)] * 4 + [(19980, 20000, 19985)])
+        client = trade_client(ExchangeSimulator(prices, SYMBOL))
+        market_order = client.buy_market_order(0.001)
+        order = client.sell_oco_order(0.001, market_order.price())
+        self.assertEqual('EXPIRED', order.get_status(client))
+
+    def test_price_move_before_oco_falls_back_to_market_order(self):
+        prices = ScriptedPrices([(20000, 20000, 20000)] * 2 + [(20000, 20030, 20030)])
+        client = trade_client(ExchangeSimulator(prices, SYMBOL))
+        market_order = client.buy_market_order(0.001)
+        order = client.sell_oco_order(0.001, market_order.price())
+        self.assertIsInstance(order, MarketOrder)
+        self.assertEqual('20030', order.price())
+
+    def test_random_walk_is_reproducible(self):
+        now = [0.0]
+        first = RandomWalk(20000, 10, seed=1, clock=lambda: now[0])
+        second = RandomWalk(20000, 10, seed=1, clock=lambda: now[0])
+        now[0] = 5.0
+        self.assertEqual(first.tick().close, second.tick().close)
+        self.assertNotEqual(20000, first.tick().close)
+
+
+class TestExchangeSimulatorServer(TestCase):
+
+    def setUp(self) -> None:
+        self.__simulator = ExchangeSimulator(ScriptedPrices([(20000, 20000, 20000)]), SYMBOL)
+        self.__server = ExchangeSimulatorServer(self.__simulator)
+        self.__server.start()
+        self.__client = Client('api-key', 'api-secret', ping=False)
+        self.__client.API_URL = self.__server.api_url()
+        self.__client.MARGIN_API_URL = self.__server.margin_api_url()
+
+    def tearDown(self) -> None:
+        self.__server.stop()
+
+    def test_orders_over_http(self):
+        spot_client = SpotClient(self.__client)
+        order = spot_client.create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.001')
+        self.assertEqual('FILLED', spot_client.get_order(symbol='BTCFDUSD', orderId=order['orderId'])['status'])
+        self.assertEqual([], spot_client.get_open_orders(symbol='BTCFDUSD'))
+        self.assertEqual('simulator-listen-key', spot_client.stream_get_listen_key())
+
+    def test_errors_over_http(self):
+        with self.assertRaises(BinanceAPIException) as context:
+            SpotClient(self.__client).get_order(symbol='BTCFDUSD', orderId=42)
+        self.assertEqual(-2013, context.exception.code)
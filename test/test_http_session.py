@@ -0,0 +1,74 @@
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest import TestCase
+
+import requests
+
+from bot.binance_client import LeanBinanceClient, SpotClient
+from bot.http_session import HttpSessionFactory
+
+
+class PingHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    disable_nagle_algorithm = True
+    connections = set()
+
+    def do_GET(self):
+        PingHandler.connections.add(self.client_address)
+        if self.path.endswith('/slow'):
+            time.sleep(0.5)
+        body = b'{}'
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class BinanceClientStub:
+
+    def __init__(self):
+        self.session = None
+
+
+class TestHttpSessionFactory(TestCase):
+
+    def setUp(self) -> None:
+        PingHandler.connections = set()
+        self.__server = ThreadingHTTPServer(('localhost', 0), PingHandler)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        self.__url = f'http://localhost:{self.__server.server_port}/api/v3/ping'
+
+    def tearDown(self) -> None:
+        self.__server.shutdown()
+        self.__server.server_close()
+
+    def test_warm_up_opens_pooled_connections(self):
+        factory = HttpSessionFactory(pool_size=4)
+        session = factory.session()
+        factory.warm_up(session, self.__url)
+        self.assertEqual(4, len(PingHandler.connections))
+        for _ in range(10):
+            session.get(self.__url).close()
+        self.assertEqual(4, len(PingHandler.connections))
+
+    def test_session_enforces_timeouts(self):
+        session = HttpSessionFactory(connect_timeout_in_sec=1, read_timeout_in_sec=0.1).session()
+        self.assertRaises(requests.exceptions.ReadTimeout, session.get, self.__url + '/slow', timeout=10)
+
+    def test_spot_client_uses_factory_session(self):
+        binance_client = BinanceClientStub()
+        binance_client.session = HttpSessionFactory().session({'X-MBX-APIKEY': 'api-key'})
+        SpotClient(binance_client, HttpSessionFactory(pool_size=2))
+        self.assertEqual('api-key', binance_client.session.headers['X-MBX-APIKEY'])
+        self.assertEqual(2, binance_client.session.get_adapter(self.__url)._pool_maxsize)
+
+    def test_lean_client_parses_response_bytes(self):
+        binance_client = LeanBinanceClient('api-key', 'api-secret', ping=False)
+        binance_client.API_URL = self.__url.removesuffix('/v3/ping')
+        self.assertEqual({}, binance_client.ping())
+        self.assertEqual(1, len(PingHandler.connections))
@@ -0,0 +1,90 @@
+import json
+import tempfile
+import threading
+from logging import DEBUG
+from pathlib import Path
+from unittest import TestCase
+
+from bot.logger_factory import LoggerFactory, LoggingBackend, RateLimitFilter
+
+
+class ThreadRecordingOrder:
+
+    def __init__(self):
+        self.formatted_on = None
+
+    def __str__(self):
+        self.formatted_on = threading.current_thread().name
+        return 'Limit maker order 19747264211'
+
+
+class TestLoggerFactory(TestCase):
+
+    def test_handlers_are_not_duplicated(self):
+        factory = LoggerFactory('%(message)s', DEBUG)
+        factory.logger('Duplicated handlers')
+        self.assertEqual(1, len(factory.logger('Duplicated handlers').handlers))
+
+    def test_rate_limit_of_an_existing_logger_is_applied(self):
+        factory = LoggerFactory('%(message)s', DEBUG)
+        factory.logger('Rate limit applied later')
+        logger = factory.logger('Rate limit applied later', 60)
+        self.assertEqual([60], [log_filter.interval_in_sec() for log_filter in logger.filters])
+        factory.logger('Rate limit applied later', 60)
+        factory.logger('Rate limit applied later')
+        self.assertEqual([60], [log_filter.interval_in_sec() for log_filter in logger.filters])
+        factory.logger('Rate limit applied later', 5)
+        self.assertEqual([5], [log_filter.interval_in_sec() for log_filter in logger.filters])
+
+    def test_records_are_formatted_on_listener_thread_as_json(self):
+        with tempfile.TemporaryDirectory() as directory:
+            log_path = Path(directory, 'logs', 'trader.log')
+            backend = LoggingBackend.console_and_file('%(message)s', log_path)
+            backend.start()
+            order = ThreadRecordingOrder()
+            logger = LoggerFactory('%(message)s', DEBUG, backend).logger('Queued trade client')
+            # A handler of the root logger, such as the one capturing the logs of pytest, formats on the caller
+            logger.propagate = False
+            logger.debug('%s', order)
+            backend.stop()
+            self.assertNotEqual(threading.current_thread().name, order.formatted_on)
+            entry = json.loads(log_path.read_text(encoding='utf-8'))
+            self.assertEqual('Limit maker order 19747264211', entry['message'])
+            self.assertEqual('Queued trade client', entry['logger'])
+            self.assertEqual('DEBUG', entry['level'])
+
+
+class TestRateLimitFilter(TestCase):
+
+    def test_repeated_messages_are_suppressed_within_interval(self):
+        now = [0.0]
+        factory = LoggerFactory('%(message)s', DEBUG)
+        logger = factory.logger('Order status client rate limited')
+        logger.addFilter(RateLimitFilter(60, clock=lambda: now[0]))
+        with self.assertLogs(logger, DEBUG) as logs:
+            for second in range(0, 150, 2):
+                now[0] = second
+                logger.debug('Getting the order %s', {'orderId': second})
+            logger.debug('Failed to poll %s orders', 'BTCFDUSD')
+        self.assertEqual(
+            [
+                "DEBUG:Order status client rate limited:Getting the order {'orderId': 0}",
+                "DEBUG:Order status client rate limited:Getting the order {'orderId': 60}",
+                "DEBUG:Order status client rate limited:Getting the order {'orderId': 120}",
+                'DEBUG:Order status client rate limited:Failed to poll BTCFDUSD orders'
+            ],
+            logs.output
+        )
+        self.assertEqual(29, logs.records[1].suppressed)
+
+    def test_warnings_are_never_suppressed(self):
+        now = [0.0]
+        factory = LoggerFactory('%(message)s', DEBUG)
+        logger = factory.logger('Order status rate limited')
+        logger.addFilter(RateLimitFilter(60, clock=lambda: now[0]))
+        with self.assertLogs(logger, DEBUG) as logs:
+            for second in range(3):
+                now[0] = second
+                logger.warning('Failed to poll %s orders', 'BTCFDUSD')
+                logger.error('Order status of %s is unknown', second)
+        self.assertEqual(6, len(logs.records))
@@ -0,0 +1,184 @@
+import json
+import logging
+import threading
+from _decimal import Decimal
+from unittest import TestCase
+
+from websockets.sync.server import serve
+
+from bot.market_data import MarketDataRegistry, MarketDataStream, OrderBook
+from bot.symbol_registry import Symbol
+from bot.trade_client import BasicTradeClient, LimitMakerOrder, MarketOrder, RecoveringTradeClient
+from client_stub import ClientStub
+
+
+class OrderBookClientStub:
+
+    def __init__(self, snapshots: list[dict]):
+        self.__snapshots = snapshots
+        self.snapshot_requests = 0
+
+    def get_order_book(self, symbol, limit):
+        snapshot = self.__snapshots[min(self.snapshot_requests, len(self.__snapshots) - 1)]
+        self.snapshot_requests = self.snapshot_requests + 1
+        return snapshot
+
+
+class OcoCountingClientStub(ClientStub):
+
+    def __init__(self):
+        self.oco_orders = 0
+
+    def create_oco_order(self, symbol, side, quantity, price, stopPrice, stopLimitPrice, stopLimitTimeInForce):
+        self.oco_orders = self.oco_orders + 1
+        return super().create_oco_order(symbol, side, quantity, price, stopPrice, stopLimitPrice,
+                                        stopLimitTimeInForce)
+
+
+def depth_update(first_update_id: int, last_update_id: int, bids: list, asks: list) -> dict:
+    return {
+        'stream': 'btcfdusd@depth@100ms',
+        'data': {'e': 'depthUpdate', 's': 'BTCFDUSD', 'U': first_update_id, 'u': last_update_id, 'b': bids, 'a': asks}
+    }
+
+
+class TestOrderBook(TestCase):
+
+    def test_apply_diffs_after_snapshot(self):
+        book = OrderBook()
+        book.load_snapshot({'lastUpdateId': 10, 'bids': [['100.0', '1']], 'asks': [['101.0', '2']]})
+        self.assertTrue(book.apply_diff({'U': 5, 'u': 9, 'b': [['99.0', '5']], 'a': []}))
+        self.assertTrue(book.apply_diff({'U': 8, 'u': 11, 'b': [['100.0', '0'], ['100.5', '3']], 'a': []}))
+        self.assertFalse(book.apply_diff({'U': 13, 'u': 14, 'b': [], 'a': []}))
+        self.assertEqual((Decimal('100.5'), Decimal('101.0')), book.best_bid_ask())
+        self.assertEqual(([(Decimal('100.5'), Decimal('3'))], [(Decimal('101.0'), Decimal('2'))]), book.depth(5))
+
+
+class TestMarketDataStream(TestCase):
+
+    def setUp(self) -> None:
+        self.__events = []
+        self.__sent = threading.Event()
+        self.__server = serve(self.__handler, 'localhost', 0)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        self.__url = f'ws://localhost:{self.__server.socket.getsockname()[1]}/stream'
+        self.__registry = MarketDataRegistry(max_age_in_sec=60)
+        self.__stream = None
+
+    def tearDown(self) -> None:
+        if self.__stream is not None:
+            self.__stream.stop()
+        self.__server.shutdown()
+
+    def __handler(self, websocket):
+        for event in self.__events:
+            websocket.send(json.dumps(event))
+        self.__sent.set()
+        websocket.wait_closed()
+
+    def __run(self, client: OrderBookClientStub, **kwargs):
+        self.__stream = MarketDataStream(client, self.__registry, ['BTCFDUSD'], logging.getLogger('Market data'),
+                                         url=self.__url, **kwargs)
+        self.__stream.start()
+        self.__sent.wait(5)
+        while self.__registry.last_price('BTCFDUSD') is None:
+            self.__sent.wait(0.01)
+
+    def test_synchronize_order_book_from_snapshot_and_diffs(self):
+        self.__events.append(depth_update(9, 10, [['21470.00', '1']], []))
+        self.__events.append(depth_update(11, 12, [['21471.00', '2']], [['21473.00', '1']]))
+        self.__events.append({'stream': 'btcfdusd@aggTrade', 'data': {'e': 'aggTrade', 's': 'BTCFDUSD', 'p': '21472'}})
+        client = OrderBookClientStub([{'lastUpdateId': 10, 'bids': [['21470.00', '1']], 'asks': [['21474.00', '3']]}])
+        self.__run(client)
+        self.assertEqual(1, client.snapshot_requests)
+        self.assertEqual(Decimal('21472'), self.__registry.last_price('BTCFDUSD'))
+        self.assertEqual(
+            (
+                [(Decimal('21471.00'), Decimal('2')), (Decimal('21470.00'), Decimal('1'))],
+                [(Decimal('21473.00'), Decimal('1')), (Decimal('21474.00'), Decimal('3'))]
+            ),
+            self.__registry.depth('BTCFDUSD', 5)
+        )
+
+    def test_take_a_new_snapshot_on_a_gap(self):
+        self.__events.append(depth_update(11, 12, [['21471.00', '2']], []))
+        self.__events.append(depth_update(20, 21, [['21460.00', '4']], []))
+        self.__events.append({'stream': 'btcfdusd@aggTrade', 'data': {'e': 'aggTrade', 's': 'BTCFDUSD', 'p': '21472'}})
+        client = OrderBookClientStub([
+            {'lastUpdateId': 10, 'bids': [], 'asks': [['21474.00', '3']]},
+            {'lastUpdateId': 21, 'bids': [['21465.00', '1']], 'asks': [['21474.00', '3']]}
+        ])
+        self.__run(client)
+        self.assertEqual(2, client.snapshot_requests)
+        self.assertEqual(([(Decimal('21465.00'), Decimal('1'))], [(Decimal('21474.00'), Decimal('3'))]),
+                         self.__registry.depth('BTCFDUSD', 5))
+
+    def test_back_off_while_the_snapshot_is_behind_the_stream(self):
+        for update_id in range(20, 40, 2):
+            self.__events.append(depth_update(update_id, update_id + 1, [['21471.00', '2']], []))
+        self.__events.append({'stream': 'btcfdusd@aggTrade', 'data': {'e': 'aggTrade', 's': 'BTCFDUSD', 'p': '21472'}})
+        client = OrderBookClientStub([{'lastUpdateId': 10, 'bids': [], 'asks': [['21474.00', '3']]}])
+        self.__run(client, clock=lambda: 0.0)
+        self.assertEqual(1, client.snapshot_requests)
+        self.assertFalse(self.__registry.is_synced('BTCFDUSD'))
+
+
+class TestMarketDataRegistry(TestCase):
+
+    def setUp(self) -> None:
+        self.__now = 0.0
+        self.__registry = MarketDataRegistry(max_age_in_sec=1.0, clock=lambda: self.__now)
+
+    def test_fall_back_to_mid_price_when_the_trade_is_stale(self):
+        self.__registry.update_last_price('BTCFDUSD', {'p': '21500.00'})
+        self.__now = 5.0
+        self.__registry.update_best_bid_ask('BTCFDUSD', {'b': '21470.00', 'a': '21474.00'})
+        self.assertIsNone(self.__registry.last_price('BTCFDUSD'))
+        self.assertEqual(Decimal('21472.00'), self.__registry.reference_price('BTCFDUSD'))
+        self.assertTrue(
+            self.__registry.is_oco_price_valid('BTCFDUSD', 'SELL', Decimal('21490.00'), Decimal('21460.00'))
+        )
+
+    def test_leave_validation_to_exchange_when_everything_is_stale(self):
+        self.__registry.update_last_price('BTCFDUSD', {'p': '21500.00'})
+        self.__registry.update_best_bid_ask('BTCFDUSD', {'b': '21470.00', 'a': '21474.00'})
+        self.__now = 5.0
+        self.assertIsNone(self.__registry.reference_price('BTCFDUSD'))
+        self.assertTrue(
+            self.__registry.is_oco_price_valid('BTCFDUSD', 'SELL', Decimal('21490.00'), Decimal('21460.00'))
+        )
+
+
+class TestOcoPriceValidation(TestCase):
+
+    def setUp(self) -> None:
+        self.__registry = MarketDataRegistry()
+        self.__client = OcoCountingClientStub()
+        self.__trade_client = RecoveringTradeClient(
+            BasicTradeClient(
+                self.__client,
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+                market_data=self.__registry
+            )
+        )
+
+    def test_place_oco_order_when_prices_straddle_last_price(self):
+        self.__registry.update_last_price('BTCFDUSD', {'p': '21480.00'})
+        order = self.__trade_client.sell_oco_order(0.00088000, '21472.15000000')
+        self.assertEqual(LimitMakerOrder(19747264211), order)
+        self.assertEqual(1, self.__client.oco_orders)
+
+    def test_fall_back_to_market_order_without_sending_invalid_oco_order(self):
+        self.__registry.update_last_price('BTCFDUSD', {'p': '21500.00'})
+        order = self.__trade_client.sell_oco_order(0.00088000, '21472.15000000')
+        self.assertEqual(MarketOrder(19744496177, 'FILLED', '21472.15000000'), order)
+        self.assertEqual(0, self.__client.oco_orders)
+
+    def test_leave_validation_to_exchange_without_market_data(self):
+        order = self.__trade_client.buy_oco_order(0.00088000, '21472.15000000')
+        self.assertEqual(LimitMakerOrder(19747264211), order)
+        self.assertEqual(1, self.__client.oco_orders)
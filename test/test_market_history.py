@@ -0,0 +1,143 @@
+import logging
+import tempfile
+import threading
+from pathlib import Path
+from unittest import TestCase
+
+import numpy as np
+
+from bot.backtest import Tick, stored_kline_ticks, stored_trade_ticks
+from bot.binance_client import RateLimitClient, RequestWeightLimiter
+from bot.market_history import HistoryDownloader, MarketHistoryStore
+from history_client_stub import HistoryClientStub
+
+
+class FakeMonotonicClock:
+
+    def __init__(self):
+        self.now = 0.0
+        self.slept = 0.0
+        self.__lock = threading.Lock()
+
+    def time(self) -> float:
+        with self.__lock:
+            return self.now
+
+    def sleep(self, duration_in_sec: float):
+        with self.__lock:
+            self.now = self.now + duration_in_sec
+            self.slept = self.slept + duration_in_sec
+
+
+class TestHistoryDownloader(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__store = MarketHistoryStore(Path(self.__directory.name), index_stride=16)
+        self.__client = HistoryClientStub()
+        self.__monotonic = FakeMonotonicClock()
+        self.__limiter = RequestWeightLimiter(
+            weight_limit_per_minute=6, clock=self.__monotonic.time, sleep=self.__monotonic.sleep
+        )
+        self.__now = (self.__client.klines[-1][0] + 60000) / 1000
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __downloader(self) -> HistoryDownloader:
+        return HistoryDownloader(
+            RateLimitClient(self.__client, self.__limiter),
+            self.__store,
+            logging.getLogger('History'),
+            page_size=50,
+            workers=3,
+            clock=lambda: self.__now
+        )
+
+    def test_download_klines_in_pages_within_the_weight_limit(self):
+        start = self.__client.klines[0][0]
+        self.assertEqual(300, self.__downloader().download_klines('BTCFDUSD', '1m', start))
+        series = self.__store.klines('BTCFDUSD', '1m')
+        self.assertEqual([kline[0] for kline in self.__client.klines], series.column('open_time').tolist())
+        self.assertEqual([float(kline[4]) for kline in self.__client.klines], series.column('close').tolist())
+        self.assertEqual(6, len(self.__client.calls))
+        # Six pages of weight 2 against 6 per minute: the last three wait for a minute of refill
+        self.assertAlmostEqual(60.0, self.__monotonic.slept)
+
+    def test_resume_klines_and_skip_the_open_one(self):
+        start = self.__client.klines[0][0]
+        middle = self.__client.klines[120][0] + 30000
+        self.assertEqual(121, self.__downloader().download_klines('BTCFDUSD', '1m', start, middle))
+        self.__now = self.__client.klines[-1][0] / 1000 + 30
+        self.__client.calls.clear()
+        self.assertEqual(178, self.__downloader().download_klines('BTCFDUSD', '1m', start))
+        self.assertEqual(self.__client.klines[120][0] + 1, self.__client.calls[0][1]['startTime'])
+        series = self.__store.klines('BTCFDUSD', '1m')
+        self.assertEqual([kline[0] for kline in self.__client.klines[:-1]], series.column('open_time').tolist())
+
+    def test_download_aggregate_trades_between_times(self):
+        trades = self.__client.trades
+        start, end = trades[37]['T'], trades[333]['T']
+        stored = self.__downloader().download_aggregate_trades('BTCFDUSD', start, end)
+        expected = [trade for trade in trades if start <= trade['T'] < end]
+        self.assertEqual(len(expected), stored)
+        series = self.__store.aggregate_trades('BTCFDUSD')
+        self.assertEqual([trade['a'] for trade in expected], series.column('id').tolist())
+        self.assertEqual([float(trade['p']) for trade in expected], series.column('price').tolist())
+        self.assertEqual([trade['m'] for trade in expected], series.column('is_buyer_maker').tolist())
+        self.assertEqual(0, self.__downloader().download_aggregate_trades('BTCFDUSD', start, end))
+
+
+class TestMarketHistoryStore(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__client = HistoryClientStub()
+        self.__store = MarketHistoryStore(Path(self.__directory.name), index_stride=16)
+        downloader = HistoryDownloader(
+            self.__client, self.__store, logging.getLogger('History'), page_size=64, workers=2,
+            clock=lambda: (self.__client.klines[-1][0] + 60000) / 1000
+        )
+        downloader.download_klines('BTCFDUSD', '1m', self.__client.klines[0][0])
+        downloader.download_aggregate_trades('BTCFDUSD', self.__client.trades[0]['T'])
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def test_select_a_time_range_through_the_index(self):
+        series = self.__store.aggregate_trades('BTCFDUSD')
+        times = [trade['T'] for trade in self.__client.trades]
+        generator = np.random.default_rng(25)
+        for start, end in generator.integers(times[0] - 5000, times[-1] + 5000, (200, 2)).tolist():
+            self.assertEqual(
+                [trade['a'] for trade in self.__client.trades if start <= trade['T'] < end],
+                series.column('id', start, end).tolist()
+            )
+
+    def test_map_columns_without_copying(self):
+        prices = self.__store.aggregate_trades('BTCFDUSD').column('price')
+        self.assertIsInstance(prices.base, np.memmap)
+        self.assertTrue(prices.flags['C_CONTIGUOUS'])
+        self.assertFalse(prices.flags['WRITEABLE'])
+
+    def test_recover_from_an_interrupted_append(self):
+        directory = Path(self.__directory.name) / 'BTCFDUSD' / 'aggTrades'
+        with (directory / 'price.bin').open('ab') as price_file:
+            price_file.write(b'\x00' * 12)
+        (directory / 'time.idx').write_bytes(b'')
+        series = MarketHistoryStore(Path(self.__directory.name), index_stride=16).aggregate_trades('BTCFDUSD')
+        self.assertEqual(400, series.rows())
+        self.assertEqual(400 * 8, (directory / 'price.bin').stat().st_size)
+        self.assertEqual(25 * 8, (directory / 'time.idx').stat().st_size)
+        self.assertEqual(self.__client.trades[-1]['a'], series.last_key())
+
+    def test_replay_ticks_from_the_store(self):
+        kline = self.__client.klines[42]
+        kline_ticks = list(stored_kline_ticks(self.__store.klines('BTCFDUSD', '1m'), block_size=10))
+        self.assertEqual(300, len(kline_ticks))
+        self.assertEqual(Tick(kline[6], float(kline[3]), float(kline[2]), float(kline[4])), kline_ticks[42])
+        trade = self.__client.trades[-1]
+        trade_ticks = list(stored_trade_ticks(self.__store.aggregate_trades('BTCFDUSD'), block_size=64))
+        self.assertEqual(400, len(trade_ticks))
+        price = float(trade['p'])
+        self.assertEqual(Tick(trade['T'], price, price, price), trade_ticks[-1])
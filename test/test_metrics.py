@@ -0,0 +1,117 @@
+import json
+import logging
+import urllib.request
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.action import LimitAction, NoopAction
+from bot.binance_client import TimingBinanceClient
+from bot.metrics import CycleBreakdown, Histogram, Metrics, MetricsServer
+from bot.quantity import Quantity
+from bot.symbol_registry import Symbol
+from bot.trade_bot import TradeBot
+from bot.trade_client import BasicTradeClient, TimingTradeClient
+from bot.trade_strategy import BuyStrategy, CycleTradeStrategySupplier
+from client_stub import ClientStub
+
+
+class TwoCyclesClientStub(ClientStub):
+
+    def __init__(self):
+        self.__polls = 0
+
+    def get_order(self, symbol, orderId):
+        self.__polls = self.__polls + 1
+        if self.__polls > 2:
+            raise StopIteration()
+        return super().get_order(symbol, orderId)
+
+
+class TestHistogram(TestCase):
+
+    def test_percentiles_are_within_relative_error(self):
+        histogram = Histogram()
+        for value in range(1, 100001):
+            histogram.record(value * 1000)
+        self.assertEqual(100000, histogram.count())
+        self.assertAlmostEqual(0.05, histogram.percentile_in_sec(50), delta=0.05 * 0.016)
+        self.assertAlmostEqual(0.099, histogram.percentile_in_sec(99), delta=0.099 * 0.016)
+        self.assertEqual(0.1, histogram.percentile_in_sec(100))
+        self.assertEqual(0.1, histogram.max_in_sec())
+
+    def test_empty_histogram(self):
+        self.assertEqual(0.0, Histogram().percentile_in_sec(99))
+
+
+class TestMetrics(TestCase):
+
+    def setUp(self) -> None:
+        self.__metrics = Metrics()
+        self.__metrics.histogram('binance_client_seconds', layer='exchange', method='get_order').record(2_000_000)
+        self.__metrics.increment('binance_client_retries_total', method='get_order')
+
+    def test_prometheus(self):
+        self.assertEqual(
+            '# TYPE binance_client_seconds summary\n'
+            'binance_client_seconds{layer="exchange",method="get_order",quantile="0.5"} 0.002000000\n'
+            'binance_client_seconds{layer="exchange",method="get_order",quantile="0.9"} 0.002000000\n'
+            'binance_client_seconds{layer="exchange",method="get_order",quantile="0.99"} 0.002000000\n'
+            'binance_client_seconds{layer="exchange",method="get_order",quantile="0.999"} 0.002000000\n'
+            'binance_client_seconds_sum{layer="exchange",method="get_order"} 0.002000000\n'
+            'binance_client_seconds_count{layer="exchange",method="get_order"} 1\n'
+            '# TYPE binance_client_retries_total counter\n'
+            'binance_client_retries_total{method="get_order"} 1\n',
+            self.__metrics.prometheus()
+        )
+
+    def test_server_exports_json_snapshot(self):
+        server = MetricsServer(self.__metrics, port=0)
+        server.start()
+        try:
+            with urllib.request.urlopen(f'http://localhost:{server.port()}/metrics.json') as response:
+                snapshot = json.load(response)
+        finally:
+            server.stop()
+        self.assertEqual(self.__metrics.snapshot(), snapshot)
+        self.assertEqual(1, snapshot['histograms']['binance_client_seconds'][0]['count'])
+
+    def test_timing_binance_client(self):
+        client = TimingBinanceClient(ClientStub(), self.__metrics, 'exchange')
+        client.create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertEqual(
+            1, self.__metrics.histogram('binance_client_seconds', layer='exchange', method='create_order').count()
+        )
+
+    def test_cycle_breakdown(self):
+        cycle_breakdown = CycleBreakdown(self.__metrics)
+        trade_client = TimingTradeClient(
+            BasicTradeClient(
+                TwoCyclesClientStub(),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+            ),
+            self.__metrics,
+            'trade client',
+            cycle_breakdown
+        )
+        bot = TradeBot(
+            strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client)]),
+            strategy_changes_limit=LimitAction(5, NoopAction()),
+            expiration_limit=LimitAction(1, NoopAction()),
+            logger=logging.getLogger('Bot'),
+            cycle_breakdown=cycle_breakdown
+        )
+        with self.assertLogs('Bot', logging.DEBUG) as logs:
+            self.assertRaises(StopIteration, bot.start, Quantity(0.00088))
+        cycles = [line for line in logs.output if 'Cycle FILLED' in line]
+        self.assertEqual(2, len(cycles))
+        self.assertIn('market_fill', cycles[0])
+        self.assertIn('oco_placement', cycles[0])
+        self.assertIn('terminal_status', cycles[0])
+        self.assertEqual(2, self.__metrics.histogram('trade_cycle_seconds', status='FILLED').count())
+        self.assertEqual(
+            3, self.__metrics.histogram('trade_client_seconds', layer='trade client', phase='market_fill').count()
+        )
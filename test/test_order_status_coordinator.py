@@ -0,0 +1,121 @@
+import json
+import logging
+from _decimal import Decimal
+from unittest import TestCase
+
+import requests
+from binance.exceptions import BinanceAPIException
+
+from bot.binance_client import GetOrderException
+from bot.order_status_coordinator import OrderStatusCoordinator
+from bot.symbol_registry import Symbol
+from bot.trade_client import BasicTradeClient, CoordinatedTradeClient
+from client_stub import ClientStub
+
+
+class OpenOrdersClientStub:
+
+    def __init__(self, statuses):
+        self.statuses = statuses
+        self.open_orders_calls = 0
+        self.order_calls = 0
+
+    def get_open_orders(self, symbol):
+        self.open_orders_calls = self.open_orders_calls + 1
+        return [
+            {"symbol": symbol, "orderId": order_id, "status": status}
+            for order_id, status in self.statuses.items() if status in ('NEW', 'PARTIALLY_FILLED')
+        ]
+
+    def get_order(self, symbol, orderId):
+        self.order_calls = self.order_calls + 1
+        status = self.statuses[orderId]
+        if isinstance(status, Exception):
+            raise GetOrderException('Failed to get the order') from status
+        return {"symbol": symbol, "orderId": orderId, "status": status}
+
+
+class TestOrderStatusCoordinator(TestCase):
+
+    def setUp(self) -> None:
+        self.__client = OpenOrdersClientStub({1: 'NEW', 2: 'PARTIALLY_FILLED', 3: 'FILLED', 4: 'EXPIRED'})
+        self.__coordinator = OrderStatusCoordinator(self.__client, logging.getLogger('Order status'))
+
+    def test_one_open_orders_call_per_round(self):
+        futures = [self.__coordinator.watch('BTCFDUSD', order_id) for order_id in (1, 2, 3, 4)]
+        self.__coordinator.poll()
+        self.assertEqual(1, self.__client.open_orders_calls)
+        self.assertEqual(2, self.__client.order_calls)
+        self.assertEqual([False, False, True, True], [future.done() for future in futures])
+        self.assertEqual('FILLED', futures[2].result())
+        self.assertEqual('EXPIRED', futures[3].result())
+
+    def test_orders_resolve_once_they_leave_open_orders(self):
+        futures = [self.__coordinator.watch('BTCFDUSD', order_id) for order_id in (1, 2)]
+        self.__coordinator.poll()
+        self.__client.statuses[1] = 'FILLED'
+        self.__coordinator.poll()
+        self.assertEqual('FILLED', futures[0].result(timeout=0))
+        self.assertFalse(futures[1].done())
+        self.assertEqual(2, self.__client.open_orders_calls)
+
+    def test_single_order_is_looked_up_by_itself(self):
+        future = self.__coordinator.watch('BTCFDUSD', 1)
+        self.__coordinator.poll()
+        self.__client.statuses[1] = 'FILLED'
+        self.__coordinator.poll()
+        self.assertEqual('FILLED', future.result(timeout=0))
+        self.__coordinator.poll()
+        self.assertEqual(0, self.__client.open_orders_calls)
+        self.assertEqual(2, self.__client.order_calls)
+
+    def test_error_that_would_repeat_reaches_the_waiting_bot(self):
+        self.__client.statuses[1] = BinanceAPIException(
+            None, 400, json.dumps({'code': -2013, 'msg': 'Order does not exist.'})
+        )
+        future = self.__coordinator.watch('BTCFDUSD', 1)
+        self.__coordinator.poll()
+        self.assertIsInstance(future.exception(timeout=0), GetOrderException)
+        self.__coordinator.poll()
+        self.assertEqual(1, self.__client.order_calls)
+
+    def test_transient_error_keeps_the_order_pending(self):
+        self.__client.statuses[1] = requests.exceptions.ConnectionError('Connection reset by peer')
+        future = self.__coordinator.watch('BTCFDUSD', 1)
+        self.__coordinator.poll()
+        self.assertFalse(future.done())
+        self.__client.statuses[1] = 'FILLED'
+        self.__coordinator.poll()
+        self.assertEqual('FILLED', future.result(timeout=0))
+
+    def test_new_order_is_checked_without_waiting_for_the_interval(self):
+        self.__client.statuses[1] = 'FILLED'
+        coordinator = OrderStatusCoordinator(
+            self.__client, logging.getLogger('Order status'), polling_interval_in_sec=60
+        )
+        coordinator.start()
+        try:
+            self.assertEqual('FILLED', coordinator.watch('BTCFDUSD', 1).result(timeout=5))
+        finally:
+            coordinator.stop()
+
+    def test_same_order_shares_future(self):
+        self.assertIs(self.__coordinator.watch('BTCFDUSD', 1), self.__coordinator.watch('BTCFDUSD', 1))
+
+
+class TestCoordinatedTradeClient(TestCase):
+
+    def test_poll_directly_when_the_coordinator_is_not_running(self):
+        symbol = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+        client = OpenOrdersClientStub({})
+        coordinator = OrderStatusCoordinator(client, logging.getLogger('Order status'))
+        trade_client = CoordinatedTradeClient(
+            BasicTradeClient(ClientStub(), Decimal('1.0005'), Decimal('0.9995'), Decimal('1.0005'),
+                             Decimal('0.9995'), symbol),
+            coordinator,
+            symbol,
+            wait_timeout_in_sec=0.05
+        )
+        self.assertEqual('FILLED', trade_client.poll_terminal_order_status(19747264211))
+        coordinator.poll()
+        self.assertEqual(0, client.order_calls)
@@ -0,0 +1,52 @@
+from unittest import TestCase
+
+import numpy as np
+
+from bot.parameter_sweep import grid, sweep
+
+
+def naive_totals(prices, raise_coefficient, decrease_coefficient, horizon, entry_step):
+    long_pnl, up_first, down_first, brackets = 0.0, 0, 0, 0
+    for entry in range(0, len(prices) - horizon, entry_step):
+        brackets = brackets + 1
+        exit_ratio = prices[entry + horizon] / prices[entry]
+        for price in prices[entry + 1:entry + horizon + 1]:
+            ratio = price / prices[entry]
+            if ratio <= decrease_coefficient:
+                exit_ratio = decrease_coefficient
+                down_first = down_first + 1
+                break
+            if ratio >= raise_coefficient:
+                exit_ratio = raise_coefficient
+                up_first = up_first + 1
+                break
+        long_pnl = long_pnl + exit_ratio - 1
+    return brackets, long_pnl, up_first / brackets, down_first / brackets
+
+
+class TestParameterSweep(TestCase):
+
+    def setUp(self) -> None:
+        generator = np.random.default_rng(7)
+        self.__prices = 20000 * np.exp(np.cumsum(generator.normal(0, 0.0002, 3000)))
+
+    def test_sweep_matches_per_bracket_simulation(self):
+        raise_coefficients, decrease_coefficients = grid(np.array([1.0005, 1.001, 1.003]), np.array([0.9995, 0.998]))
+        result = sweep(self.__prices, raise_coefficients, decrease_coefficients, horizon=300, entry_step=25, workers=1)
+        coefficients = zip(raise_coefficients, decrease_coefficients)
+        for index, (raise_coefficient, decrease_coefficient) in enumerate(coefficients):
+            brackets, long_pnl, up_first_rate, down_first_rate = naive_totals(
+                self.__prices, raise_coefficient, decrease_coefficient, 300, 25
+            )
+            self.assertEqual(brackets, result.brackets[index])
+            self.assertAlmostEqual(long_pnl, result.long_pnl[index])
+            self.assertAlmostEqual(-long_pnl, result.short_pnl[index])
+            self.assertAlmostEqual(up_first_rate, result.long_fill_rate()[index])
+            self.assertAlmostEqual(down_first_rate, result.long_expiry_rate()[index])
+
+    def test_process_pool_gives_same_result(self):
+        raise_coefficients, decrease_coefficients = grid(np.linspace(1.0001, 1.003, 40), np.linspace(0.997, 0.9999, 40))
+        single = sweep(self.__prices, raise_coefficients, decrease_coefficients, horizon=300, workers=1, chunk_size=400)
+        pooled = sweep(self.__prices, raise_coefficients, decrease_coefficients, horizon=300, workers=2, chunk_size=400)
+        np.testing.assert_allclose(single.long_pnl, pooled.long_pnl)
+        np.testing.assert_allclose(single.open_rate, pooled.open_rate)
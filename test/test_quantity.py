@@ -0,0 +1,33 @@
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.quantity import Quantity
+
+
+class TestQuantity(TestCase):
+
+    def test_grow_along_ladder_of_whole_lots(self):
+        quantity = Quantity(0.00088, Decimal('0.00001'))
+        values = []
+        for _ in range(40):
+            quantity.grow()
+            values.append(quantity.decimal_value())
+        self.assertEqual(Decimal('0.00096'), values[0])
+        self.assertEqual(Decimal('0.03982'), values[-1])
+        self.assertTrue(all(value % Decimal('0.00001') == 0 for value in values))
+        quantity.reset()
+        self.assertEqual(88, quantity.lots())
+        self.assertEqual(0.00088, quantity.float_value())
+
+    def test_restore_continues_growth_from_ladder(self):
+        grown = Quantity(0.00088, Decimal('0.00001'))
+        for _ in range(5):
+            grown.grow()
+        restored = Quantity(0.00088, Decimal('0.00001'))
+        restored.restore(grown.float_value())
+        grown.grow()
+        restored.grow()
+        self.assertEqual(grown.lots(), restored.lots())
+
+    def test_reject_quantity_below_step_size(self):
+        self.assertRaises(ValueError, Quantity, 0.000004, Decimal('0.00001'))
@@ -0,0 +1,85 @@
+from unittest import TestCase
+
+from requests.exceptions import ConnectionError as RequestsConnectionError
+
+from bot.binance_client import MARGIN_REQUEST_WEIGHTS, RateLimitClient, RequestWeightLimiter
+from client_stub import ClientStub
+
+
+class FakeClock:
+
+    def __init__(self):
+        self.now = 0.0
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, duration: float):
+        self.now = self.now + duration
+
+
+class HeadersClientStub(ClientStub):
+
+    def __init__(self, headers):
+        self.headers = headers
+
+    def response_headers(self):
+        return self.headers
+
+
+class UnreachableClientStub(HeadersClientStub):
+
+    def get_order(self, **params):
+        raise RequestsConnectionError('Connection reset by peer')
+
+
+class TestRateLimitClient(TestCase):
+
+    def setUp(self) -> None:
+        self.__clock = FakeClock()
+        self.__limiter = RequestWeightLimiter(
+            weight_limit_per_minute=60,
+            order_limit_per_10_sec=10,
+            clock=self.__clock.time,
+            sleep=self.__clock.sleep
+        )
+        self.__client = RateLimitClient(HeadersClientStub({}), self.__limiter)
+
+    def test_calls_within_budget_are_not_throttled(self):
+        for _ in range(15):
+            self.__client.get_order(symbol='BTCFDUSD', orderId=19747264211)
+        self.assertEqual(0.0, self.__clock.now)
+        self.assertEqual(0, self.__limiter.metrics()['weight_available'])
+
+    def test_calls_over_budget_wait_for_refill(self):
+        for _ in range(16):
+            self.__client.get_order(symbol='BTCFDUSD', orderId=19747264211)
+        self.assertAlmostEqual(4.0, self.__clock.now)
+        self.assertEqual(1, self.__limiter.metrics()['throttled_calls_total'])
+
+    def test_order_count_is_limited_separately(self):
+        for _ in range(5):
+            self.__client.create_oco_order(
+                symbol='BTCFDUSD', side='SELL', quantity='0.00088', price='21482.89', stopPrice='21461.41',
+                stopLimitPrice='21461.41', stopLimitTimeInForce='GTC'
+            )
+        self.__client.create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertAlmostEqual(1.0, self.__clock.now)
+
+    def test_used_weight_header_corrects_budget(self):
+        client = RateLimitClient(HeadersClientStub({'x-mbx-used-weight-1m': '56'}), self.__limiter)
+        client.get_order(symbol='BTCFDUSD', orderId=19747264211)
+        self.assertEqual(4, self.__limiter.metrics()['weight_available'])
+        self.assertEqual(56, self.__limiter.metrics()['weight_used_reported'])
+
+    def test_headers_of_an_earlier_response_are_not_observed_after_a_transport_error(self):
+        client = RateLimitClient(UnreachableClientStub({'x-mbx-used-weight-1m': '56'}), self.__limiter)
+        self.assertRaises(RequestsConnectionError, client.get_order, symbol='BTCFDUSD', orderId=19747264211)
+        self.assertEqual(56, self.__limiter.metrics()['weight_available'])
+        self.assertEqual(0, self.__limiter.metrics()['weight_used_reported'])
+
+    def test_margin_endpoints_are_charged_margin_weights(self):
+        client = RateLimitClient(HeadersClientStub({}), self.__limiter, MARGIN_REQUEST_WEIGHTS)
+        client.get_order(symbol='BTCFDUSD', orderId=19747264211)
+        client.create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertEqual(44, self.__limiter.metrics()['weight_available'])
@@ -0,0 +1,156 @@
+import asyncio
+import json
+from unittest import IsolatedAsyncioTestCase, TestCase
+
+from binance.exceptions import BinanceAPIException
+from urllib3.exceptions import ReadTimeoutError
+
+from bot.async_binance_client import AsyncRetryClient
+from bot.binance_client import RetryClient, GetOrderException
+
+
+def binance_exception(status_code: int, code: int, message: str) -> BinanceAPIException:
+    return BinanceAPIException(None, status_code, json.dumps({'code': code, 'msg': message}))
+
+
+class FlakyExchangeStub:
+
+    def __init__(self, failures: int, lands: bool):
+        self.failures = failures
+        self.lands = lands
+        self.placements = []
+        self.orders = {}
+
+    def create_order(self, **params):
+        self.placements.append(params)
+        order = {
+            'symbol': params['symbol'],
+            'orderId': len(self.placements),
+            'clientOrderId': params['newClientOrderId'],
+            'executedQty': '0.00088000',
+            'cummulativeQuoteQty': '18.89549200',
+            'status': 'FILLED',
+            'fills': [{'price': '21472.15000000', 'qty': '0.00088000'}]
+        }
+        if self.failures:
+            self.failures = self.failures - 1
+            if self.lands:
+                self.orders[params['newClientOrderId']] = order
+            raise ReadTimeoutError(None, '/api/v3/order', 'Read timed out')
+        return order
+
+    def get_order(self, **params):
+        if 'origClientOrderId' in params:
+            if params['origClientOrderId'] in self.orders:
+                order = dict(self.orders[params['origClientOrderId']])
+                del order['fills']
+                return order
+            raise binance_exception(400, -2013, 'Order does not exist.')
+        if self.failures:
+            self.failures = self.failures - 1
+            raise ReadTimeoutError(None, '/api/v3/order', 'Read timed out')
+        return {'orderId': params['orderId'], 'status': 'NEW'}
+
+
+class TestRetryClient(TestCase):
+
+    def setUp(self) -> None:
+        self.__delays = []
+        self.__now = 0.0
+
+    def __client(self, exchange) -> RetryClient:
+        return RetryClient(exchange, clock=lambda: self.__now, sleep=self.__delays.append)
+
+    def test_landed_order_is_not_placed_twice(self):
+        exchange = FlakyExchangeStub(failures=1, lands=True)
+        response = self.__client(exchange).create_order(
+            symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088'
+        )
+        self.assertEqual(1, len(exchange.placements))
+        self.assertEqual('21472.15', response['fills'][0]['price'])
+
+    def test_lost_order_is_placed_again_with_same_client_order_id(self):
+        exchange = FlakyExchangeStub(failures=1, lands=False)
+        self.__client(exchange).create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertEqual(2, len(exchange.placements))
+        self.assertEqual(exchange.placements[0]['newClientOrderId'], exchange.placements[1]['newClientOrderId'])
+
+    def test_rejected_order_is_not_retried(self):
+        class RejectingExchangeStub(FlakyExchangeStub):
+            def create_order(self, **params):
+                self.placements.append(params)
+                raise binance_exception(400, -2010, 'Account has insufficient balance for requested action.')
+
+        exchange = RejectingExchangeStub(failures=0, lands=False)
+        self.assertRaises(
+            BinanceAPIException,
+            self.__client(exchange).create_order, symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088'
+        )
+        self.assertEqual(1, len(exchange.placements))
+
+    def test_backoff_grows_exponentially_with_jitter(self):
+        exchange = FlakyExchangeStub(failures=2, lands=False)
+        self.assertEqual('NEW', self.__client(exchange).get_order(symbol='BTCFDUSD', orderId=1)['status'])
+        self.assertEqual(2, len(self.__delays))
+        self.assertTrue(0 <= self.__delays[0] <= 0.05)
+        self.assertTrue(0 <= self.__delays[1] <= 0.1)
+
+    def test_retry_limit_exceeded(self):
+        exchange = FlakyExchangeStub(failures=3, lands=False)
+        self.assertRaises(GetOrderException, self.__client(exchange).get_order, symbol='BTCFDUSD', orderId=1)
+
+    def test_deadline_exceeded(self):
+        exchange = FlakyExchangeStub(failures=1, lands=False)
+        self.__now = 0.0
+        client = RetryClient(exchange, clock=lambda: self.__now, sleep=self.__delays.append, query_deadline_in_sec=0)
+        self.assertRaises(GetOrderException, client.get_order, symbol='BTCFDUSD', orderId=1)
+        self.assertEqual([], self.__delays)
+
+
+class AsyncFlakyExchangeStub:
+
+    def __init__(self, failures: int, lands: bool):
+        self.__exchange = FlakyExchangeStub(failures, lands)
+        self.placements = self.__exchange.placements
+
+    async def create_order(self, **params):
+        try:
+            return self.__exchange.create_order(**params)
+        except ReadTimeoutError as exception:
+            raise asyncio.TimeoutError() from exception
+
+    async def get_order(self, **params):
+        return self.__exchange.get_order(**params)
+
+
+class TestAsyncRetryClient(IsolatedAsyncioTestCase):
+
+    def setUp(self) -> None:
+        self.__delays = []
+
+    async def __sleep(self, delay: float):
+        self.__delays.append(delay)
+
+    def __client(self, exchange) -> AsyncRetryClient:
+        return AsyncRetryClient(exchange, clock=lambda: 0.0, sleep=self.__sleep)
+
+    async def test_landed_order_is_not_placed_twice(self):
+        exchange = AsyncFlakyExchangeStub(failures=1, lands=True)
+        response = await self.__client(exchange).create_order(
+            symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088'
+        )
+        self.assertEqual(1, len(exchange.placements))
+        self.assertEqual('21472.15', response['fills'][0]['price'])
+        self.assertTrue(0 <= self.__delays[0] <= 0.05)
+
+    async def test_lost_order_is_placed_again_with_same_client_order_id(self):
+        exchange = AsyncFlakyExchangeStub(failures=1, lands=False)
+        await self.__client(exchange).create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertEqual(2, len(exchange.placements))
+        self.assertEqual(exchange.placements[0]['newClientOrderId'], exchange.placements[1]['newClientOrderId'])
+
+    async def test_retry_limit_exceeded(self):
+        exchange = AsyncFlakyExchangeStub(failures=3, lands=False)
+        with self.assertRaises(asyncio.TimeoutError):
+            await self.__client(exchange).create_order(symbol='BTCFDUSD', side='BUY', type='MARKET', quantity='0.00088')
+        self.assertEqual(3, len(exchange.placements))
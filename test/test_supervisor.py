@@ -0,0 +1,193 @@
+import logging
+import multiprocessing
+import os
+import time
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.action import Action
+from bot.market_data import MarketDataRegistry
+from bot.quantity import Quantity
+from bot.shared_state import SharedAccountState, SharedRequestWeightLimiter
+from bot.supervisor import Supervisor, WorkerSpec
+from bot.symbol_registry import Symbol
+from bot.trade_client import BasicTradeClient, ExposureLimitTradeClient, ReferencePrice
+from bot.trade_strategy import BuyStrategy
+from client_stub import ClientStub
+
+
+def reserve_notional(account: SharedAccountState, worker: int, notional: float):
+    account.try_reserve(worker, 1, notional)
+
+
+def use_weight(limiter: SharedRequestWeightLimiter, weight: int):
+    limiter.acquire(weight)
+
+
+def crash_once(spec: WorkerSpec, index: int, account: SharedAccountState, limiter: SharedRequestWeightLimiter):
+    if account.worker_state(index)['heartbeat'] == 0:
+        account.close_position(index)
+        os._exit(1)
+
+
+class ReleaseAction(Action):
+
+    def __init__(self, account: SharedAccountState, worker: int):
+        self.__account = account
+        self.__worker = worker
+        self.runs = 0
+
+    def run(self):
+        self.runs = self.runs + 1
+        self.__account.close_position(self.__worker)
+
+
+class PriceAction(Action):
+
+    def __init__(self, prices: list):
+        self.__prices = prices
+        self.runs = 0
+
+    def run(self):
+        self.runs = self.runs + 1
+        self.__prices.append(21472.15)
+
+
+class OrderBookClientStub:
+
+    def __init__(self, order_book: dict):
+        self.__order_book = order_book
+        self.requests = 0
+
+    def get_order_book(self, symbol, limit):
+        self.requests = self.requests + 1
+        return self.__order_book
+
+
+class TestSharedState(TestCase):
+
+    def test_notional_cap_holds_across_processes(self):
+        account = SharedAccountState(2, max_notional=100)
+        try:
+            process = multiprocessing.get_context('spawn').Process(target=reserve_notional, args=(account, 0, 60))
+            process.start()
+            process.join(30)
+            self.assertEqual(0, process.exitcode)
+            self.assertFalse(account.try_reserve(1, 1, 50))
+            self.assertTrue(account.try_reserve(1, 1, 40))
+            self.assertEqual(100, account.total_notional())
+        finally:
+            account.close()
+
+    def test_request_weight_is_shared_across_processes(self):
+        limiter = SharedRequestWeightLimiter(weight_limit_per_minute=6)
+        try:
+            process = multiprocessing.get_context('spawn').Process(target=use_weight, args=(limiter, 6))
+            process.start()
+            process.join(30)
+            self.assertEqual(0, process.exitcode)
+            self.assertLess(limiter.metrics()['weight_available'], 1)
+        finally:
+            limiter.close()
+
+
+class TestExposureLimitTradeClient(TestCase):
+
+    def __strategy(self, account: SharedAccountState, reference_price, pause: Action,
+                   max_pauses_without_price: int = 30) -> BuyStrategy:
+        return BuyStrategy(
+            ExposureLimitTradeClient(
+                BasicTradeClient(
+                    ClientStub(),
+                    Decimal('1.0005'),
+                    Decimal('0.9995'),
+                    Decimal('1.0005'),
+                    Decimal('0.9995'),
+                    Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+                ),
+                account,
+                0,
+                reference_price,
+                pause,
+                max_pauses_without_price
+            )
+        )
+
+    def test_wait_until_account_exposure_allows_next_order(self):
+        account = SharedAccountState(2, max_notional=25)
+        try:
+            pause = ReleaseAction(account, 1)
+            strategy = self.__strategy(account, lambda: 21472.15, pause)
+            account.open_position(1, 10)
+            self.assertEqual('FILLED', strategy.run(Quantity(0.00088)))
+            self.assertEqual(1, pause.runs)
+            self.assertEqual(0, account.worker_state(0)['notional'])
+            account.open_position(1, 10)
+            self.assertEqual('FILLED', strategy.run(Quantity(0.00088)))
+            self.assertEqual(2, pause.runs)
+        finally:
+            account.close()
+
+    def test_wait_for_a_price(self):
+        account = SharedAccountState(1, max_notional=25)
+        try:
+            prices = [None]
+            pause = PriceAction(prices)
+            strategy = self.__strategy(account, lambda: prices[-1], pause)
+            self.assertEqual('FILLED', strategy.run(Quantity(0.00088)))
+            self.assertEqual(1, pause.runs)
+        finally:
+            account.close()
+
+    def test_stop_when_no_price_comes(self):
+        account = SharedAccountState(1, max_notional=25)
+        try:
+            pause = PriceAction([])
+            strategy = self.__strategy(account, lambda: None, pause, max_pauses_without_price=3)
+            self.assertRaises(ValueError, strategy.run, Quantity(0.00088))
+            self.assertEqual(3, pause.runs)
+            self.assertEqual(0, account.worker_state(0)['notional'])
+        finally:
+            account.close()
+
+
+class TestReferencePrice(TestCase):
+
+    def test_prefer_streamed_price_to_order_book(self):
+        client = OrderBookClientStub({'bids': [['21470.00', '1']], 'asks': [['21474.00', '2']]})
+        market_data = MarketDataRegistry()
+        reference_price = ReferencePrice(client, 'BTCFDUSD', market_data)
+        self.assertEqual(21472.0, reference_price.price())
+        self.assertEqual(1, client.requests)
+        market_data.update_last_price('BTCFDUSD', {'p': '21480.00'})
+        self.assertEqual(21480.0, reference_price.price())
+        self.assertEqual(1, client.requests)
+
+    def test_no_price_from_an_empty_order_book(self):
+        self.assertIsNone(ReferencePrice(OrderBookClientStub({'bids': [], 'asks': []}), 'BTCFDUSD').price())
+
+
+class TestSupervisor(TestCase):
+
+    def test_restart_crashed_worker(self):
+        account = SharedAccountState(1, max_notional=100)
+        limiter = SharedRequestWeightLimiter()
+        supervisor = Supervisor(
+            [WorkerSpec('BTCFDUSD', 0.00088)],
+            crash_once,
+            account,
+            limiter,
+            logging.getLogger('Supervisor'),
+            restart_delay_in_sec=0.01
+        )
+        try:
+            supervisor.start()
+            deadline = time.monotonic() + 30
+            while supervisor.supervise() and time.monotonic() < deadline:
+                time.sleep(0.01)
+            self.assertFalse(supervisor.supervise())
+            self.assertEqual(1, supervisor.restarts(0))
+        finally:
+            supervisor.stop()
+            account.close()
+            limiter.close()
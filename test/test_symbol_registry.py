@@ -0,0 +1,93 @@
+import tempfile
+import time
+from pathlib import Path
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.symbol_registry import CachingSymbolRegistryLoader, Symbol, SymbolRegistry
+
+
+class ExchangeInfoClientStub:
+
+    def __init__(self):
+        self.calls = 0
+
+    def get_exchange_info(self):
+        self.calls = self.calls + 1
+        return {
+            "timezone": "UTC",
+            "symbols": [
+                {
+                    "symbol": "BTCFDUSD",
+                    "status": "TRADING",
+                    "filters": [
+                        {"filterType": "PRICE_FILTER", "minPrice": "0.01000000", "maxPrice": "1000000.00000000",
+                         "tickSize": "0.01000000"},
+                        {"filterType": "LOT_SIZE", "minQty": "0.00001000", "maxQty": "9000.00000000",
+                         "stepSize": "0.00001000"},
+                        {"filterType": "NOTIONAL", "minNotional": "5.00000000", "applyMinToMarket": True,
+                         "maxNotional": "9000000.00000000", "applyMaxToMarket": False, "avgPriceMins": 5}
+                    ]
+                },
+                {
+                    "symbol": "ETHBTC",
+                    "status": "TRADING",
+                    "filters": [
+                        {"filterType": "PRICE_FILTER", "minPrice": "0.00001000", "maxPrice": "922327.00000000",
+                         "tickSize": "0.00001000"},
+                        {"filterType": "LOT_SIZE", "minQty": "0.00010000", "maxQty": "100000.00000000",
+                         "stepSize": "0.00010000"},
+                        {"filterType": "MIN_NOTIONAL", "minNotional": "0.00010000"}
+                    ]
+                }
+            ]
+        }
+
+
+class TestSymbolRegistry(TestCase):
+
+    def setUp(self) -> None:
+        self.__registry = SymbolRegistry.from_exchange_info(ExchangeInfoClientStub().get_exchange_info())
+
+    def test_symbol(self):
+        self.assertEqual(
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+            self.__registry.symbol('BTCFDUSD')
+        )
+        self.assertEqual(
+            Symbol('ETHBTC', Decimal('0.00001'), Decimal('0.0001'), Decimal('0.0001')),
+            self.__registry.symbol('ETHBTC')
+        )
+
+    def test_unknown_symbol(self):
+        self.assertRaises(ValueError, self.__registry.symbol, 'BTCUSDT')
+
+    def test_round_price(self):
+        symbol = self.__registry.symbol('BTCFDUSD')
+        self.assertEqual('21482.89', str(symbol.round_price(Decimal('21472.15') * Decimal('1.0005'))))
+        self.assertEqual('21461.41', str(symbol.round_price(Decimal('21472.15') * Decimal('0.9995'))))
+
+    def test_round_quantity(self):
+        symbol = self.__registry.symbol('BTCFDUSD')
+        self.assertEqual('0.00088', str(symbol.round_quantity(Decimal('0.00088000'))))
+        self.assertEqual('0.00096', str(symbol.round_quantity(Decimal('0.000968'))))
+
+    def test_load_from_cache(self):
+        client = ExchangeInfoClientStub()
+        with tempfile.TemporaryDirectory() as directory:
+            loader = CachingSymbolRegistryLoader(client, Path(directory, 'symbols.json'))
+            first_registry = loader.load()
+            second_registry = loader.load()
+        self.assertEqual(1, client.calls)
+        self.assertEqual(first_registry.symbol('ETHBTC'), second_registry.symbol('ETHBTC'))
+
+    def test_reload_expired_cache(self):
+        client = ExchangeInfoClientStub()
+        now = [time.time()]
+        with tempfile.TemporaryDirectory() as directory:
+            loader = CachingSymbolRegistryLoader(client, Path(directory, 'symbols.json'), 60, lambda: now[0])
+            loader.load()
+            loader.load()
+            now[0] = now[0] + 61
+            loader.load()
+        self.assertEqual(2, client.calls)
@@ -1,7 +1,11 @@
+import logging
+import random
 from _decimal import Decimal
 from unittest import TestCase
 
-from bot.trade_client import BasicTradeClient, MarketOrder, LimitMakerOrder
+from bot.trade_client import BasicTradeClient, EntryGapTradeClient, MarketOrder, LimitMakerOrder, OcoPricer, \
+    OrderMapper
+from bot.symbol_registry import Symbol
 from client_stub import ClientStub
 
 
@@ -13,7 +17,8 @@ class TestTradeClient(TestCase):
             Decimal(1.0005),
             Decimal(0.9995),
             Decimal(1.0005),
-            Decimal(0.9995)
+            Decimal(0.9995),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
         )
 
     def test_buy_market_order(self):
@@ -28,6 +33,44 @@ class TestTradeClient(TestCase):
             self.__trade_client.sell_market_order(0.00088000)
         )
 
+    def test_market_order_is_decoded_into_a_slotted_record(self):
+        order = self.__trade_client.buy_market_order(0.00088000)
+        self.assertIsNone(order.quantity())
+        self.assertIsNone(order.commission_asset())
+        self.assertFalse(hasattr(order, '__dict__'))
+        order = BasicTradeClient(
+            ClientStub(),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+            decode_fills=True
+        ).buy_market_order(0.00088000)
+        self.assertEqual(Decimal('0.00088'), order.quantity())
+        self.assertEqual(Decimal(0), order.commission())
+        self.assertEqual('BNB', order.commission_asset())
+
+    def test_market_order_fills_are_summed(self):
+        order = OrderMapper(
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+            decode_fills=True
+        ).market_order({
+            'orderId': 1,
+            'status': 'FILLED',
+            'fills': [
+                {'price': '21472.15', 'qty': '0.0005', 'commission': '0.00000001', 'commissionAsset': 'BTC'},
+                {'price': '21472.16', 'qty': '0.00038', 'commission': '0.00000002', 'commissionAsset': 'BTC'}
+            ]
+        })
+        self.assertEqual(MarketOrder(1, 'FILLED', '21472.15'), order)
+        self.assertEqual(Decimal('0.00088'), order.quantity())
+        self.assertEqual(Decimal('0.00000003'), order.commission())
+
     def test_sell_oco_order(self):
         self.assertEqual(
             LimitMakerOrder(19747264211),
@@ -42,3 +85,93 @@ class TestTradeClient(TestCase):
 
     def test_poll_terminal_status(self):
         self.assertEqual('FILLED', self.__trade_client.poll_terminal_order_status(19747264211))
+
+    def test_oco_order_template_is_prepared_before_market_order(self):
+        client = ClientStub()
+        requests = []
+        client.create_oco_order = lambda **params: requests.append(params) or ClientStub().create_oco_order(**params)
+        trade_client = BasicTradeClient(
+            client,
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+        )
+        market_order = trade_client.buy_market_order(0.00088000)
+        trade_client.sell_oco_order(0.00088000, market_order.price())
+        self.assertEqual(
+            [{
+                'symbol': 'BTCFDUSD',
+                'side': 'SELL',
+                'quantity': '0.00088',
+                'price': '21482.89',
+                'stopPrice': '21461.41',
+                'stopLimitPrice': '21461.41',
+                'stopLimitTimeInForce': 'GTC'
+            }],
+            requests
+        )
+
+    def test_notional_error_reports_the_lower_leg_price(self):
+        mapper = OrderMapper(
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Decimal('1.0005'),
+            Decimal('0.9995'),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+        )
+        for side in ('BUY', 'SELL'):
+            with self.assertRaisesRegex(ValueError, r'^Notional is below 5: 0\.00023 x 21461\.41$'):
+                mapper.oco_order_template(0.00023, side).request('21472.15')
+
+
+
+class TestEntryGapTradeClient(TestCase):
+
+    def test_market_to_oco_gap_is_reported(self):
+        ticks = iter([1.0, 1.002, 1.010])
+        trade_client = EntryGapTradeClient(
+            BasicTradeClient(
+                ClientStub(),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+            ),
+            logging.getLogger('Entry gap'),
+            clock=lambda: next(ticks)
+        )
+        with self.assertLogs('Entry gap', logging.DEBUG) as logs:
+            market_order = trade_client.buy_market_order(0.00088000)
+            trade_client.sell_oco_order(0.00088000, market_order.price())
+        self.assertEqual(
+            ['DEBUG:Entry gap:Market to OCO gap 10.000 ms: 2.000 ms before sending, 8.000 ms placing'],
+            logs.output
+        )
+
+
+class TestOcoPricer(TestCase):
+
+    def test_integer_tick_prices_match_decimal_rounding(self):
+        generator = random.Random(7)
+        for tick_size in ('0.01', '0.1', '1', '0.00001', '0.05', '0.00000001'):
+            symbol = Symbol('BTCFDUSD', Decimal(tick_size), Decimal('0.00001'), Decimal('5'))
+            for limit_coefficient, stop_coefficient in (('1.0005', '0.9995'), ('0.999', '1.0015'), ('1.25', '0.5')):
+                pricer = OcoPricer(symbol, Decimal(limit_coefficient), Decimal(stop_coefficient))
+                for _ in range(500):
+                    price = symbol.round_price(Decimal(generator.randint(1, 10 ** 7)) * Decimal(tick_size))
+                    market_price = f'{price:.8f}'
+                    _, _, limit_price, stop_price = pricer.prices(market_price)
+                    self.assertEqual(
+                        str(symbol.round_price(Decimal(market_price) * Decimal(limit_coefficient))), limit_price
+                    )
+                    self.assertEqual(
+                        str(symbol.round_price(Decimal(market_price) * Decimal(stop_coefficient))), stop_price
+                    )
+
+    def test_float_literal_coefficients_are_normalized(self):
+        symbol = Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+        pricer = OcoPricer(symbol, Decimal(1.0005), Decimal(0.9995))
+        self.assertEqual((3002, 2998, '30.02', '29.98'), pricer.prices('30.00'))
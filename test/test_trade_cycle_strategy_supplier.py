@@ -1,8 +1,15 @@
+import logging
+import threading
 from _decimal import Decimal
 from unittest import TestCase
 
+from bot.action import Exit, LimitAction, NoopAction
+from bot.quantity import Quantity
+from bot.trade_bot import TradeBot, run_bots
 from bot.trade_client import BasicTradeClient
-from bot.trade_strategy import CycleTradeStrategySupplier, BuyStrategy, SellStrategy
+from bot.trade_strategy import AdaptiveTradeStrategySupplier, CycleTradeStrategySupplier, BuyStrategy, \
+    SellStrategy, TradeStrategy, VolatilityEstimator
+from bot.symbol_registry import Symbol
 from client_stub import ClientStub
 
 
@@ -14,7 +21,8 @@ class TestCycleTradeStrategySupplier(TestCase):
             Decimal(1.0005),
             Decimal(0.9995),
             Decimal(1.0005),
-            Decimal(0.9995)
+            Decimal(0.9995),
+            Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
         )
         self.__supplier = CycleTradeStrategySupplier(
             [
@@ -40,3 +48,133 @@ class TestCycleTradeStrategySupplier(TestCase):
             self.__supplier.next_strategy(),
             SellStrategy
         )
+
+
+class ScriptedStrategy(TradeStrategy):
+    def __init__(self, name: str, statuses: list[str], gate: threading.Event = None):
+        self.__name = name
+        self.__statuses = iter(statuses)
+        self.__gate = gate
+        self.runs = 0
+
+    def run(self, quantity):
+        if self.__gate is not None:
+            self.__gate.wait(5)
+        self.runs = self.runs + 1
+        return next(self.__statuses)
+
+    def resume(self, order):
+        return self.run(None)
+
+    def __str__(self):
+        return self.__name
+
+
+class TestAdaptiveTradeStrategySupplier(TestCase):
+
+    def setUp(self) -> None:
+        self.__buy = ScriptedStrategy('Buy strategy', [])
+        self.__sell = ScriptedStrategy('Sell strategy', [])
+        self.__prices = iter([])
+
+    def __supplier(self, prices=None) -> AdaptiveTradeStrategySupplier:
+        self.__prices = iter(prices or [])
+        return AdaptiveTradeStrategySupplier(
+            [self.__buy, self.__sell], price=lambda: next(self.__prices, None), min_cycles=2
+        )
+
+    def test_try_every_strategy_before_judging(self):
+        supplier = self.__supplier()
+        self.assertIs(self.__buy, supplier.next_strategy())
+        supplier.record(self.__buy, 'EXPIRED', 60)
+        self.assertIs(self.__sell, supplier.next_strategy())
+        supplier.record(self.__sell, 'EXPIRED', 60)
+        self.assertIs(self.__buy, supplier.next_strategy())
+        supplier.record(self.__buy, 'EXPIRED', 60)
+        self.assertIs(self.__sell, supplier.next_strategy())
+
+    def test_prefer_more_fills_per_second(self):
+        supplier = self.__supplier()
+        for _ in range(2):
+            supplier.record(self.__buy, 'FILLED', 120)
+            supplier.record(self.__sell, 'FILLED', 30)
+        self.assertIs(self.__sell, supplier.next_strategy())
+        self.assertEqual(30, supplier.statistics(self.__sell).time_to_fill_in_sec())
+        for _ in range(7):
+            supplier.record(self.__sell, 'EXPIRED', 300)
+        self.assertIs(self.__buy, supplier.next_strategy())
+
+    def test_try_a_strategy_again_when_its_statistics_are_old(self):
+        supplier = AdaptiveTradeStrategySupplier([self.__buy, self.__sell], min_cycles=2, refresh_after_cycles=5)
+        for _ in range(2):
+            supplier.record(self.__buy, 'EXPIRED', 300)
+            supplier.record(self.__sell, 'FILLED', 30)
+        self.assertIs(self.__sell, supplier.next_strategy())
+        for _ in range(4):
+            supplier.record(self.__sell, 'FILLED', 30)
+        self.assertIs(self.__buy, supplier.next_strategy())
+        supplier.record(self.__buy, 'EXPIRED', 300)
+        self.assertIs(self.__sell, supplier.next_strategy())
+
+    def test_prefer_reliable_fills_while_volatile(self):
+        prices = [100.0, 100.01, 100.0, 100.01, 100.0, 100.01, 100.0, 102.0, 100.0]
+        supplier = self.__supplier(prices)
+        for _ in range(2):
+            supplier.record(self.__buy, 'FILLED', 120)
+            supplier.record(self.__sell, 'FILLED', 30)
+        supplier.record(self.__sell, 'EXPIRED', 300)
+        supplier.record(self.__buy, 'FILLED', 120)
+        self.assertIs(self.__sell, supplier.next_strategy())
+        supplier.record(self.__buy, 'FILLED', 120)
+        supplier.record(self.__buy, 'FILLED', 120)
+        self.assertTrue(supplier.volatility().is_elevated(2.0))
+        self.assertIs(self.__buy, supplier.next_strategy())
+
+    def test_volatility_is_not_elevated_for_a_steady_market(self):
+        volatility = VolatilityEstimator()
+        for price in [100.0, 100.01] * 20:
+            volatility.record(price)
+        self.assertFalse(volatility.is_elevated(2.0))
+        self.assertAlmostEqual(0.0001, volatility.recent_volatility(), delta=0.00001)
+
+    def test_bot_feeds_the_supplier(self):
+        strategy = ScriptedStrategy('Buy strategy', ['FILLED', 'EXPIRED', 'FILLED'])
+        supplier = AdaptiveTradeStrategySupplier([strategy])
+        bot = TradeBot(supplier, LimitAction(5, NoopAction()), LimitAction(5, NoopAction()), logging.getLogger('Bot'))
+        self.assertRaises(StopIteration, bot.start, Quantity(0.00088))
+        self.assertEqual(3, supplier.statistics(strategy).cycles())
+        self.assertAlmostEqual(0.84, supplier.statistics(strategy).fill_rate())
+
+    def test_bot_switches_strategies_after_a_fill_before_the_first_expiration(self):
+        buy = ScriptedStrategy('Buy strategy', ['FILLED', 'EXPIRED'])
+        sell = ScriptedStrategy('Sell strategy', ['FILLED'])
+        bot = TradeBot(
+            AdaptiveTradeStrategySupplier([buy, sell], min_cycles=1),
+            LimitAction(5, NoopAction()),
+            LimitAction(1, Exit()),
+            logging.getLogger('Bot'),
+            clock=lambda: 0.0
+        )
+        self.assertRaises(SystemExit, bot.start, Quantity(0.00088))
+        self.assertEqual(2, buy.runs)
+        self.assertEqual(1, sell.runs)
+
+
+class TestRunBots(TestCase):
+
+    def test_run_symbols_concurrently_and_stop_with_the_first_failure(self):
+        gate = threading.Event()
+        waiting = ScriptedStrategy('Buy strategy', ['FILLED'], gate)
+        trading = ScriptedStrategy('Sell strategy', ['FILLED', 'EXPIRED', 'FILLED'])
+        bots = [
+            (
+                TradeBot(CycleTradeStrategySupplier([strategy]), LimitAction(5, NoopAction()),
+                         LimitAction(5, NoopAction()), logging.getLogger('Bot')),
+                Quantity(0.00088)
+            )
+            for strategy in (waiting, trading)
+        ]
+        self.assertRaises(StopIteration, run_bots, bots)
+        self.assertEqual(0, waiting.runs)
+        self.assertEqual(4, trading.runs)
+        gate.set()
@@ -0,0 +1,212 @@
+import logging
+import random
+import tempfile
+from pathlib import Path
+from _decimal import Decimal
+from unittest import TestCase
+
+from bot.symbol_registry import Symbol
+from bot.trade_client import BasicTradeClient, HistoryTradeClient
+from bot.trade_history import TradeHistory
+from bot.user_data_stream import OrderStatusRegistry
+from client_stub import ClientStub
+
+
+class StopLossClientStub(ClientStub):
+
+    def create_order(self, symbol, side, type, quantity):
+        response = super().create_order(symbol, side, type, quantity)
+        response['fills'] = [
+            {'price': '21472.15000000', 'qty': '0.00050000', 'commission': '0.00000050', 'commissionAsset': 'BTC'},
+            {'price': '21473.15000000', 'qty': '0.00038000', 'commission': '0.00000038', 'commissionAsset': 'BTC'}
+        ]
+        return response
+
+    def get_order(self, symbol, orderId):
+        response = super().get_order(symbol, orderId)
+        response['status'] = 'EXPIRED'
+        return response
+
+
+class TestTradeHistory(TestCase):
+
+    def setUp(self) -> None:
+        self.__history = TradeHistory('BTCFDUSD', chunk_size=100, cached_chunks=1)
+        generator = random.Random(1)
+        self.__trades = []
+        closed_at = 0.0
+        for _ in range(1050):
+            closed_at = closed_at + generator.choice([0.0, 1.0, 2.5])
+            side = generator.choice([1, -1])
+            entry_price = generator.uniform(21000, 22000)
+            exit_price = entry_price * generator.choice([1.0005, 0.9995])
+            trade = (closed_at, side, exit_price > entry_price, 0.00088, entry_price, exit_price, 0.001,
+                     generator.uniform(1, 600))
+            pnl = self.__history.append(*trade)
+            self.__trades.append(trade + (pnl,))
+
+    def tearDown(self) -> None:
+        self.__history.close()
+
+    def __expected(self, start: float, end: float) -> tuple:
+        trades = [trade for trade in self.__trades if start <= trade[0] < end]
+        return (
+            len(trades),
+            sum(trade[8] for trade in trades),
+            sum(trade[6] for trade in trades),
+            sum(1 for trade in trades if trade[8] > 0) / len(trades) if trades else 0.0,
+            sum(trade[7] for trade in trades) / len(trades) if trades else 0.0
+        )
+
+    def __assert_statistics(self, expected: tuple, statistics):
+        self.assertEqual(expected[0], statistics.trades())
+        self.assertAlmostEqual(expected[1], statistics.realized_pnl(), places=6)
+        self.assertAlmostEqual(expected[2], statistics.fees(), places=6)
+        self.assertAlmostEqual(expected[3], statistics.win_rate())
+        self.assertAlmostEqual(expected[4], statistics.average_time_to_fill_in_sec(), places=6)
+
+    def test_running_statistics(self):
+        self.assertEqual(1050, self.__history.rows())
+        self.__assert_statistics(self.__expected(float('-inf'), float('inf')), self.__history.statistics())
+
+    def test_windows_across_spilled_chunks(self):
+        last_closed_at = self.__trades[-1][0]
+        for start, end in [(0, 10), (100, 900), (250.0, 251.0), (last_closed_at - 5, last_closed_at + 1),
+                           (-10, 0), (last_closed_at + 1, last_closed_at + 2), (500, 400)]:
+            self.__assert_statistics(self.__expected(start, max(start, end)), self.__history.window(start, end))
+
+    def test_column_slice(self):
+        self.assertEqual(
+            [trade[4] for trade in self.__trades if 300 <= trade[0] < 1200],
+            list(self.__history.column('entry_price', 300, 1200))
+        )
+
+    def test_trades_are_appended_in_time_order(self):
+        self.assertRaises(ValueError, self.__history.append, 0.0, 1, True, 0.00088, 21000.0, 21010.0, 0.0, 1.0)
+
+    def test_continue_a_history_kept_in_a_directory(self):
+        with tempfile.TemporaryDirectory() as directory:
+            history = TradeHistory('BTCFDUSD', chunk_size=100, cached_chunks=1, directory=Path(directory))
+            for trade in self.__trades[:1000]:
+                history.append(*trade[:8])
+            history.close()
+            history = TradeHistory('BTCFDUSD', chunk_size=100, cached_chunks=1, directory=Path(directory))
+            self.assertEqual(1000, history.rows())
+            self.assertRaises(ValueError, history.append, 0.0, 1, True, 0.00088, 21000.0, 21010.0, 0.0, 1.0)
+            for trade in self.__trades[1000:]:
+                history.append(*trade[:8])
+            history.close()
+            history = TradeHistory('BTCFDUSD', chunk_size=100, cached_chunks=1, directory=Path(directory))
+            self.__assert_statistics(self.__expected(float('-inf'), float('inf')), history.statistics())
+            self.__assert_statistics(self.__expected(100, 900), history.window(100, 900))
+            history.close()
+
+
+class TestHistoryTradeClient(TestCase):
+
+    def test_record_a_bracket_closed_at_the_limit_price(self):
+        history = TradeHistory('BTCFDUSD')
+        now = [1000.0]
+        trade_client = HistoryTradeClient(
+            BasicTradeClient(
+                ClientStub(),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+                decode_fills=True
+            ),
+            history,
+            'BTC',
+            'FDUSD',
+            logging.getLogger('Trade history'),
+            lambda: now[0]
+        )
+        market_order = trade_client.buy_market_order(0.00088)
+        order = trade_client.sell_oco_order(0.00088, market_order.price())
+        now[0] = 1042.0
+        self.assertEqual('FILLED', order.get_status(trade_client))
+        statistics = history.statistics()
+        history.close()
+        self.assertEqual(1, statistics.trades())
+        self.assertAlmostEqual((21508.03 - 21472.15) * 0.00088, statistics.realized_pnl())
+        self.assertEqual(1.0, statistics.win_rate())
+        self.assertEqual(42.0, statistics.average_time_to_fill_in_sec())
+
+    def test_record_a_bracket_closed_at_the_stop_with_its_commission(self):
+        history = TradeHistory('BTCFDUSD')
+        registry = OrderStatusRegistry()
+        registry.connected()
+        trade_client = HistoryTradeClient(
+            BasicTradeClient(
+                StopLossClientStub(),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+                decode_fills=True
+            ),
+            history,
+            'BTC',
+            'FDUSD',
+            logging.getLogger('Trade history'),
+            lambda: 1000.0,
+            order_status_registry=registry,
+            commission_timeout_in_sec=0
+        )
+        market_order = trade_client.buy_market_order(0.00088)
+        order = trade_client.sell_oco_order(0.00088, market_order.price())
+        registry.update(19747264210, 'PARTIALLY_FILLED', '0.00944', 'FDUSD')
+        registry.update(19747264210, 'FILLED', '0.00943', 'FDUSD')
+        self.assertEqual('EXPIRED', order.get_status(trade_client))
+        entry_price = (21472.15 * 0.0005 + 21473.15 * 0.00038) / 0.00088
+        fees = 0.00000088 * entry_price + 0.01887
+        self.assertAlmostEqual(entry_price, history.column('entry_price', 0, 2000)[0])
+        self.assertAlmostEqual(21444.63, history.column('exit_price', 0, 2000)[0])
+        statistics = history.statistics()
+        history.close()
+        self.assertAlmostEqual(fees, statistics.fees())
+        self.assertAlmostEqual((21444.63 - entry_price) * 0.00088 - fees, statistics.realized_pnl())
+
+    def test_record_the_exit_once_its_commission_arrives(self):
+        history = TradeHistory('BTCFDUSD')
+        registry = OrderStatusRegistry()
+        registry.connected()
+        now = [1000.0]
+        trade_client = HistoryTradeClient(
+            BasicTradeClient(
+                StopLossClientStub(),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5')),
+                decode_fills=True
+            ),
+            history,
+            'BTC',
+            'FDUSD',
+            logging.getLogger('Trade history'),
+            lambda: now[0],
+            order_status_registry=registry
+        )
+        market_order = trade_client.buy_market_order(0.00088)
+        order = trade_client.sell_oco_order(0.00088, market_order.price())
+        self.assertEqual('EXPIRED', order.get_status(trade_client))
+        self.assertEqual(0, history.rows())
+        registry.update(19747264210, 'FILLED', '0.01887', 'FDUSD')
+        now[0] = 1042.0
+        market_order = trade_client.buy_market_order(0.00088)
+        order = trade_client.sell_oco_order(0.00088, market_order.price())
+        self.assertEqual(1, history.rows())
+        self.assertEqual([1000.0], list(history.column('closed_at', 0, 2000)))
+        self.assertAlmostEqual(
+            0.00000088 * history.column('entry_price', 0, 2000)[0] + 0.01887, history.statistics().fees()
+        )
+        self.assertEqual('EXPIRED', order.get_status(trade_client))
+        trade_client.close()
+        statistics = history.statistics()
+        history.close()
+        self.assertEqual(2, statistics.trades())
@@ -0,0 +1,130 @@
+import logging
+import sqlite3
+import tempfile
+from contextlib import closing
+from _decimal import Decimal
+from pathlib import Path
+from unittest import TestCase
+
+from bot.action import LimitAction, NoopAction
+from bot.quantity import Quantity
+from bot.symbol_registry import Symbol
+from bot.trade_bot import TradeBot
+from bot.trade_client import BasicTradeClient, JournalingTradeClient
+from bot.trade_journal import TradeJournal
+from bot.trade_strategy import BuyStrategy, CycleTradeStrategySupplier, SellStrategy
+from client_stub import ClientStub
+
+
+class Crash(Exception):
+    pass
+
+
+class CrashingClientStub(ClientStub):
+
+    def __init__(self, polls_before_crash: int):
+        self.calls = []
+        self.__polls_before_crash = polls_before_crash
+
+    def create_order(self, symbol, side, type, quantity):
+        self.calls.append('create_order')
+        return super().create_order(symbol, side, type, quantity)
+
+    def get_order(self, symbol, orderId):
+        self.calls.append('get_order')
+        if self.__polls_before_crash == 0:
+            raise Crash()
+        self.__polls_before_crash = self.__polls_before_crash - 1
+        return super().get_order(symbol, orderId)
+
+
+class TestTradeJournal(TestCase):
+
+    def setUp(self) -> None:
+        self.__directory = tempfile.TemporaryDirectory()
+        self.__path = Path(self.__directory.name, 'journal', 'trades.sqlite3')
+
+    def tearDown(self) -> None:
+        self.__directory.cleanup()
+
+    def __run_until_crash(self, client: CrashingClientStub, quantity: Quantity) -> TradeJournal:
+        journal = TradeJournal(self.__path, batch_interval_in_sec=0.001)
+        journal.start()
+        trade_client = JournalingTradeClient(
+            BasicTradeClient(
+                client,
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Decimal('1.0005'),
+                Decimal('0.9995'),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+            ),
+            journal
+        )
+        bot = TradeBot(
+            strategy_supplier=CycleTradeStrategySupplier([BuyStrategy(trade_client), SellStrategy(trade_client)]),
+            strategy_changes_limit=LimitAction(5, NoopAction()),
+            expiration_limit=LimitAction(5, NoopAction()),
+            logger=logging.getLogger('Journaled bot'),
+            journal=journal
+        )
+        self.assertRaises(Crash, bot.start, quantity)
+        journal.close()
+        return journal
+
+    def test_recover_outstanding_order(self):
+        journal = TradeJournal(self.__path)
+        journal.start()
+        journal.record('bot_state', run=3, filled=1, expired=1, strategy_changes_in_a_row=1, quantity=0.00097,
+                       strategy='Sell strategy')
+        journal.record('market_order', order_id=1, side='SELL', quantity=0.00097, price='21472.15')
+        journal.record('oco_order', order_id=3, side='BUY', quantity=0.00097)
+        journal.close()
+        recovered_state = TradeJournal(self.__path).recover()
+        self.assertEqual(3, recovered_state.outstanding_order_id())
+        self.assertEqual('Sell strategy', recovered_state.state()['strategy'])
+        self.assertIsNone(recovered_state.unbracketed_market_order())
+
+    def test_recover_from_the_checkpoint_without_the_events(self):
+        journal = TradeJournal(self.__path, batch_interval_in_sec=0.001)
+        journal.start()
+        journal.record('oco_order', order_id=3, side='BUY', quantity=0.00097)
+        journal.flush()
+        journal.record('oco_order', order_id=5, side='SELL', quantity=0.00097)
+        journal.record('order_status', order_id=5, status='FILLED')
+        journal.close()
+        with closing(sqlite3.connect(self.__path)) as connection, connection:
+            connection.execute('DELETE FROM events')
+        self.assertEqual(3, TradeJournal(self.__path).recover().outstanding_order_id())
+
+    def test_replay_a_journal_without_a_checkpoint(self):
+        TradeJournal(self.__path)
+        with closing(sqlite3.connect(self.__path)) as connection, connection:
+            connection.executemany(
+                'INSERT INTO events (time, kind, payload) VALUES (0, ?, ?)',
+                [
+                    ('oco_order', '{"order_id": 3}'),
+                    ('oco_order', '{"order_id": 5}'),
+                    ('order_status', '{"order_id": 5}')
+                ]
+            )
+        journal = TradeJournal(self.__path)
+        self.assertEqual(3, journal.recover().outstanding_order_id())
+        journal.start()
+        journal.record('order_status', order_id=3, status='FILLED')
+        journal.close()
+        with closing(sqlite3.connect(self.__path)) as connection, connection:
+            connection.execute('DELETE FROM events')
+        self.assertIsNone(TradeJournal(self.__path).recover().outstanding_order_id())
+
+    def test_bot_resumes_waiting_on_outstanding_order(self):
+        self.__run_until_crash(CrashingClientStub(polls_before_crash=0), Quantity(0.00088))
+        client = CrashingClientStub(polls_before_crash=1)
+        quantity = Quantity(0.00088)
+        journal = self.__run_until_crash(client, quantity)
+        self.assertEqual(['get_order', 'create_order', 'get_order'], client.calls)
+        state = journal.recover().state()
+        self.assertEqual(1, state['filled'])
+        self.assertEqual(2, state['run'])
+        self.assertEqual('Buy strategy', state['strategy'])
+        self.assertEqual(19747264211, journal.recover().outstanding_order_id())
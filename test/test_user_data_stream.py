@@ -0,0 +1,116 @@
+import json
+import logging
+import threading
+from _decimal import Decimal
+from unittest import TestCase
+
+from websockets.sync.server import serve
+
+from bot.trade_client import BasicTradeClient, MarketOrder, StreamingTradeClient, TradeClient
+from bot.user_data_stream import OrderStatusRegistry, UserDataStream
+from bot.symbol_registry import Symbol
+from client_stub import ClientStub
+
+
+class ListenKeyClientStub:
+
+    def stream_get_listen_key(self):
+        return 'listen-key'
+
+    def stream_keepalive(self, listen_key):
+        return {}
+
+
+class FallbackTradeClientStub(TradeClient):
+
+    def buy_market_order(self, quantity: float) -> MarketOrder:
+        return MarketOrder(19744496177, 'FILLED', '21472.15000000')
+
+    def sell_market_order(self, quantity: float) -> MarketOrder:
+        return MarketOrder(19744496178, 'FILLED', '21472.15000000')
+
+    def sell_oco_order(self, quantity: float, market_price: str) -> MarketOrder:
+        return self.sell_market_order(quantity)
+
+    def buy_oco_order(self, quantity: float, market_price: str) -> MarketOrder:
+        return self.buy_market_order(quantity)
+
+    def poll_terminal_order_status(self, order_id: int) -> str:
+        raise AssertionError('A market order is never polled')
+
+
+class TestStreamingTradeClient(TestCase):
+
+    def setUp(self) -> None:
+        self.__events = []
+        self.__connected = threading.Event()
+        self.__server = serve(self.__handler, 'localhost', 0)
+        threading.Thread(target=self.__server.serve_forever, daemon=True).start()
+        port = self.__server.socket.getsockname()[1]
+        self.__registry = OrderStatusRegistry()
+        self.__stream = UserDataStream(
+            ListenKeyClientStub(),
+            self.__registry,
+            logging.getLogger('User data stream'),
+            url=f'ws://localhost:{port}/ws'
+        )
+        self.__trade_client = StreamingTradeClient(
+            BasicTradeClient(
+                ClientStub(),
+                Decimal(1.0005),
+                Decimal(0.9995),
+                Decimal(1.0005),
+                Decimal(0.9995),
+                Symbol('BTCFDUSD', Decimal('0.01'), Decimal('0.00001'), Decimal('5'))
+            ),
+            self.__registry,
+            wait_timeout_in_sec=5
+        )
+
+    def tearDown(self) -> None:
+        self.__stream.stop()
+        self.__server.shutdown()
+
+    def __handler(self, websocket):
+        self.__connected.set()
+        for event in self.__events:
+            websocket.send(json.dumps(event))
+        websocket.wait_closed()
+
+    def test_poll_terminal_status_from_stream(self):
+        self.__events.append({'e': 'executionReport', 'i': 19747264210, 'X': 'EXPIRED'})
+        self.__events.append({'e': 'executionReport', 'i': 19747264211, 'X': 'EXPIRED'})
+        self.__stream.start()
+        self.__connected.wait(5)
+        while self.__registry.connection_epoch() is None:
+            self.__connected.wait(0.01)
+        order = self.__trade_client.sell_oco_order(0.00088000, "21472.15000000")
+        self.assertEqual('EXPIRED', order.get_status(self.__trade_client))
+
+    def test_sum_commissions_of_the_trades_of_an_order(self):
+        self.__events.append({'e': 'executionReport', 'i': 19747264210, 'x': 'NEW', 'X': 'NEW', 'n': '0', 'N': None})
+        self.__events.append({
+            'e': 'executionReport', 'i': 19747264210, 'x': 'TRADE', 'X': 'PARTIALLY_FILLED', 'n': '0.0094', 'N': 'FDUSD'
+        })
+        self.__events.append(
+            {'e': 'executionReport', 'i': 19747264210, 'x': 'TRADE', 'X': 'FILLED', 'n': '0.0095', 'N': 'FDUSD'}
+        )
+        self.__stream.start()
+        self.__connected.wait(5)
+        while self.__registry.connection_epoch() is None:
+            self.__connected.wait(0.01)
+        self.assertEqual((Decimal('0.0189'), 'FDUSD'), self.__registry.wait_commission(19747264210, 5))
+        self.assertIsNone(self.__registry.wait_commission(19747264211, 0))
+
+    def test_poll_terminal_status_falls_back_to_rest_when_stream_is_down(self):
+        order = self.__trade_client.sell_oco_order(0.00088000, "21472.15000000")
+        self.assertEqual('FILLED', order.get_status(self.__trade_client))
+
+    def test_forget_epoch_of_market_order_taken_instead_of_oco(self):
+        registry = OrderStatusRegistry()
+        registry.connected()
+        trade_client = StreamingTradeClient(FallbackTradeClientStub(), registry)
+        for _ in range(3):
+            order = trade_client.sell_oco_order(0.00088000, "21472.15000000")
+            self.assertEqual('FILLED', order.get_status(trade_client))
+        self.assertEqual({}, trade_client._StreamingTradeClient__order_epochs)  # pylint: disable=protected-access